@@ -2,7 +2,7 @@ import { useEffect, useState } from "react";
 import type { LoaderFunctionArgs } from "@remix-run/node";
 import { redirect } from "@remix-run/node";
 import Layout from "~/components/Layout";
-import { checkAuth, fetchExplore, submitReview } from "~/utils/api";
+import { checkAuth, fetchExplore, fetchMovieReviews, submitReview } from "~/utils/api";
 
 export async function loader({ request }: LoaderFunctionArgs) {
   const cookie = request.headers.get("cookie") || "";
@@ -41,6 +41,12 @@ export default function ExplorePage() {
         if (!data) return;
         setMovie(data);
         setReviews(data.reviews || []);
+        // Only the first page is embedded; page through the rest
+        if (data.reviews_next_cursor) {
+          fetchMovieReviews(data.id, data.reviews_next_cursor).then((more) => {
+            if (more.length) setReviews((shown) => [...shown, ...more]);
+          });
+        }
       })
       .catch(console.error);
   }, []);
@@ -3,7 +3,7 @@ import { useNavigate, useLoaderData } from "@remix-run/react";
 import type { LoaderFunctionArgs } from "@remix-run/node";
 import { redirect, json } from "@remix-run/node";
 import Layout from "~/components/Layout";
-import { checkAuth, submitReview } from "~/utils/api";
+import { checkAuth, fetchMovieReviews, submitReview } from "~/utils/api";
 
 interface Movie {
     id: number;
@@ -57,6 +57,15 @@ export async function loader({ request, params }: LoaderFunctionArgs) {
         if (r.ok) {
             const data = await r.json();
             reviews = Array.isArray(data?.reviews) ? data.reviews : [];
+            // Only the first page is embedded; page through the rest
+            if (data?.reviews_next_cursor) {
+                reviews.push(
+                    ...(await fetchMovieReviews(movieId, data.reviews_next_cursor, {
+                        baseUrl: "http://server:8080/api",
+                        headers: { cookie },
+                    }))
+                );
+            }
         }
     } catch {}
 
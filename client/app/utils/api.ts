@@ -64,22 +64,60 @@ export async function logoutUser() {
 
 export async function fetchUserReviews() {
   try {
-    const response = await fetch(`${API_URL}/my-reviews`, {
-      method: "GET",
-      credentials: "include",
-    });
-
-    if (!response.ok) {
-      throw new Error(`HTTP error! Status: ${response.status}`);
-    }
-
-    return await response.json();
+    // The server pages reviews; follow X-Next-Cursor until the last page
+    const reviews: any[] = [];
+    let cursor: string | null = null;
+    do {
+      const query: string = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+      const response = await fetch(`${API_URL}/my-reviews${query}`, {
+        method: "GET",
+        credentials: "include",
+      });
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! Status: ${response.status}`);
+      }
+
+      reviews.push(...(await response.json()));
+      cursor = response.headers.get("X-Next-Cursor");
+    } while (cursor);
+
+    return reviews;
   } catch (error) {
     console.error("Error fetching user reviews:", error);
     return [];
   }
 }
 
+// Reviews of a movie after the first page embedded in its payload: follows
+// X-Next-Cursor from `cursor` (the payload's reviews_next_cursor) to the end.
+// Server-side loaders pass the internal base URL and the user's cookie.
+export async function fetchMovieReviews(
+  movieId: number | string,
+  cursor: string | null,
+  options: { baseUrl?: string; headers?: Record<string, string> } = {}
+) {
+  const reviews: any[] = [];
+  try {
+    while (cursor) {
+      const response: Response = await fetch(
+        `${options.baseUrl ?? API_URL}/movie/${encodeURIComponent(movieId)}/reviews?cursor=${encodeURIComponent(cursor)}`,
+        { method: "GET", credentials: "include", headers: options.headers }
+      );
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! Status: ${response.status}`);
+      }
+
+      reviews.push(...(await response.json()));
+      cursor = response.headers.get("X-Next-Cursor");
+    }
+  } catch (error) {
+    console.error("Error fetching movie reviews:", error);
+  }
+  return reviews;
+}
+
 export async function deleteReview(reviewId: number) {
   try {
     const response = await fetch(`${API_URL}/delete-review/${reviewId}`, {
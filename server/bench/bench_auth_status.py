@@ -0,0 +1,57 @@
+"""Throughput of /api/auth-status with cached claims vs. verifying every call.
+
+Uses a local Cognito stand-in that signs real RS256 ID tokens.
+
+    python bench/bench_auth_status.py [--requests 2000]
+"""
+
+import argparse
+import time
+
+from common import load_app
+from fakes import FakeCognito
+
+
+def _throughput(client, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        assert client.get("/api/auth-status").get_json()["isAuthenticated"]
+    elapsed = time.perf_counter() - start
+    return n / elapsed, elapsed / n * 1e6
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with FakeCognito() as cognito:
+        app_mod = load_app(COGNITO_ISSUER=cognito.issuer, COGNITO_CLIENT_ID=cognito.client_id)
+        token = cognito.sign("alice", name="Alice")
+        claims = app_mod._verify_id_token(token)
+        sess = {
+            "id_token": token,
+            "username": "alice",
+            "display_name": claims["name"],
+            "exp": claims["exp"],
+            "verified_until": claims["exp"],
+        }
+        store = app_mod.session_store
+        store.put("bench", sess, 3600)
+        client = app_mod.app.test_client()
+        client.set_cookie(app_mod.SESSION_COOKIE_NAME, "bench")
+
+        rps, us = _throughput(client, args.requests)
+        print(f"cached claims : {rps:8.0f} req/s  {us:7.1f} us/req")
+
+        # Previous behaviour: a full RS256 verification on every call
+        store.put("bench", {**sess, "verified_until": 0}, 3600)
+        store.put = lambda *a, **k: None
+        rps, us = _throughput(client, args.requests)
+        print(f"verify always : {rps:8.0f} req/s  {us:7.1f} us/req")
+        del store.put
+        print(f"JWKS fetches  : {cognito.calls}")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,135 @@
+"""Training time, accuracy, load time and query latency of the ALS factor model.
+
+Uses the same synthetic ratings as ``bench_recommender.py`` with 5% held
+out. Reports the share of recommendations from each user's favoured genres,
+how many held-out liked movies make the top 20, and how much memory several
+processes mapping the same model file actually use (PSS, Linux only).
+
+    python bench/bench_factors.py [--ratings 1000000] [--movies 20000] [--factors 32]
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import factor_model  # noqa: E402
+from bench_recommender import GENRES, synthetic_ratings  # noqa: E402
+
+
+def _pss_kb(path):
+    """Proportional set size of this process's mappings of ``path``."""
+    total, inside = 0, False
+    with open("/proc/self/smaps") as fh:
+        for line in fh:
+            if "-" in line.split(" ", 1)[0]:
+                inside = line.rstrip().endswith(path)
+            elif inside and line.startswith("Pss:"):
+                total += int(line.split()[1])
+    return total
+
+
+def _map_and_touch(path, ready, done, out):
+    model = factor_model.FactorModel(path)
+    float(model.item_factors.sum())  # fault every page in
+    ready.wait()
+    out.put(_pss_kb(os.path.realpath(path)))
+    done.wait()
+
+
+def shared_pss(path, processes):
+    """Per-process PSS (KB) while ``processes`` workers map ``path`` at once."""
+    ctx = multiprocessing.get_context("fork")
+    ready, done, out = ctx.Barrier(processes + 1), ctx.Event(), ctx.Queue()
+    procs = [ctx.Process(target=_map_and_touch, args=(path, ready, done, out)) for _ in range(processes)]
+    for p in procs:
+        p.start()
+    ready.wait()
+    sizes = [out.get() for _ in procs]
+    done.set()
+    for p in procs:
+        p.join()
+    return sizes
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ratings", type=int, default=1_000_000)
+    parser.add_argument("--movies", type=int, default=20_000)
+    parser.add_argument("--factors", type=int, default=32)
+    parser.add_argument("--reg", type=float, default=factor_model.DEFAULT_REG)
+    parser.add_argument("--alpha", type=float, default=factor_model.DEFAULT_ALPHA)
+    parser.add_argument("--iterations", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+
+    user_ids, movie_ids, ratings, genre_of, favourites = synthetic_ratings(args.ratings, args.movies)
+    held_out = np.random.default_rng(2).random(len(ratings)) < 0.05
+    print(f"{len(ratings)} ratings, {len(np.unique(user_ids))} users, {os.cpu_count()} CPU(s)")
+
+    start = time.perf_counter()
+    arrays = factor_model.train(
+        user_ids[~held_out],
+        movie_ids[~held_out],
+        ratings[~held_out],
+        factors=args.factors,
+        reg=args.reg,
+        alpha=args.alpha,
+        iterations=args.iterations,
+    )
+    print(f"train: {time.perf_counter() - start:.1f}s ({args.iterations} iterations)")
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        start = time.perf_counter()
+        path = factor_model.write(model_dir, arrays)
+        print(f"write: {time.perf_counter() - start:.2f}s, {os.path.getsize(path) / 1e6:.1f} MB")
+        start = time.perf_counter()
+        model = factor_model.FactorStore(model_dir).get()
+        print(f"load (mmap): {(time.perf_counter() - start) * 1000:.2f} ms")
+
+        rng = np.random.default_rng(1)
+        order = np.argsort(user_ids, kind="stable")
+        bounds = np.searchsorted(user_ids[order], np.arange(1, user_ids.max() + 2))
+        samples, on_genre = [], []
+        found = wanted = 0
+        for uid in rng.integers(1, user_ids.max() + 1, args.queries):
+            rows = order[bounds[uid - 1]:bounds[uid]]
+            train_rows, test_rows = rows[~held_out[rows]], rows[held_out[rows]]
+            history = dict(zip(movie_ids[train_rows].tolist(), ratings[train_rows].tolist()))
+            start = time.perf_counter()
+            picks = model.recommend(history, 20)
+            samples.append((time.perf_counter() - start) * 1000)
+            if picks:
+                picked = np.array([mid for mid, _ in picks])
+                on_genre.append(np.isin(genre_of[picked - 1], favourites[uid - 1]).mean())
+                liked = test_rows[ratings[test_rows] >= ratings[rows].mean()]
+                found += int(np.isin(movie_ids[liked], picked).sum())
+                wanted += len(liked)
+        samples.sort()
+        print(
+            f"query: p50 {statistics.median(samples):.2f} ms, "
+            f"p99 {samples[int(len(samples) * 0.99) - 1]:.2f} ms"
+        )
+        print(f"picks from the user's favoured genres: {np.mean(on_genre):.0%} (random: {2 / GENRES:.0%})")
+        print(f"held-out liked movies in the top 20: {found / max(wanted, 1):.1%}")
+
+        if os.path.exists("/proc/self/smaps") and args.processes:
+            sizes = shared_pss(path, args.processes)
+            print(
+                f"{args.processes} processes mapping the model: "
+                f"PSS {statistics.mean(sizes) / 1024:.1f} MB each, {sum(sizes) / 1024:.1f} MB total "
+                f"(item factors {model.item_factors.nbytes / 2**20:.1f} MB per private copy)"
+            )
+
+
+if __name__ == "__main__":
+    main_()
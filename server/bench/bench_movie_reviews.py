@@ -0,0 +1,89 @@
+"""Query count and latency of building a movie's review list.
+
+Compares the old per-review ``rev.user.username`` lazy load (N+1 queries)
+with the joined projection in ``review_store.movie_page``, and fails if the
+new path issues more than its two fixed queries (next-cursor probe + page).
+
+    python bench/bench_movie_reviews.py [--reviews 500]
+"""
+
+import argparse
+
+from sqlalchemy import event
+
+from common import load_app, timed
+
+MOVIE_ID = 550
+
+
+class QueryCounter:
+    """Count statements sent to the database while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reviews", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app_mod = load_app()
+    app, db, Review, User = app_mod.app, app_mod.db, app_mod.Review, app_mod.User
+    with app.app_context():
+        users = [User(username=f"reviewer{i}") for i in range(args.reviews)]
+        db.session.add_all(users)
+        db.session.flush()
+        db.session.add_all(
+            Review(movie_id=MOVIE_ID, user_id=u.id, rating=i % 10 + 1, comment=f"comment {i}")
+            for i, u in enumerate(users)
+        )
+        db.session.commit()
+
+        def orm_loop():
+            # The previous implementation
+            db.session.expire_all()
+            return [
+                {
+                    "username": rev.user.username,
+                    "display_name": rev.user.username,
+                    "rating": rev.rating,
+                    "comment": rev.comment,
+                }
+                for rev in Review.query.filter_by(movie_id=MOVIE_ID).all()
+            ]
+
+        def projection():
+            db.session.expire_all()
+            items, _ = app_mod.review_store.movie_page(MOVIE_ID, None, args.reviews)
+            return list(items)
+
+        with QueryCounter(db.engine) as old:
+            old_rows = orm_loop()
+        with QueryCounter(db.engine) as new:
+            new_rows = projection()
+        assert sorted(map(str, old_rows)) == sorted(map(str, new_rows))
+        assert new.count == 2, f"expected 2 queries for the review list, got {new.count}"
+
+        old_ms = timed(orm_loop, args.repeat)
+        new_ms = timed(projection, args.repeat)
+        print(f"{'path':>12} {'queries':>8} {'ms':>8}")
+        print(f"{'orm loop':>12} {old.count:>8} {old_ms:8.2f}")
+        print(f"{'projection':>12} {new.count:>8} {new_ms:8.2f}")
+
+
+if __name__ == "__main__":
+    main_()
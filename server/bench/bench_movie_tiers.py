@@ -0,0 +1,94 @@
+"""Median /api/movie/<id> latency for hot movies with and without the L1 tier.
+
+Warms the hottest N movies (TOP_MOVIE_CACHE_SIZE by default), then replays
+requests against them with the in-process L1 cache on and off. Redis is
+fakeredis unless --redis-url is given. Finally checks that a review written
+through "another worker" (a separate Redis connection) is visible on the
+next read, i.e. pub/sub invalidation keeps L1 from serving stale reviews.
+
+    python bench/bench_movie_tiers.py [--movies 200] [--requests 5000]
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from common import load_app
+from fakes import FakeTMDB
+
+
+def _latencies(client, ids, n):
+    samples = []
+    for _ in range(n):
+        mid = random.choice(ids)
+        start = time.perf_counter()
+        resp = client.get(f"/api/movie/{mid}")
+        samples.append((time.perf_counter() - start) * 1000)
+        assert resp.status_code == 200
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--redis-url")
+    args = parser.parse_args()
+
+    with FakeTMDB() as tmdb:
+        app_mod = load_app(TMDB_BASE_URL=f"{tmdb.url}3/")
+        if args.redis_url:
+            import redis
+
+            make_client = lambda: redis.from_url(args.redis_url)  # noqa: E731
+        else:
+            import fakeredis
+
+            server = fakeredis.FakeServer()
+            make_client = lambda: fakeredis.FakeRedis(server=server)  # noqa: E731
+        app_mod.redis_client = make_client()
+        app_mod.movie_versions.redis = app_mod.redis_client
+        app_mod.view_counter.redis = app_mod.redis_client
+        app_mod.view_counter.start()
+        app_mod.movie_versions.subscribe(
+            app_mod._drop_local_movies, on_reset=app_mod.movie_l1.clear
+        )
+        app_mod.get_wikipedia_link = lambda title: "#"
+        client = app_mod.app.test_client()
+
+        ids = list(range(1, args.movies + 1))
+        for mid in ids:
+            client.get(f"/api/movie/{mid}")
+
+        l1 = app_mod.movie_l1
+        p50, p99 = _latencies(client, ids, args.requests)
+        print(f"L1 on : p50={p50:.3f} ms p99={p99:.3f} ms  {l1.stats()}")
+        max_entries, l1.max_entries = l1.max_entries, 0
+        l1.clear()
+        p50, p99 = _latencies(client, ids, args.requests)
+        print(f"L1 off: p50={p50:.3f} ms p99={p99:.3f} ms")
+        l1.max_entries = max_entries
+        print("tiers:", client.get("/api/health/caches").get_json())
+
+        # A review written by another worker must show up on our next read
+        mid = ids[0]
+        client.get(f"/api/movie/{mid}")
+        with app_mod.app.app_context():
+            user = app_mod.User(username="other-worker")
+            app_mod.db.session.add(user)
+            app_mod.db.session.flush()
+            app_mod.db.session.add(app_mod.Review(movie_id=mid, user_id=user.id, rating=1))
+            app_mod.db.session.commit()
+        other = app_mod.MovieVersions(make_client(), app_mod.cache)
+        other.bump([mid])
+        start = time.perf_counter()
+        while not client.get(f"/api/movie/{mid}").get_json()["reviews"]:
+            assert time.perf_counter() - start < 2, "stale reviews served from L1"
+            time.sleep(0.005)
+        print(f"cross-worker invalidation visible after {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,83 @@
+"""Latency of /api/my-reviews title resolution against a local fake TMDB.
+
+Compares the old one-request-per-review loop with the batched resolver,
+cold (empty title cache and no stored movies) and warm, for 1/50/500
+reviews. Each run reads the whole list, following X-Next-Cursor, and the
+TMDB calls of one cold and one warm run are counted.
+
+    python bench/bench_my_reviews.py [--latency 0.02]
+"""
+
+import argparse
+
+import requests
+
+from common import load_app, timed
+from fakes import FakeTMDB
+
+SIZES = (1, 50, 500)
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.02, help="fake TMDB latency (s)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with FakeTMDB(latency=args.latency) as tmdb:
+        app_mod = load_app(TMDB_BASE_URL=f"{tmdb.url}3/")
+        app, db = app_mod.app, app_mod.db
+        client = app.test_client()
+
+        print(f"{'reviews':>8} {'serial ms':>10} {'cold ms':>10} {'warm ms':>10} {'TMDB cold/warm':>14}")
+        for size in SIZES:
+            username = f"bench{size}"
+            with app.app_context():
+                user = app_mod.User(username=username)
+                db.session.add(user)
+                db.session.flush()
+                db.session.add_all(
+                    app_mod.Review(movie_id=1000 + i, user_id=user.id, rating=7)
+                    for i in range(size)
+                )
+                db.session.commit()
+                movie_ids = [1000 + i for i in range(size)]
+
+            def serial():
+                # The previous implementation: one blocking call per review
+                with requests.Session() as http:
+                    for mid in movie_ids:
+                        http.get(f"{app_mod.BASE_URL}{mid}?api_key=bench").json()
+
+            def read_all(username=username, size=size):
+                reviews, cursor = [], None
+                while True:
+                    query = f"&cursor={cursor}" if cursor else ""
+                    resp = client.get(f"/api/my-reviews?username={username}{query}")
+                    assert resp.status_code == 200
+                    reviews.extend(resp.get_json())
+                    cursor = resp.headers.get("X-Next-Cursor")
+                    if not cursor:
+                        break
+                assert len(reviews) == size
+                assert all(r["movie_title"] != "Unknown" for r in reviews)
+
+            def cold(movie_ids=movie_ids):
+                app_mod.cache.clear()
+                with app.app_context():
+                    app_mod.Movie.query.filter(app_mod.Movie.id.in_(movie_ids)).delete()
+                    db.session.commit()
+                read_all()
+
+            serial_ms = timed(serial, args.repeat)
+            tmdb.reset()
+            cold_ms = timed(cold, args.repeat)
+            cold_calls = tmdb.calls // args.repeat
+            tmdb.reset()
+            warm_ms = timed(read_all, args.repeat)
+            warm_calls = tmdb.calls // args.repeat
+            print(f"{size:>8} {serial_ms:>10.1f} {cold_ms:>10.1f} {warm_ms:>10.1f} {cold_calls:>6}/{warm_calls}")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,86 @@
+"""Build time and query latency of the item-item recommender at 1M ratings.
+
+Ratings are synthetic but structured: movies belong to genres, each user
+favours two genres and rates those higher, so the share of recommendations
+from a user's favoured genres shows whether the neighbours are meaningful.
+
+    python bench/bench_recommender.py [--ratings 1000000] [--movies 20000] [--k 50]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommender import build_index  # noqa: E402
+
+GENRES = 40
+PER_USER = 20
+
+
+def synthetic_ratings(n_ratings, n_movies, seed=0):
+    rng = np.random.default_rng(seed)
+    # Over-generate: popular movies repeat within a user and are dropped below
+    n_users = int(n_ratings * 1.4) // PER_USER
+    genre_of = rng.integers(0, GENRES, n_movies)
+    by_genre = [np.flatnonzero(genre_of == g) for g in range(GENRES)]
+    favourites = rng.integers(0, GENRES, (n_users, 2))
+    user_ids = np.repeat(np.arange(1, n_users + 1), PER_USER)
+    # 80% of each user's ratings come from their favoured genres
+    liked = rng.random(n_users * PER_USER) < 0.8
+    pick = favourites[user_ids - 1, rng.integers(0, 2, n_users * PER_USER)]
+    movies = rng.integers(0, n_movies, n_users * PER_USER)
+    for g in range(GENRES):
+        rows = np.flatnonzero(liked & (pick == g))
+        # Zipf-ish popularity inside a genre
+        ranks = np.minimum(rng.zipf(1.3, len(rows)) - 1, len(by_genre[g]) - 1)
+        movies[rows] = by_genre[g][ranks]
+    ratings = np.where(liked, rng.integers(7, 11, len(liked)), rng.integers(1, 6, len(liked)))
+    # Drop duplicate (user, movie) pairs, as the unique index would
+    _, keep = np.unique(user_ids * n_movies + movies, return_index=True)
+    keep = np.sort(rng.permutation(keep)[:n_ratings])
+    return user_ids[keep], movies[keep] + 1, ratings[keep], genre_of, favourites
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ratings", type=int, default=1_000_000)
+    parser.add_argument("--movies", type=int, default=20_000)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+
+    user_ids, movie_ids, ratings, genre_of, favourites = synthetic_ratings(args.ratings, args.movies)
+    print(f"{len(ratings)} ratings, {len(np.unique(user_ids))} users, {len(np.unique(movie_ids))} movies")
+
+    start = time.perf_counter()
+    index = build_index(user_ids, movie_ids, ratings, k=args.k)
+    print(f"build: {time.perf_counter() - start:.2f}s, index {index.stats()['bytes'] / 1e6:.1f} MB")
+
+    rng = np.random.default_rng(1)
+    order = np.argsort(user_ids, kind="stable")
+    bounds = np.searchsorted(user_ids[order], np.arange(1, user_ids.max() + 2))
+    samples, on_genre = [], []
+    for uid in rng.integers(1, user_ids.max() + 1, args.queries):
+        rows = order[bounds[uid - 1]:bounds[uid]]
+        history = dict(zip(movie_ids[rows].tolist(), ratings[rows].tolist()))
+        start = time.perf_counter()
+        picks = index.recommend(history, 20)
+        samples.append((time.perf_counter() - start) * 1000)
+        genres = genre_of[np.array([mid for mid, _ in picks]) - 1]
+        on_genre.append(np.isin(genres, favourites[uid - 1]).mean())
+    samples.sort()
+    print(
+        f"query: p50 {statistics.median(samples):.2f} ms, "
+        f"p99 {samples[int(len(samples) * 0.99) - 1]:.2f} ms"
+    )
+    print(f"picks from the user's favoured genres: {np.mean(on_genre):.0%} (random: {2 / GENRES:.0%})")
+
+
+if __name__ == "__main__":
+    main_()
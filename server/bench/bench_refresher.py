@@ -0,0 +1,111 @@
+"""Refresh-ahead of the top-N movie cache under a TMDB budget.
+
+Seeds a top-N of fresh, stale and never-stored movies in the views zset
+(fakeredis), then samples once a second how many ``topmovie:<id>`` entries
+exist: first with entries only written on first read and left to expire,
+then with ``TopMovieRefresher`` running. A last phase makes TMDB fail and
+checks the entries are still kept warm from the stored copies.
+
+    python bench/bench_refresher.py [--top 60] [--ttl 8] [--seconds 20] [--budget 12]
+"""
+
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert
+
+from common import load_app
+from fakes import FakeTMDB, FakeWikipedia
+from loadtest import _use_redis
+
+
+def _sample(redis_client, keys, seconds):
+    """Fraction of ``keys`` present, sampled once a second: ``(min, mean)``."""
+    present = []
+    for _ in range(seconds):
+        time.sleep(1)
+        present.append(sum(redis_client.exists(k) for k in keys) / len(keys))
+    return min(present), sum(present) / len(present)
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top", type=int, default=60)
+    parser.add_argument("--ttl", type=int, default=8, help="TOP_MOVIE_TTL_SECS")
+    parser.add_argument("--seconds", type=int, default=20, help="length of each phase")
+    parser.add_argument("--budget", type=float, default=12, help="TMDB refetches per minute")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake TMDB latency (s)")
+    args = parser.parse_args()
+
+    with FakeTMDB(args.latency) as tmdb, FakeWikipedia() as wiki_fake:
+        app_mod = load_app(
+            TMDB_BASE_URL=f"{tmdb.url}3/",
+            WIKIPEDIA_API_URL=wiki_fake.api_url,
+            TOP_MOVIE_CACHE_SIZE=args.top,
+            TOP_MOVIE_TTL_SECS=args.ttl,
+            TOP_MOVIE_REFRESH_SECS=1,
+            **_use_redis(None),
+        )
+        import refresher
+
+        app, db, r = app_mod.app, app_mod.db, app_mod.redis_client
+        ids = list(range(1, args.top + 1))
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        # A third fresh, a third stale (due a TMDB refetch), a third never stored
+        third = args.top // 3
+        with app.app_context():
+            db.session.execute(
+                insert(app_mod.Movie),
+                [
+                    {"id": mid, "title": f"Movie {mid}", "genres": [], "wiki_link": "#",
+                     "fetched_at": now if mid <= third else now - timedelta(days=2)}
+                    for mid in ids[:2 * third]
+                ],
+            )
+            db.session.commit()
+        r.zadd(app_mod.TOP_MOVIE_ZSET, {str(mid): args.top - mid + 1 for mid in ids})
+        keys = [app_mod._top_movie_key(mid) for mid in ids]
+        while not app_mod.view_counter.is_top(ids[-1]):
+            time.sleep(0.1)
+
+        # Without a refresher: entries written by a first read, then left to expire
+        with app.app_context():
+            for mid in ids[:2 * third]:
+                app_mod._movie_body(mid, app_mod.movie_versions.current([mid]))
+        low, mean = _sample(r, keys, args.seconds)
+        print(f"no refresher      : present min {low:4.0%}, mean {mean:4.0%}")
+
+        worker = refresher.TopMovieRefresher(
+            r,
+            app_mod.movie_versions,
+            app_mod.TOP_MOVIE_ZSET,
+            app_mod._top_movie_key,
+            app_mod._render_top_movie,
+            top_n=args.top,
+            ttl_secs=args.ttl,
+            ahead_secs=args.ttl / 2,
+            tmdb_budget_per_min=args.budget,
+            interval_secs=1,
+        )
+
+        def run():
+            with app.app_context():
+                worker.run()
+
+        threading.Thread(target=run, daemon=True).start()
+        time.sleep(2)  # first pass fills what it can
+        tmdb.reset()
+        low, mean = _sample(r, keys, args.seconds)
+        allowed = args.budget * args.seconds / 60
+        print(f"refresher         : present min {low:4.0%}, mean {mean:4.0%}; "
+              f"{tmdb.calls} TMDB calls in {args.seconds}s (budget {allowed:.0f} + burst), totals {worker.totals}")
+
+        tmdb.handle = lambda *a: (503, {"status_message": "unavailable"})
+        low, mean = _sample(r, keys[:2 * third], args.seconds)
+        print(f"TMDB failing      : stored movies present min {low:4.0%}, mean {mean:4.0%}; totals {worker.totals}")
+
+
+if __name__ == "__main__":
+    main_()
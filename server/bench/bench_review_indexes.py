@@ -0,0 +1,115 @@
+"""Review lookup latency before and after the 0002 index migration.
+
+Seeds users and reviews in bulk, runs the route query shapes at migration
+0001 (no indexes), upgrades to head, and runs them again. Defaults to a
+throwaway SQLite file; pass a Postgres URL to measure that instead.
+
+    python bench/bench_review_indexes.py [--rows 2000000] [--database-url postgresql://...]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from common import load_app
+
+REVIEWS_PER_USER = 20
+MOVIES = 20000
+SEED_CHUNK = 50000
+
+
+def _seed(app_mod, rows):
+    from sqlalchemy import insert
+
+    db = app_mod.db
+    users = max(1, rows // REVIEWS_PER_USER)
+    rng = random.Random(42)
+    db.session.execute(insert(app_mod.User), [{"username": f"seed{u}"} for u in range(users)])
+    user_ids = [uid for (uid,) in db.session.query(app_mod.User.id)]
+    batch = []
+    for uid in user_ids:
+        # Distinct movies per user, so the unique (user_id, movie_id) index can be built
+        for mid in rng.sample(range(1, MOVIES + 1), REVIEWS_PER_USER):
+            batch.append({"movie_id": mid, "user_id": uid, "rating": rng.randint(1, 10)})
+        if len(batch) >= SEED_CHUNK:
+            db.session.execute(insert(app_mod.Review), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(app_mod.Review), batch)
+    db.session.commit()
+    return user_ids
+
+
+def _latency(fn, ids, repeat):
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(ids[i % len(ids)])
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def _measure(app_mod, user_ids, repeat):
+    Review = app_mod.Review
+    rng = random.Random(7)
+    movie_ids = [rng.randint(1, MOVIES) for _ in range(repeat)]
+    users = [rng.choice(user_ids) for _ in range(repeat)]
+    queries = {
+        "reviews by movie": (lambda mid: Review.query.filter_by(movie_id=mid).all(), movie_ids),
+        "reviews by user": (lambda uid: Review.query.filter_by(user_id=uid).all(), users),
+        "user+movie lookup": (
+            lambda uid: Review.query.filter_by(user_id=uid, movie_id=movie_ids[uid % repeat]).first(),
+            users,
+        ),
+    }
+    return {name: _latency(fn, ids, repeat) for name, (fn, ids) in queries.items()}
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000, help="reviews to seed")
+    parser.add_argument("--repeat", type=int, default=50, help="queries per shape")
+    parser.add_argument("--database-url", help="empty database to use (default: temp SQLite file)")
+    args = parser.parse_args()
+
+    tmp = None
+    url = args.database_url
+    if not url:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        tmp.close()
+        url = f"sqlite:///{tmp.name}"
+    try:
+        app_mod = load_app(DATABASE_URL=url)
+        from flask_migrate import downgrade, upgrade
+
+        with app_mod.app.app_context():
+            downgrade(revision="0001")
+            start = time.perf_counter()
+            user_ids = _seed(app_mod, args.rows)
+            print(f"seeded {args.rows} reviews / {len(user_ids)} users in {time.perf_counter() - start:.1f}s")
+
+            before = _measure(app_mod, user_ids, args.repeat)
+            start = time.perf_counter()
+            upgrade()
+            print(f"migration 0002 (build indexes) took {time.perf_counter() - start:.1f}s")
+            after = _measure(app_mod, user_ids, args.repeat)
+
+            print(f"{'query':>18} {'p50 before':>11} {'p50 after':>10} {'p99 before':>11} {'p99 after':>10}  (ms)")
+            for name in before:
+                print(
+                    f"{name:>18} {before[name][0]:11.2f} {after[name][0]:10.2f} "
+                    f"{before[name][1]:11.2f} {after[name][1]:10.2f}"
+                )
+            app_mod.db.session.remove()
+            app_mod.db.engine.dispose()
+    finally:
+        if tmp is not None:
+            os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    main_()
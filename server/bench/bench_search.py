@@ -0,0 +1,109 @@
+"""Queries/sec and p99 latency of local title search, and TMDB calls saved.
+
+First the index alone: synthetic titles built from a Zipf-distributed
+vocabulary, queried with whole titles, prefixes (as typed) and one-edit
+typos; "found" is how often the intended title is in the top 20. Then
+/api/search end to end against a fake TMDB with --tmdb-latency, replaying
+a skewed query stream with the local index on and off.
+
+    python bench/bench_search.py [--movies 200000] [--queries 5000]
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+
+from common import load_app
+from fakes import FakeTMDB
+
+
+def synthetic_titles(n_movies, seed=0):
+    rng = np.random.default_rng(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = ["".join(rng.choice(list(letters), rng.integers(3, 10))) for _ in range(30000)]
+    lengths = rng.integers(1, 5, n_movies)
+    picks = np.minimum(rng.zipf(1.2, lengths.sum()), len(words)) - 1
+    titles, at = {}, 0
+    for i, n in enumerate(lengths):
+        titles[i + 1] = " ".join(words[w] for w in picks[at:at + n]).title()
+        at += n
+    return titles
+
+
+def _typo(title, rng):
+    words = title.split()
+    i = max(range(len(words)), key=lambda j: len(words[j]))
+    w = words[i]
+    if len(w) < 4:
+        return None
+    k = rng.randrange(1, len(w) - 1)
+    words[i] = w[:k] + w[k + 1:] if rng.random() < 0.5 else w[:k] + w[k + 1] + w[k] + w[k + 2:]
+    return " ".join(words)
+
+
+def _report(label, samples, found=None):
+    samples.sort()
+    qps = len(samples) / (sum(samples) / 1000)
+    line = (
+        f"{label:<14} {qps:8.0f} q/s  p50 {statistics.median(samples):.3f} ms  "
+        f"p99 {samples[int(len(samples) * 0.99) - 1]:.3f} ms"
+    )
+    if found is not None:
+        line += f"  found {found:.1%}"
+    print(line)
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--tmdb-latency", type=float, default=0.08)
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    with FakeTMDB(latency=args.tmdb_latency) as tmdb:
+        app_mod = load_app(TMDB_BASE_URL=f"{tmdb.url}3/")
+        index = app_mod.title_index
+        titles = synthetic_titles(args.movies)
+        start = time.perf_counter()
+        index.add({"id": mid, "title": title, "poster_path": None} for mid, title in titles.items())
+        print(f"index: {args.movies} titles in {time.perf_counter() - start:.1f}s, {index.stats()}")
+
+        ids = rng.sample(sorted(titles), args.queries)
+        kinds = {
+            "whole title": [(mid, titles[mid]) for mid in ids],
+            "prefix": [(mid, titles[mid][: max(3, len(titles[mid]) * 2 // 3)]) for mid in ids],
+            "typo": [(mid, q) for mid in ids if (q := _typo(titles[mid], rng))],
+        }
+        for label, queries in kinds.items():
+            samples, found = [], 0
+            for mid, query in queries:
+                start = time.perf_counter()
+                results = index.search(query, 20)
+                samples.append((time.perf_counter() - start) * 1000)
+                found += any(r["title"] == titles[mid] for r in results)
+            _report(label, samples, found / len(queries))
+
+        # A skewed stream: popular titles are searched far more often
+        weights = 1 / np.arange(1, len(ids) + 1)
+        stream = rng.choices(kinds["prefix"], weights=weights.tolist(), k=args.queries)
+        client = app_mod.app.test_client()
+        for label, min_local in (("local index", app_mod.SEARCH_MIN_LOCAL_RESULTS), ("TMDB only", 10**9)):
+            app_mod.SEARCH_MIN_LOCAL_RESULTS = min_local
+            app_mod.cache.clear()
+            tmdb.reset()
+            samples = []
+            for _, query in stream:
+                start = time.perf_counter()
+                resp = client.get("/api/search", query_string={"query": query})
+                samples.append((time.perf_counter() - start) * 1000)
+                assert resp.status_code == 200
+            _report(f"/api/search, {label}", samples)
+            print(f"    TMDB calls: {tmdb.calls} for {len(stream)} requests")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,91 @@
+"""Cost of resolving the session: encoding size, per-lookup time and req/s.
+
+Compares the earlier single JSON blob (tokens included, read with a Redis
+GET and ``json.loads`` at every call site) against the binary identity,
+with the in-process identity cache on and off. Redis is fakeredis unless
+--redis-url is given, so the Redis round trip is only a lower bound.
+
+    python bench/bench_sessions.py [--lookups 20000] [--requests 2000]
+"""
+
+import argparse
+import json
+import time
+
+from common import load_app
+from fakes import FakeCognito
+
+
+def _per_call_us(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def _throughput(client, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        assert client.get("/api/recommendations?limit=10").status_code == 200
+    return n / (time.perf_counter() - start)
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--redis-url")
+    args = parser.parse_args()
+
+    if args.redis_url:
+        import redis
+
+        client_redis = redis.from_url(args.redis_url)
+    else:
+        import fakeredis
+
+        client_redis = fakeredis.FakeRedis()
+
+    with FakeCognito() as cognito:
+        app_mod = load_app(COGNITO_ISSUER=cognito.issuer, COGNITO_CLIENT_ID=cognito.client_id)
+        sessions = app_mod.sessions
+        store = app_mod.session_store
+        store.redis = client_redis
+        token = cognito.sign("alice", name="Alice Example")
+        claims = app_mod._verify_id_token(token)
+        sess = {
+            "id_token": token,
+            "access_token": token,
+            "sub": claims["sub"],
+            "username": "alice",
+            "email": "alice@example.com",
+            "display_name": claims["name"],
+            "iat": claims["iat"],
+            "exp": claims["exp"],
+            "verified_until": claims["exp"],
+            "user_id": 1,
+        }
+        legacy = json.dumps(sess)
+        print(f"session blob  : JSON {len(legacy)} B, binary identity {len(sessions.encode(sess))} B")
+
+        client_redis.set("sess:legacy", legacy)
+        store.put("bench", sess, 3600)
+        old = _per_call_us(lambda: json.loads(client_redis.get("sess:legacy")), args.lookups)
+        new = _per_call_us(lambda: sessions.decode(client_redis.get("sess:bench")), args.lookups)
+        cached = _per_call_us(lambda: store.get("bench"), args.lookups)
+        print(f"lookup        : JSON {old:6.1f} us, binary {new:6.1f} us, in-process {cached:6.2f} us")
+        assert store.get("bench")["username"] == "alice"
+        assert store.tokens("bench")["id_token"] == token
+
+        client = app_mod.app.test_client()
+        print(f"anonymous     : {_throughput(client, args.requests):8.0f} req/s")
+        client.set_cookie(app_mod.SESSION_COOKIE_NAME, "bench")
+        print(f"signed in     : {_throughput(client, args.requests):8.0f} req/s")
+        store.local.max_entries = 0
+        store.local.clear()
+        print(f"  no L1 cache : {_throughput(client, args.requests):8.0f} req/s")
+        print(f"session L1    : {store.local.stats()}")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,99 @@
+"""Build time, query latency and recall@K of the similar-movies IVF index.
+
+The catalog is synthetic: each movie gets one to three of TMDB's genres and
+an overview drawn from a per-topic vocabulary plus common filler words, so
+neighbours share genres and topic words the way real overviews do. Recall
+is measured against a brute-force scan of the same stored embeddings.
+
+    python bench/bench_similar.py [--movies 500000] [--k 10] [--nprobe 8 16 32]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import similar  # noqa: E402
+
+GENRE_IDS = [28, 12, 16, 35, 80, 99, 18, 10751, 14, 36, 27, 10402, 9648, 10749, 878, 10770, 53, 10752, 37]
+TOPICS = 200
+TOPIC_WORDS = 60
+
+
+def synthetic_catalog(n_movies, seed=0):
+    rng = np.random.default_rng(seed)
+    words = [f"w{i}" for i in range(TOPICS * TOPIC_WORDS)]
+    filler = [f"common{i}" for i in range(2000)]
+    topics = rng.integers(0, TOPICS, n_movies)
+    n_genres = rng.integers(1, 4, n_movies)
+    for i in range(n_movies):
+        topic = topics[i]
+        own = rng.integers(0, TOPIC_WORDS, 25) + topic * TOPIC_WORDS
+        common = np.minimum(rng.zipf(1.5, 15), len(filler)) - 1
+        # Topics lean towards a couple of genres
+        genres = {GENRE_IDS[topic % len(GENRE_IDS)]}
+        genres.update(rng.choice(GENRE_IDS, n_genres[i] - 1).tolist())
+        yield {
+            "id": i + 1,
+            "title": f"Movie {words[own[0]]}",
+            "genres": [{"id": int(g), "name": str(g)} for g in genres],
+            "overview": " ".join([words[w] for w in own[1:]] + [filler[w] for w in common]),
+        }
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=500_000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32])
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    arrays = similar.build(synthetic_catalog(args.movies))
+    print(f"build: {time.perf_counter() - start:.1f}s for {args.movies} movies, {len(arrays['centroids'])} lists")
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        path = similar.write(index_dir, arrays)
+        start = time.perf_counter()
+        index = similar.SimilarIndex(path)
+        print(
+            f"load (mmap): {(time.perf_counter() - start) * 1000:.2f} ms, "
+            f"file {os.path.getsize(path) / 1e6:.0f} MB"
+        )
+
+        rng = np.random.default_rng(1)
+        movie_ids = rng.choice(index.ids, args.queries, replace=False)
+        vectors = index.codes.astype(np.float32) * index.scales[:, None]
+        exact = {}
+        for mid in movie_ids:
+            q = index.vector(mid)
+            scores = vectors @ q
+            top = np.argpartition(-scores, args.k)[:args.k + 1]
+            exact[mid] = {int(m) for m in index.list_ids[top] if m != mid}
+        del vectors
+
+        for nprobe in args.nprobe:
+            samples, recalls = [], []
+            for mid in movie_ids:
+                start = time.perf_counter()
+                found = index.search(index.vector(mid), args.k, exclude=mid, nprobe=nprobe)
+                samples.append((time.perf_counter() - start) * 1000)
+                got = {m for m, _ in found}
+                recalls.append(len(got & exact[mid]) / max(len(exact[mid]), 1))
+            samples.sort()
+            print(
+                f"nprobe {nprobe}: p50 {statistics.median(samples):.2f} ms, "
+                f"p99 {samples[int(len(samples) * 0.99) - 1]:.2f} ms, "
+                f"recall@{args.k} {np.mean(recalls):.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,77 @@
+"""Latency of /api/search/suggest, and the cost of merging in new titles.
+
+Indexes synthetic titles (see ``bench_search.py``), gives the first
+--viewed movies Zipf-distributed view counts as the ``movie:views`` zset
+would, then replays typeahead requests: every prefix of popular titles,
+one keystroke at a time. Reports the index call alone and the whole Flask
+route, then times adding batches of newly cached movies.
+
+    python bench/bench_suggest.py [--movies 200000] [--viewed 10000]
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from bench_search import synthetic_titles
+from common import load_app
+
+
+def _report(label, samples):
+    samples.sort()
+    print(
+        f"{label:<12} p50 {statistics.median(samples) * 1000:.0f} us  "
+        f"p99 {samples[int(len(samples) * 0.99) - 1] * 1000:.0f} us  ({len(samples)} requests)"
+    )
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=200_000)
+    parser.add_argument("--viewed", type=int, default=10_000)
+    parser.add_argument("--typed", type=int, default=500, help="Titles typed out key by key.")
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    app_mod = load_app()
+    index = app_mod.title_index
+    titles = synthetic_titles(args.movies)
+    start = time.perf_counter()
+    index.add({"id": mid, "title": title, "poster_path": None} for mid, title in titles.items())
+    print(f"index: {args.movies} titles in {time.perf_counter() - start:.1f}s")
+    app_mod.view_counter.views = {mid: 1000.0 / rank for rank, mid in enumerate(rng.sample(sorted(titles), args.viewed), 1)}
+
+    popular = sorted(app_mod.view_counter.views, key=app_mod.view_counter.views.get, reverse=True)
+    typed = [titles[mid] for mid in rng.choices(popular[:1000], k=args.typed)]
+    queries = [title[:n] for title in typed for n in range(1, len(title) + 1)]
+
+    index.suggest("warm", 8, views=app_mod.view_counter.views)
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        index.suggest(query, 8, views=app_mod.view_counter.views)
+        samples.append((time.perf_counter() - start) * 1000)
+    _report("index", samples)
+
+    client = app_mod.app.test_client()
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        resp = client.get("/api/search/suggest", query_string={"query": query})
+        samples.append((time.perf_counter() - start) * 1000)
+        assert resp.status_code == 200
+    _report("route", samples)
+
+    next_id = args.movies + 1
+    for batch in (1, 100, 1000):
+        new = [{"id": next_id + i, "title": f"New Release {next_id + i}", "poster_path": None} for i in range(batch)]
+        next_id += batch
+        start = time.perf_counter()
+        index.add(new)
+        print(f"add {batch:>4} new titles: {(time.perf_counter() - start) * 1000:.1f} ms")
+    assert index.suggest(f"new release {next_id - 1}", 1)[0]["id"] == next_id - 1
+
+
+if __name__ == "__main__":
+    main_()
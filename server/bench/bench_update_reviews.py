@@ -0,0 +1,69 @@
+"""Throughput of /api/update-reviews for 10/100/1000-item batches.
+
+Compares the old per-item ``filter_by(id=...).first()`` loop with
+``review_store.bulk_update`` (one IN query + one executemany), and checks
+that the bulk path's query count does not grow with the batch size.
+
+    python bench/bench_update_reviews.py [--database-url postgresql://...]
+"""
+
+import argparse
+
+from common import load_app, timed
+from bench_movie_reviews import QueryCounter
+
+SIZES = (10, 100, 1000)
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url", help="empty database to use (default: in-memory SQLite)")
+    args = parser.parse_args()
+
+    env = {"DATABASE_URL": args.database_url} if args.database_url else {}
+    app_mod = load_app(**env)
+    app, db, Review, User = app_mod.app, app_mod.db, app_mod.Review, app_mod.User
+    with app.app_context():
+        user = User(username="bulk-editor")
+        db.session.add(user)
+        db.session.flush()
+        reviews = [Review(movie_id=5000 + i, user_id=user.id, rating=5) for i in range(max(SIZES))]
+        db.session.add_all(reviews)
+        db.session.commit()
+        user_id, review_ids = user.id, [r.id for r in reviews]
+
+        print(f"{'items':>6} {'loop ms':>9} {'bulk ms':>9} {'loop items/s':>13} {'bulk items/s':>13} {'bulk queries':>13}")
+        for size in SIZES:
+            rating = [1]
+
+            def batch():
+                rating[0] = rating[0] % 10 + 1
+                return [{"id": rid, "rating": rating[0], "comment": "edited"} for rid in review_ids[:size]]
+
+            def loop():
+                # The previous implementation
+                for update in batch():
+                    review = Review.query.filter_by(id=update["id"]).first()
+                    if review:
+                        review.rating = update["rating"]
+                        review.comment = update["comment"]
+                db.session.commit()
+
+            def bulk():
+                results, _ = app_mod.review_store.bulk_update(user_id, batch())
+                db.session.commit()
+                assert all(r["status"] == "updated" for r in results)
+
+            loop_ms = timed(loop, args.repeat)
+            bulk_ms = timed(bulk, args.repeat)
+            with QueryCounter(db.engine) as queries:
+                bulk()
+            print(
+                f"{size:>6} {loop_ms:9.1f} {bulk_ms:9.1f} {size / loop_ms * 1000:13.0f} "
+                f"{size / bulk_ms * 1000:13.0f} {queries.count:>13}"
+            )
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,77 @@
+"""Wikipedia link resolution: batched job vs. one search per title, and negative caching.
+
+Seeds movies without links, then resolves them with ``wiki.resolve_pending``
+against a local MediaWiki stand-in and compares its requests and time with
+one search per title (the previous per-request lookup). Finally reads a
+movie whose lookup misses several times and checks Wikipedia is asked once.
+
+    python bench/bench_wiki.py [--movies 2000] [--latency 0.05]
+"""
+
+import argparse
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+
+from bench_search import synthetic_titles
+from common import load_app
+from fakes import FakeTMDB, FakeWikipedia
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake Wikipedia latency (s)")
+    parser.add_argument("--reads", type=int, default=20)
+    args = parser.parse_args()
+
+    with FakeWikipedia(args.latency) as wiki_fake, FakeTMDB() as tmdb:
+        app_mod = load_app(WIKIPEDIA_API_URL=wiki_fake.api_url, TMDB_BASE_URL=f"{tmdb.url}3/")
+        import wiki
+
+        app, db = app_mod.app, app_mod.db
+        titles = synthetic_titles(args.movies, seed=3)
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        with app.app_context():
+            db.session.execute(
+                insert(app_mod.Movie),
+                [{"id": mid, "title": t, "genres": [], "fetched_at": now} for mid, t in titles.items()],
+            )
+            db.session.commit()
+
+            sample = list(titles.values())[:200]
+            start = time.perf_counter()
+            for title in sample:
+                wiki.search(title)
+            per_title = (time.perf_counter() - start) / len(sample)
+            print(f"one search per title : {len(titles) * per_title:7.1f} s, {len(titles)} requests "
+                  f"(extrapolated from {len(sample)})")
+
+            wiki_fake.reset()
+            start = time.perf_counter()
+            found, missed = wiki.resolve_pending(limit=len(titles))
+            print(f"resolve_pending      : {time.perf_counter() - start:7.1f} s, {wiki_fake.calls} requests, "
+                  f"{found} found, {missed} missed")
+            wiki_fake.reset()
+            again = wiki.resolve_pending(limit=len(titles))
+            print(f"immediately again    : {wiki_fake.calls} requests, {again[0] + again[1]} movies due")
+
+            # A movie no lookup can find: a miss that "(film)" and search agree on
+            mid = next(m for m, t in titles.items()
+                       if wiki_fake._kind(f"{t} (film)") % 4 == 0 and wiki_fake._kind(t) % 5 == 0)
+            rec = db.session.get(app_mod.Movie, mid)
+            rec.wiki_link, rec.wiki_checked_at, rec.wiki_misses = None, None, 0
+            db.session.commit()
+
+        client = app.test_client()
+        wiki_fake.reset()
+        for _ in range(args.reads):
+            assert client.get(f"/api/movie/{mid}").status_code == 200
+            app_mod.cache.clear()
+            app_mod.movie_l1.clear()
+        print(f"{args.reads} uncached reads of a movie without an article: {wiki_fake.calls} Wikipedia requests")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,89 @@
+"""Incremental recommender updates vs. a full rebuild over the same ratings.
+
+Builds the index from synthetic ratings, replays a stream of new, changed
+and deleted ratings through ``ItemIndex.apply`` in poll-sized batches, then
+rebuilds from the final ratings and compares neighbour lists and scores.
+Finally replays the newest entries again, as every poll does, and checks
+that nothing is recomputed.
+
+    python bench/check_recommender_consistency.py [--ratings 200000] [--events 5000]
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from bench_recommender import synthetic_ratings
+from recommender import build_index, compare  # server/ is on sys.path via bench_recommender
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ratings", type=int, default=200_000)
+    parser.add_argument("--movies", type=int, default=5_000)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=100, help="events per consumer poll")
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--replay", type=int, default=1000, help="entries re-read every poll")
+    args = parser.parse_args()
+
+    user_ids, movie_ids, ratings, _, _ = synthetic_ratings(args.ratings, args.movies)
+    rng = np.random.default_rng(3)
+    # Hold some ratings back to arrive as new reviews; change and delete others
+    order = rng.permutation(len(ratings))
+    n_new = args.events * 6 // 10
+    n_change = args.events * 2 // 10
+    n_delete = args.events - n_new - n_change
+    new = order[:n_new]
+    changed = order[n_new:n_new + n_change]
+    deleted = order[n_new + n_change:n_new + n_change + n_delete]
+    base = np.ones(len(ratings), dtype=bool)
+    base[new] = False
+
+    final = {(int(u), int(m)): int(r) for u, m, r in zip(user_ids[base], movie_ids[base], ratings[base])}
+    events = [(int(user_ids[i]), int(movie_ids[i]), int(ratings[i])) for i in new]
+    events += [(int(user_ids[i]), int(movie_ids[i]), int(rng.integers(1, 11))) for i in changed]
+    events += [(int(user_ids[i]), int(movie_ids[i]), None) for i in deleted]
+    events = [events[i] for i in rng.permutation(len(events))]
+
+    index = build_index(user_ids[base], movie_ids[base], ratings[base], k=args.k)
+    batches = []
+    for start in range(0, len(events), args.batch):
+        chunk = events[start:start + args.batch]
+        began = time.perf_counter()
+        index.apply(chunk)
+        batches.append((time.perf_counter() - began) * 1000)
+        for user_id, movie_id, rating in chunk:
+            if rating is None:
+                final.pop((user_id, movie_id), None)
+            else:
+                final[(user_id, movie_id)] = rating
+
+    replay = events[-args.replay:]
+    began = time.perf_counter()
+    recomputed = [index.apply(replay) for _ in range(2)]
+    replay_ms = (time.perf_counter() - began) * 1000 / 2
+    assert recomputed == [0, 0], f"replaying applied entries recomputed {recomputed} rows"
+
+    keys = np.array(list(final.keys()), dtype=np.int64).reshape(-1, 2)
+    values = np.array(list(final.values()), dtype=np.int64)
+    began = time.perf_counter()
+    full = build_index(keys[:, 0], keys[:, 1], values, k=args.k)
+    rebuild_ms = (time.perf_counter() - began) * 1000
+    # A rebuild re-reads entries its snapshot already holds
+    assert full.apply(replay) == 0, "replaying entries into a fresh build recomputed rows"
+
+    batches.sort()
+    print(f"{len(events)} events in batches of {args.batch}: "
+          f"p50 {statistics.median(batches):.0f} ms, max {batches[-1]:.0f} ms per batch")
+    print(f"replaying the newest {len(replay)} entries: {recomputed} rows recomputed, {replay_ms:.1f} ms each")
+    print(f"full rebuild: {rebuild_ms:.0f} ms")
+    result = compare(index, full)
+    print(f"neighbour overlap {result['overlap']:.4f}, max score diff {result['max_score_diff']:.2e} "
+          f"over {result['movies']} movies")
+
+
+if __name__ == "__main__":
+    main_()
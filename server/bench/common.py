@@ -0,0 +1,37 @@
+"""Helpers for running the Flask app against local fakes."""
+
+import os
+import statistics
+import sys
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_app(**env):
+    """Import ``main`` with the given environment overrides applied first."""
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    os.environ.setdefault("CACHE_TYPE", "SimpleCache")
+    os.environ.setdefault("SECRET_KEY", "bench")
+    os.environ.setdefault("API_KEY", "bench")
+    # Benchmarks rebuild recommendations explicitly when they need them
+    os.environ.setdefault("RECOMMENDER_REBUILD_SECS", "0")
+    os.environ.setdefault("SEARCH_REFRESH_SECS", "0")
+    os.environ.update({k: str(v) for k, v in env.items()})
+    if SERVER_DIR not in sys.path:
+        sys.path.insert(0, SERVER_DIR)
+    import main
+
+    with main.app.app_context():
+        main.upgrade_db()
+    return main
+
+
+def timed(fn, repeat=5):
+    """Run ``fn`` ``repeat`` times and return the median wall time in ms."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
@@ -0,0 +1,226 @@
+"""Local stand-ins for the upstream APIs used by the benchmarks."""
+
+import json
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeUpstream:
+    """Threaded HTTP server that answers with JSON after a fixed latency."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def handle(self, method, path, query, body):
+        """Return ``(status, payload)`` for one request; override in subclasses."""
+        return 404, {"error": "not found"}
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _respond(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                with fake._lock:
+                    fake.calls += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+                parsed = urlparse(self.path)
+                status, payload = fake.handle(
+                    method, parsed.path, parse_qs(parsed.query), body
+                )
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._respond("GET")
+
+            def do_POST(self):
+                self._respond("POST")
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+_MOVIE_PATH = re.compile(r"^/3/movie/(\d+)$")
+
+
+class FakeTMDB(FakeUpstream):
+    """Serves deterministic ``/3/movie/<id>`` payloads for any ID, and title searches."""
+
+    def handle(self, method, path, query, body):
+        if path == "/3/search/movie":
+            text = query.get("query", [""])[0]
+            return 200, {
+                "results": [
+                    {"id": 10_000_000 + i, "title": f"{text} {i}", "poster_path": None}
+                    for i in range(20)
+                ]
+            }
+        match = _MOVIE_PATH.match(path)
+        if not match:
+            return 404, {"status_message": "not found"}
+        movie_id = int(match.group(1))
+        return 200, {
+            "id": movie_id,
+            "title": f"Movie {movie_id}",
+            "tagline": "",
+            "genres": [{"id": 18, "name": "Drama"}],
+            "poster_path": f"/poster{movie_id}.jpg",
+            "overview": f"Overview of movie {movie_id}.",
+        }
+
+
+class FakeWikipedia(FakeUpstream):
+    """MediaWiki ``action=query`` stand-in for searches and multi-title page lookups.
+
+    Whether a movie has an article is fixed by a hash of its title: about
+    one in five searches finds nothing, and "<title> (film)" pages are
+    missing, a redirect, an article or a disambiguation page in turn.
+    """
+
+    @staticmethod
+    def _kind(text: str) -> int:
+        return zlib.crc32(text.encode("utf-8"))
+
+    def handle(self, method, path, query, body):
+        if path != "/w/api.php" or query.get("action") != ["query"]:
+            return 404, {"error": {"code": "badvalue"}}
+        if query.get("list") == ["search"]:
+            text = query.get("srsearch", [""])[0]
+            hits = [] if self._kind(text) % 5 == 0 else [{"ns": 0, "title": f"{text} (film)"}]
+            return 200, {"query": {"search": hits}}
+        if "titles" in query:
+            return 200, {"query": self._pages(query["titles"][0].split("|"))}
+        return 400, {"error": {"code": "unsupported"}}
+
+    def _pages(self, names):
+        if len(names) > 50:
+            return {"warnings": "too many titles"}
+        normalized, redirects, pages = [], [], []
+        for name in names:
+            title = name[:1].upper() + name[1:]
+            if title != name:
+                normalized.append({"from": name, "to": title})
+            base = title[:-len(" (film)")] if title.endswith(" (film)") else None
+            kind = self._kind(base) % 4 if base is not None else 0
+            if kind == 0:
+                pages.append({"ns": 0, "title": title, "missing": True})
+            elif kind == 1:
+                target = f"{base} (1999 film)"
+                redirects.append({"from": title, "to": target})
+                pages.append({"pageid": self._kind(target), "ns": 0, "title": target})
+            elif kind == 2:
+                pages.append({"pageid": self._kind(title), "ns": 0, "title": title})
+            else:
+                pages.append({"pageid": self._kind(title), "ns": 0, "title": title, "pageprops": {"disambiguation": ""}})
+        return {"normalized": normalized, "redirects": redirects, "pages": pages}
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.url}w/api.php"
+
+
+class FakeCognito(FakeUpstream):
+    """Cognito stand-in: a JWKS endpoint and a token endpoint that signs real RS256 tokens."""
+
+    def __init__(self, client_id: str = "bench-client", latency: float = 0.0):
+        super().__init__(latency)
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from jose import jwk
+
+        private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.private_pem = private.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        public_pem = private.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        self.kid = "bench-key"
+        self.client_id = client_id
+        self.jwks = {
+            "keys": [
+                {**jwk.construct(public_pem, "RS256").to_dict(), "kid": self.kid, "alg": "RS256", "use": "sig"}
+            ]
+        }
+
+    @property
+    def issuer(self) -> str:
+        return self.url.rstrip("/")
+
+    def sign(self, username: str, name: str = "", ttl: int = 3600) -> str:
+        """Return an ID token for ``username`` as Cognito would issue it."""
+        from jose import jwt
+
+        now = int(time.time())
+        claims = {
+            "sub": f"sub-{username}",
+            "aud": self.client_id,
+            "iss": self.issuer,
+            "token_use": "id",
+            "cognito:username": username,
+            "email": f"{username}@example.com",
+            "name": name or username.title(),
+            "iat": now,
+            "exp": now + ttl,
+        }
+        return jwt.encode(claims, self.private_pem, algorithm="RS256", headers={"kid": self.kid})
+
+    def handle(self, method, path, query, body):
+        if path == "/.well-known/jwks.json":
+            return 200, self.jwks
+        if path == "/oauth2/token" and method == "POST":
+            code = parse_qs(body.decode("utf-8")).get("code", ["user"])[0]
+            # The authorization code doubles as the username being signed in
+            return 200, {
+                "id_token": self.sign(code),
+                "access_token": f"access-{code}",
+                "expires_in": 3600,
+                "token_type": "Bearer",
+            }
+        return 404, {"error": "not found"}
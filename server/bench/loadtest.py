@@ -0,0 +1,335 @@
+"""Scripted load scenarios against the app with every upstream faked locally.
+
+Serves the app on a local threaded server backed by fake TMDB, Wikipedia
+and Cognito (``fakes.py``, with --latency per call), Redis (fakeredis, or
+--redis-url) and a seeded database (a temporary SQLite file, or
+--database-url pointing at an empty Postgres). Each scenario runs
+--requests requests from --concurrency clients after a short warm-up.
+Every client follows a seeded script, so runs are repeatable:
+
+    hot-movies   /api/movie/<id>, Zipf-distributed over the catalog, a few cold ids
+    explore      /api/explore and /api/recommendations, half signed in
+    search       typeahead bursts (/api/search/suggest per keystroke, then /api/search)
+    my-reviews   heavy reviewers paging through /api/my-reviews
+
+Results (throughput, p50/p95/p99 overall and per endpoint, upstream calls)
+are printed and, with --output, written as JSON tagged with the git commit.
+--compare diffs two such files:
+
+    python bench/loadtest.py [--scenario hot-movies ...] [--output after.json]
+    python bench/loadtest.py --compare before.json after.json
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import requests
+from sqlalchemy import insert, select
+
+from bench_search import synthetic_titles
+from common import SERVER_DIR, load_app
+from fakes import FakeCognito, FakeTMDB, FakeWikipedia
+
+COLD_MOVIE_BASE = 5_000_000  # ids above the seeded catalog; TMDB serves them
+
+
+def _use_redis(url):
+    """Point every Redis client the app creates at ``url``, or at one fakeredis server."""
+    import redis
+
+    if url is None:
+        import fakeredis
+
+        server = fakeredis.FakeServer()
+        redis.from_url = lambda *args, **kwargs: fakeredis.FakeRedis(server=server)
+        url = "redis://fakeredis:6379/0"
+    return {"CACHE_TYPE": "redis", "CACHE_REDIS_URL": url}
+
+
+def seed(app_mod, movies, users, reviews_per_user, heavy_users, heavy_reviews, seed):
+    """Seed movies, users and reviews; returns ``(titles, user ids, heavy user ids)``."""
+    import review_store
+
+    db, app = app_mod.db, app_mod.app
+    rng = random.Random(seed)
+    titles = synthetic_titles(movies, seed=seed)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    with app.app_context():
+        db.session.execute(
+            insert(app_mod.Movie),
+            [
+                {"id": mid, "title": title, "genres": [{"id": 18, "name": "Drama"}], "poster_path": None,
+                 "overview": f"Overview of {title}.", "fetched_at": now}
+                for mid, title in titles.items()
+            ],
+        )
+        db.session.execute(
+            insert(app_mod.User), [{"username": f"load{i}"} for i in range(users + heavy_users)]
+        )
+        ids = [u.id for u in app_mod.User.query.order_by(app_mod.User.id)]
+        plain, heavy = ids[:users], ids[users:]
+        for user_id in ids:
+            count = heavy_reviews if user_id in heavy else reviews_per_user
+            changes = review_store.RatingChanges(user_id)
+            rows = []
+            for mid in rng.sample(range(1, movies + 1), min(count, movies)):
+                rating = rng.randint(1, 5)
+                rows.append({"movie_id": mid, "user_id": user_id, "rating": rating, "comment": "Seeded review."})
+                changes.add(mid, rating)
+            db.session.execute(insert(app_mod.Review), rows)
+            changes.apply()
+        db.session.commit()
+    app_mod.title_index.refresh(app)
+    app_mod.recommender.rebuild(app)
+    return titles, plain, heavy
+
+
+def sign_in(app_mod, cognito, user_ids):
+    """A session id per user, stored as the Cognito callback would."""
+    sids = {}
+    with app_mod.app.app_context():
+        names = dict(app_mod.db.session.execute(
+            select(app_mod.User.id, app_mod.User.username).where(app_mod.User.id.in_(user_ids))
+        ).all())
+    for user_id in user_ids:
+        token = cognito.sign(names[user_id])
+        claims = app_mod._verify_id_token(token)
+        sid = f"load-{user_id}"
+        app_mod.session_store.put(
+            sid,
+            {**claims, "id_token": token, "access_token": f"access-{user_id}", "username": names[user_id],
+             "display_name": claims.get("name"), "verified_until": claims["exp"], "user_id": user_id},
+            3600,
+        )
+        sids[user_id] = sid
+    return sids
+
+
+# Scenarios: generators of (endpoint label, path, session id or None)
+
+
+def hot_movies(ctx, rng):
+    n = len(ctx["titles"])
+    while True:
+        if rng.random() < 0.05:
+            yield "movie (cold)", f"/api/movie/{COLD_MOVIE_BASE + rng.randrange(1_000_000)}", None
+        else:
+            yield "movie", f"/api/movie/{min(int(rng.paretovariate(1.0)), n)}", None
+
+
+def explore(ctx, rng):
+    sids = list(ctx["sids"].values())
+    while True:
+        sid = rng.choice(sids) if rng.random() < 0.5 else None
+        if rng.random() < 0.8:
+            yield "explore", "/api/explore", sid
+        else:
+            yield "recommendations", "/api/recommendations?limit=20", sid
+
+
+def search(ctx, rng):
+    titles = list(ctx["titles"].values())
+    while True:
+        query = rng.choice(titles).lower()
+        for k in range(2, min(len(query), 12) + 1):
+            yield "suggest", f"/api/search/suggest?query={requests.utils.quote(query[:k])}", None
+        yield "search", f"/api/search?query={requests.utils.quote(query)}", None
+
+
+def my_reviews(ctx, rng):
+    sids = [ctx["sids"][uid] for uid in ctx["heavy"]]
+    while True:
+        sid = rng.choice(sids)
+        cursor = None
+        for _ in range(rng.randint(1, 4)):
+            path = "/api/my-reviews?limit=50" + (f"&cursor={cursor}" if cursor else "")
+            cursor = yield "my-reviews", path, sid
+            if not cursor:
+                break
+
+
+SCENARIOS = {"hot-movies": hot_movies, "explore": explore, "search": search, "my-reviews": my_reviews}
+
+
+def _run_client(base_url, cookie_name, script, count, samples, errors):
+    with requests.Session() as http:
+        reply = None
+        for _ in range(count):
+            label, path, sid = script.send(reply)
+            start = time.perf_counter()
+            try:
+                resp = http.get(base_url + path, cookies={cookie_name: sid} if sid else None, timeout=30)
+                resp.content
+                ok = resp.status_code < 500
+                reply = resp.headers.get("X-Next-Cursor")
+            except requests.RequestException:
+                ok, reply = False, None
+            samples[label].append((time.perf_counter() - start) * 1000)
+            if not ok:
+                errors[label] += 1
+
+
+def _percentile(sorted_ms, q):
+    return sorted_ms[min(len(sorted_ms) - 1, int(q * len(sorted_ms)))] if sorted_ms else 0.0
+
+
+def _summary(samples, errors, elapsed):
+    def stats(ms, n_errors):
+        ms = sorted(ms)
+        return {
+            "requests": len(ms),
+            "errors": n_errors,
+            "throughput_rps": round(len(ms) / elapsed, 1),
+            "p50_ms": round(_percentile(ms, 0.50), 2),
+            "p95_ms": round(_percentile(ms, 0.95), 2),
+            "p99_ms": round(_percentile(ms, 0.99), 2),
+            "max_ms": round(ms[-1], 2) if ms else 0.0,
+        }
+
+    everything = [x for ms in samples.values() for x in ms]
+    result = stats(everything, sum(errors.values()))
+    result["duration_s"] = round(elapsed, 3)
+    result["endpoints"] = {label: stats(ms, errors[label]) for label, ms in sorted(samples.items())}
+    return result
+
+
+def run_scenario(name, ctx, base_url, cookie_name, concurrency, total, warmup, seed, fakes):
+    per_client = max(1, total // concurrency)
+    scripts = [SCENARIOS[name](ctx, random.Random(f"{seed}-{name}-{i}")) for i in range(concurrency)]
+
+    def run(count, samples, errors):
+        threads = [
+            threading.Thread(target=_run_client, args=(base_url, cookie_name, s, count, samples, errors))
+            for s in scripts
+        ]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return time.perf_counter() - start
+
+    run(warmup, defaultdict(list), defaultdict(int))
+    calls = {name: fake.calls for name, fake in fakes.items()}
+    samples, errors = defaultdict(list), defaultdict(int)
+    elapsed = run(per_client, samples, errors)
+    result = _summary(samples, errors, elapsed)
+    result["upstream_calls"] = {name: fake.calls - calls[name] for name, fake in fakes.items()}
+    return result
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=SERVER_DIR, capture_output=True, text=True, timeout=30).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def compare(before_path, after_path):
+    with open(before_path) as fh:
+        before = json.load(fh)
+    with open(after_path) as fh:
+        after = json.load(fh)
+    print(f"before: {before.get('commit')}  after: {after.get('commit')}")
+    print(f"{'scenario':<24} {'metric':<15} {'before':>10} {'after':>10} {'change':>8}")
+    for name, new in after["scenarios"].items():
+        old = before["scenarios"].get(name)
+        if old is None:
+            continue
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "errors"):
+            a, b = old[metric], new[metric]
+            change = f"{(b - a) / a:+.0%}" if a else "n/a"
+            print(f"{name:<24} {metric:<15} {a:>10} {b:>10} {change:>8}")
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="default: all")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per client first")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake upstream latency (s)")
+    parser.add_argument("--movies", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--reviews-per-user", type=int, default=20)
+    parser.add_argument("--heavy-users", type=int, default=5)
+    parser.add_argument("--heavy-reviews", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--redis-url", help="use a real Redis instead of fakeredis")
+    parser.add_argument("--database-url", help="an empty database to seed instead of SQLite")
+    parser.add_argument("--output", help="write results as JSON here")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="diff two --output files")
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    with tempfile.TemporaryDirectory() as tmp, FakeTMDB(args.latency) as tmdb, \
+            FakeWikipedia(args.latency) as wiki, FakeCognito(latency=args.latency) as cognito:
+        env = _use_redis(args.redis_url)
+        app_mod = load_app(
+            DATABASE_URL=args.database_url or f"sqlite:///{os.path.join(tmp, 'loadtest.db')}",
+            TMDB_BASE_URL=f"{tmdb.url}3/",
+            WIKIPEDIA_API_URL=wiki.api_url,
+            COGNITO_ISSUER=cognito.issuer,
+            COGNITO_CLIENT_ID=cognito.client_id,
+            **env,
+        )
+        start = time.perf_counter()
+        titles, plain, heavy = seed(
+            app_mod, args.movies, args.users, args.reviews_per_user, args.heavy_users, args.heavy_reviews, args.seed
+        )
+        ctx = {"titles": titles, "heavy": heavy, "sids": sign_in(app_mod, cognito, plain + heavy)}
+        print(f"seeded {args.movies} movies, {len(plain) + len(heavy)} users in {time.perf_counter() - start:.1f}s",
+              file=sys.stderr)
+
+        server = make_server("127.0.0.1", 0, app_mod.app, threaded=True, request_handler=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        fakes = {"tmdb": tmdb, "wikipedia": wiki, "cognito": cognito}
+        results = {}
+        try:
+            for name in args.scenario or list(SCENARIOS):
+                results[name] = r = run_scenario(
+                    name, ctx, base_url, app_mod.SESSION_COOKIE_NAME, args.concurrency, args.requests,
+                    args.warmup, args.seed, fakes,
+                )
+                print(f"{name:<12} {r['throughput_rps']:8.1f} req/s  p50 {r['p50_ms']:7.2f}  p95 {r['p95_ms']:7.2f}  "
+                      f"p99 {r['p99_ms']:7.2f} ms  errors {r['errors']}  upstream {r['upstream_calls']}")
+                for label, e in r["endpoints"].items():
+                    print(f"  {label:<18} {e['requests']:6d} req  p50 {e['p50_ms']:7.2f}  p99 {e['p99_ms']:7.2f} ms")
+        finally:
+            server.shutdown()
+
+    if args.output:
+        report = {
+            "commit": _git("rev-parse", "--short", "HEAD"),
+            "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+            "database": "postgresql" if args.database_url else "sqlite",
+            "redis": "redis" if args.redis_url else "fakeredis",
+            "cpus": os.cpu_count(),
+            "scenarios": results,
+        }
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main_()
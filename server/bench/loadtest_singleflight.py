@@ -0,0 +1,102 @@
+"""Fire concurrent requests at a cold movie and check only one goes upstream.
+
+Part one drives /api/movie/<id> through the Flask app with N threads (one
+worker process). Part two simulates several gunicorn workers, each with its
+own SingleFlight, sharing one Redis (fakeredis, or --redis-url).
+
+    python bench/loadtest_singleflight.py [--concurrency 64] [--workers 4]
+"""
+
+import argparse
+import threading
+import time
+
+from common import load_app
+from fakes import FakeTMDB
+
+
+def _fire(concurrency, target):
+    barrier = threading.Barrier(concurrency)
+    errors = []
+
+    def run(i):
+        barrier.wait()
+        try:
+            target(i)
+        except Exception as e:  # surfaced after join
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+    return (time.perf_counter() - start) * 1000
+
+
+def in_process(concurrency, latency):
+    with FakeTMDB(latency=latency) as tmdb:
+        app_mod = load_app(TMDB_BASE_URL=f"{tmdb.url}3/")
+        wiki_calls = []
+        app_mod.get_wikipedia_link = (
+            lambda title: wiki_calls.append(title) or "https://en.wikipedia.org/wiki/Cold"
+        )
+
+        def request(_):
+            resp = app_mod.app.test_client().get("/api/movie/4242")
+            assert resp.status_code == 200, resp.status_code
+
+        elapsed = _fire(concurrency, request)
+        print(f"in-process: {concurrency} requests in {elapsed:.0f} ms, "
+              f"TMDB calls={tmdb.calls}, wiki calls={len(wiki_calls)}")
+        assert tmdb.calls == 1, f"expected 1 upstream call, got {tmdb.calls}"
+        assert len(wiki_calls) == 1, f"expected 1 wiki lookup, got {len(wiki_calls)}"
+
+
+def cross_worker(concurrency, workers, latency, redis_url):
+    from singleflight import SingleFlight
+
+    if redis_url:
+        import redis
+
+        clients = [redis.from_url(redis_url) for _ in range(workers)]
+    else:
+        import fakeredis
+
+        server = fakeredis.FakeServer()
+        clients = [fakeredis.FakeRedis(server=server) for _ in range(workers)]
+    flights = [SingleFlight(c, lease_secs=2) for c in clients]
+    key = f"loadtest:{time.time_ns()}"
+    published = {}
+    calls = []
+    lock = threading.Lock()
+
+    def fetch():
+        with lock:
+            calls.append(1)
+        time.sleep(latency)
+        published[key] = {"title": "cold"}
+        return published[key]
+
+    def request(i):
+        result = flights[i % workers].do(key, fetch, load=lambda: published.get(key))
+        assert result == {"title": "cold"}
+
+    elapsed = _fire(concurrency, request)
+    print(f"cross-worker: {concurrency} callers over {workers} workers in "
+          f"{elapsed:.0f} ms, upstream calls={len(calls)}")
+    assert len(calls) == 1, f"expected 1 upstream call, got {len(calls)}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.2, help="fake upstream latency (s)")
+    parser.add_argument("--redis-url", help="use a real Redis instead of fakeredis")
+    args = parser.parse_args()
+    in_process(args.concurrency, args.latency)
+    cross_worker(args.concurrency, args.workers, args.latency, args.redis_url)
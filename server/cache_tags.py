@@ -0,0 +1,118 @@
+"""Per-movie version counters for invalidating every cache layer at once.
+
+Cached entries record the version of each movie they were built from; a
+review write bumps those movies' versions, which makes every dependent entry
+(``movie_<id>``, ``topmovie:<id>``, in-process copies) stale in O(1) Redis
+operations per movie, and announces the bump on a pub/sub channel so other
+workers can drop their in-process entries.
+"""
+
+import json
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+def _version_key(movie_id) -> str:
+    return f"mver:{movie_id}"
+
+
+class MovieVersions:
+    """Movie version counters kept in Redis, or in Flask-Caching without Redis."""
+
+    def __init__(self, redis_client=None, cache=None):
+        self.redis = redis_client
+        self.cache = cache
+
+    def current(self, movie_ids: Iterable[int]) -> Dict[str, int]:
+        """Current version of each movie, creating missing counters.
+
+        Counters start from a time-based value rather than zero, so an evicted
+        counter can never come back at a value an old entry was tagged with.
+        """
+        ids = [str(mid) for mid in movie_ids]
+        if not ids:
+            return {}
+        keys = [_version_key(mid) for mid in ids]
+        if self.redis is not None:
+            values = self.redis.mget(keys)
+        else:
+            values = self.cache.get_many(*keys)
+        versions = {}
+        for mid, key, value in zip(ids, keys, values):
+            if value is None:
+                value = self._init(key)
+            versions[mid] = int(value)
+        return versions
+
+    def _init(self, key: str):
+        base = time.time_ns()
+        if self.redis is not None:
+            with self.redis.pipeline() as pipe:
+                pipe.set(key, base, nx=True)
+                pipe.get(key)
+                return pipe.execute()[1]
+        self.cache.add(key, base, timeout=0)
+        return self.cache.get(key) or base
+
+    def bump(self, movie_ids: Iterable[int]) -> None:
+        """Invalidate everything cached for these movies and notify other workers."""
+        ids = sorted({str(mid) for mid in movie_ids})
+        if not ids:
+            return
+        if self.redis is not None:
+            with self.redis.pipeline() as pipe:
+                for mid in ids:
+                    pipe.set(_version_key(mid), time.time_ns(), nx=True)
+                    pipe.incr(_version_key(mid))
+                pipe.publish(INVALIDATION_CHANNEL, json.dumps(ids))
+                pipe.execute()
+        else:
+            # Single process: a fresh time-based value is as good as an increment
+            self.cache.set_many(
+                {_version_key(mid): time.time_ns() for mid in ids}, timeout=0
+            )
+
+    def subscribe(
+        self,
+        callback: Callable[[list], None],
+        on_reset: Optional[Callable[[], None]] = None,
+    ) -> Optional[threading.Thread]:
+        """Call ``callback(movie_ids)`` for every bump published by any worker.
+
+        ``on_reset`` runs whenever the subscription is (re)established, since
+        bumps published while disconnected are lost.
+        """
+        if self.redis is None:
+            return None
+
+        def _listen():
+            while True:
+                try:
+                    pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(INVALIDATION_CHANNEL)
+                    if on_reset is not None:
+                        on_reset()
+                    for message in pubsub.listen():
+                        try:
+                            callback(json.loads(message["data"]))
+                        except Exception:
+                            pass
+                except Exception:
+                    # Connection dropped: back off briefly and resubscribe
+                    time.sleep(1)
+
+        thread = threading.Thread(target=_listen, name="cache-invalidate", daemon=True)
+        thread.start()
+        return thread
+
+
+def tag(body, versions: Dict[str, int]) -> dict:
+    """Wrap a cacheable body with the movie versions it was built from."""
+    return {"deps": versions, "body": body}
+
+
+def is_current(entry, versions: Dict[str, int]) -> bool:
+    return isinstance(entry, dict) and entry.get("deps") == versions
@@ -0,0 +1,46 @@
+"""Environment-derived settings shared by the server modules."""
+
+import os
+
+from dotenv import load_dotenv
+
+# Load environment variables before any module reads them
+load_dotenv()
+
+# TMDB API settings
+API_KEY = os.getenv("API_KEY")
+TMDB_BASE_URL = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3/")
+TMDB_TIMEOUT_SECS = float(os.getenv("TMDB_TIMEOUT_SECS", "8"))
+# Upper bound on concurrent TMDB lookups issued for a single request
+TMDB_MAX_WORKERS = int(os.getenv("TMDB_MAX_WORKERS", "8"))
+
+# Titles rarely change, so resolved titles are cached for a day by default
+MOVIE_TITLE_TTL_SECS = int(os.getenv("MOVIE_TITLE_TTL_SECS", "86400"))
+
+# Local movie store: records younger than MOVIE_FRESH_SECS are served as-is,
+# older ones are served stale (up to MOVIE_MAX_STALE_SECS) while a background
+# refresh runs, and anything older is refetched before responding.
+MOVIE_FRESH_SECS = int(os.getenv("MOVIE_FRESH_SECS", "86400"))
+MOVIE_MAX_STALE_SECS = int(os.getenv("MOVIE_MAX_STALE_SECS", str(30 * 86400)))
+
+# Shared pool for outbound HTTP calls made on behalf of requests
+UPSTREAM_MAX_WORKERS = int(os.getenv("UPSTREAM_MAX_WORKERS", "32"))
+# Total time a movie request may spend waiting on upstreams before giving up
+MOVIE_REQUEST_DEADLINE_SECS = float(os.getenv("MOVIE_REQUEST_DEADLINE_SECS", "10"))
+
+# Pooled upstream HTTP clients (TMDB, Wikipedia, Cognito)
+UPSTREAM_CONNECT_TIMEOUT_SECS = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT_SECS", "3"))
+UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", "2"))
+UPSTREAM_BACKOFF_SECS = float(os.getenv("UPSTREAM_BACKOFF_SECS", "0.2"))
+# Never sleep longer than this for a Retry-After; give up and fail instead
+UPSTREAM_MAX_RETRY_WAIT_SECS = float(os.getenv("UPSTREAM_MAX_RETRY_WAIT_SECS", "2"))
+# Consecutive failures before a host's circuit opens, and how long it stays open
+UPSTREAM_BREAKER_THRESHOLD = int(os.getenv("UPSTREAM_BREAKER_THRESHOLD", "5"))
+UPSTREAM_BREAKER_RESET_SECS = float(os.getenv("UPSTREAM_BREAKER_RESET_SECS", "30"))
+
+# Wikipedia (MediaWiki) API used to link movies to their articles
+WIKIPEDIA_API_URL = os.getenv("WIKIPEDIA_API_URL", "https://en.wikipedia.org/w/api.php")
+# Movies without an article are looked up again after WIKI_RETRY_SECS, doubling
+# with every further miss up to WIKI_RETRY_MAX_SECS
+WIKI_RETRY_SECS = int(os.getenv("WIKI_RETRY_SECS", "3600"))
+WIKI_RETRY_MAX_SECS = int(os.getenv("WIKI_RETRY_MAX_SECS", str(30 * 86400)))
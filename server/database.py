@@ -1,5 +1,7 @@
+from flask_migrate import upgrade
+
 from main import app
-from models import db
 
+# Apply pending migrations (same as `flask --app main db upgrade`)
 with app.app_context():
-    db.create_all()
+    upgrade()
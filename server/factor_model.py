@@ -0,0 +1,181 @@
+"""Latent-factor (ALS) recommender with factors shared between workers via mmap.
+
+``train`` fits user/item factors to the review ratings; ``write`` stores
+them as a new version in ``model_dir`` (see ``mapped_arrays``);
+``FactorStore`` maps the current version read-only and swaps to newer
+versions as they appear.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+import mapped_arrays
+
+_SOLVE_ROWS = 4096  # normal equations solved per batch
+DEFAULT_REG = 0.1
+DEFAULT_ALPHA = 20.0
+
+
+def _preferences(u_idx, r, n_users, alpha: float):
+    """Implicit-feedback targets from explicit ratings.
+
+    A rating at or above the user's own mean is a positive (preference 1),
+    anything below is a negative; either way an observed rating carries
+    ``1 + alpha`` confidence against 1 for movies the user never rated.
+    """
+    user_mean = np.bincount(u_idx, weights=r, minlength=n_users) / np.maximum(
+        np.bincount(u_idx, minlength=n_users), 1
+    )
+    liked = (r >= user_mean[u_idx]).astype(np.float32)
+    return liked, np.full(len(r), alpha, dtype=np.float32)
+
+
+def _solve_side(C, CP, V, reg: float, pool: Optional[ThreadPoolExecutor]) -> np.ndarray:
+    """Least-squares factors for every row of ``C`` given the other side ``V``.
+
+    Row ``x`` solves ``(V^T V + sum of (c - 1) v v^T over its ratings + reg I) p
+    = sum of c * pref * v`` (implicit ALS). ``V^T V`` is shared by all rows;
+    the per-row corrections come from one sparse product with the packed
+    upper triangles of ``v v^T``.
+    """
+    f = V.shape[1]
+    iu, ju = np.triu_indices(f)
+    packed = V[:, iu] * V[:, ju]
+    # Column of ``packed`` holding each (i, j) entry of the full f x f matrix
+    sym = np.empty((f, f), dtype=np.intp)
+    sym[iu, ju] = sym[ju, iu] = np.arange(len(iu))
+    base = V.T @ V + reg * np.eye(f, dtype=np.float32)
+    B = CP @ V
+    out = np.zeros((C.shape[0], f), dtype=np.float32)
+
+    def solve(start):
+        stop = min(start + _SOLVE_ROWS, C.shape[0])
+        A = np.asarray(C[start:stop] @ packed)[:, sym]
+        A += base
+        out[start:stop] = np.linalg.solve(A, B[start:stop, :, None])[..., 0]
+
+    starts = range(0, C.shape[0], _SOLVE_ROWS)
+    if pool is None:
+        for start in starts:
+            solve(start)
+    else:
+        list(pool.map(solve, starts))
+    return out
+
+
+def train(
+    user_ids,
+    movie_ids,
+    ratings,
+    factors: int = 32,
+    reg: float = DEFAULT_REG,
+    alpha: float = DEFAULT_ALPHA,
+    iterations: int = 8,
+    workers: int = os.cpu_count() or 1,
+    seed: int = 0,
+) -> Dict[str, np.ndarray]:
+    """Fit an ALS model to parallel rating arrays; returns arrays for ``write``."""
+    users, u_idx = np.unique(np.asarray(user_ids, dtype=np.int64), return_inverse=True)
+    items, i_idx = np.unique(np.asarray(movie_ids, dtype=np.int64), return_inverse=True)
+    liked, confidence = _preferences(u_idx, np.asarray(ratings, dtype=np.float64), len(users), alpha)
+
+    shape = (len(users), len(items))
+    C = sparse.csr_matrix((confidence, (u_idx, i_idx)), shape=shape)
+    CP = sparse.csr_matrix(((confidence + 1) * liked, (u_idx, i_idx)), shape=shape)
+    Ct, CPt = C.T.tocsr(), CP.T.tocsr()
+
+    rng = np.random.default_rng(seed)
+    Q = rng.normal(0, 0.01, (len(items), factors)).astype(np.float32)
+    P = np.zeros((len(users), factors), dtype=np.float32)
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for _ in range(iterations):
+            P = _solve_side(C, CP, Q, reg, pool)
+            Q = _solve_side(Ct, CPt, P, reg, pool)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return {
+        "item_ids": items,
+        "item_factors": Q,
+        # Shared term of every user's normal equations, so fold-in skips it
+        "item_gram": Q.T @ Q,
+        "user_ids": users,
+        "user_factors": P,
+        "alpha": np.array([alpha], dtype=np.float64),
+        "reg": np.array([reg], dtype=np.float64),
+    }
+
+
+def write(model_dir: str, arrays: Dict[str, np.ndarray], keep: int = 3) -> str:
+    """Store ``arrays`` as a new model version and make it current; returns its path."""
+    return mapped_arrays.write(model_dir, "factors", arrays, keep=keep)
+
+
+class FactorModel:
+    """One model version, mapped read-only from disk."""
+
+    def __init__(self, path: str):
+        header, self.arrays = mapped_arrays.read(path)
+        self.path = path
+        self.version = header["version"]
+        self.item_ids = self.arrays["item_ids"]
+        self.item_factors = self.arrays["item_factors"]
+        self.item_gram = self.arrays["item_gram"]
+        self.alpha = float(self.arrays["alpha"][0])
+        self.reg = float(self.arrays["reg"][0])
+
+    def _rows(self, movie_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        pos = np.minimum(np.searchsorted(self.item_ids, movie_ids), len(self.item_ids) - 1)
+        return pos, self.item_ids[pos] == movie_ids
+
+    def user_vector(self, ratings: Dict[int, float]) -> Optional[np.ndarray]:
+        """Fold a user's current ratings into the factor space (one ALS user step)."""
+        movie_ids = np.fromiter(ratings.keys(), dtype=np.int64, count=len(ratings))
+        values = np.fromiter(ratings.values(), dtype=np.float64, count=len(ratings))
+        pos, known = self._rows(movie_ids)
+        if not known.any():
+            return None
+        rows = pos[known]
+        values = values[known]
+        liked = (values >= values.mean()).astype(np.float32)
+        V = self.item_factors[rows]
+        A = self.item_gram + self.alpha * (V.T @ V) + self.reg * np.eye(V.shape[1], dtype=np.float32)
+        return np.linalg.solve(A, V.T @ ((1 + self.alpha) * liked))
+
+    def recommend(self, ratings: Dict[int, float], n: int) -> List[Tuple[int, float]]:
+        """Top ``n`` unrated movies: one matrix-vector product plus ``argpartition``."""
+        if not ratings or not len(self.item_ids):
+            return []
+        p = self.user_vector(ratings)
+        if p is None:
+            return []
+        scores = self.item_factors @ p
+        pos, known = self._rows(np.fromiter(ratings.keys(), dtype=np.int64, count=len(ratings)))
+        scores[pos[known]] = -np.inf
+        count = min(n, len(scores) - int(known.sum()))
+        if count <= 0:
+            return []
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.item_ids[i]), float(scores[i])) for i in top]
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "items": int(len(self.item_ids)),
+            "users": int(len(self.arrays["user_ids"])),
+            "factors": int(self.item_factors.shape[1]),
+            "bytes": os.path.getsize(self.path),
+        }
+
+
+class FactorStore(mapped_arrays.VersionedStore[FactorModel]):
+    """The current ``FactorModel`` in ``model_dir``, reloaded when ``CURRENT`` changes."""
+
+    def __init__(self, model_dir: Optional[str], check_secs: float = 30):
+        super().__init__(model_dir, FactorModel, check_secs=check_secs)
@@ -0,0 +1,30 @@
+"""Gunicorn settings for production: threaded workers for upstream-bound requests."""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+# Requests mostly wait on TMDB/Wikipedia/Postgres, so each worker process runs
+# a pool of threads; a slow upstream then holds a thread instead of a process.
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+keepalive = 5
+
+
+# With PROMETHEUS_MULTIPROC_DIR set, workers write metrics to files there so
+# /metrics can sum them; start from an empty directory and retire dead workers
+def on_starting(server):
+    path = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if name.endswith(".db"):
+                os.unlink(os.path.join(path, name))
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
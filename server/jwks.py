@@ -0,0 +1,92 @@
+"""Parsed JWKS signing keys, indexed by ``kid`` and refreshed in the background."""
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from jose import jwk
+
+from response_cache import CacheStats
+
+
+class JWKSKeys:
+    """Signing keys from a JWKS endpoint, parsed once per refresh.
+
+    Lookups are a dict hit. Once the key set is older than ``ttl_secs`` it is
+    still used while a background refresh replaces it. An unknown ``kid``
+    (e.g. after key rotation) also triggers a refresh, at most once per
+    ``min_refresh_secs``, and waits briefly for it to finish.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Optional[dict]],
+        ttl_secs: float = 3600,
+        min_refresh_secs: float = 60,
+        wait_secs: float = 5,
+    ):
+        self.fetch = fetch
+        self.ttl_secs = ttl_secs
+        self.min_refresh_secs = min_refresh_secs
+        self.wait_secs = wait_secs
+        self.keys: Dict[str, object] = {}
+        self.loaded_at = 0.0
+        self._last_attempt = 0.0
+        self._refreshing: Optional[threading.Event] = None
+        self._lock = threading.Lock()
+        # hits: kid found in the parsed set, misses: had to wait on a refresh
+        self.counters = CacheStats("jwks")
+
+    def refresh(self):
+        """Fetch and parse the key set synchronously."""
+        data = self.fetch() or {}
+        keys = {}
+        for k in data.get("keys", []):
+            if k.get("kid"):
+                keys[k["kid"]] = jwk.construct(k, algorithm=k.get("alg", "RS256"))
+        self.keys = keys
+        self.loaded_at = time.monotonic()
+
+    def _refresh_async(self, force: bool = False) -> Optional[threading.Event]:
+        with self._lock:
+            if self._refreshing is not None:
+                return self._refreshing
+            now = time.monotonic()
+            if not force and now - self._last_attempt < self.min_refresh_secs:
+                return None
+            self._last_attempt = now
+            done = self._refreshing = threading.Event()
+
+        def _run():
+            try:
+                self.refresh()
+            except Exception:
+                self.counters.count("errors")
+            finally:
+                with self._lock:
+                    self._refreshing = None
+                done.set()
+
+        threading.Thread(target=_run, name="jwks-refresh", daemon=True).start()
+        return done
+
+    def get(self, kid: str):
+        """Return the parsed key for ``kid``, raising ``ValueError`` if unknown."""
+        if not self.keys:
+            # First use: nothing to serve stale, so wait for the initial load
+            done = self._refresh_async(force=True)
+            if done is not None:
+                done.wait(self.wait_secs)
+        elif time.monotonic() - self.loaded_at > self.ttl_secs:
+            self._refresh_async()
+
+        key = self.keys.get(kid)
+        self.counters.count("hits" if key is not None else "misses")
+        if key is None:
+            done = self._refresh_async()
+            if done is not None:
+                done.wait(self.wait_secs)
+                key = self.keys.get(kid)
+        if key is None:
+            raise ValueError("Public key not found in JWKS")
+        return key
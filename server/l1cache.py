@@ -0,0 +1,76 @@
+"""Bounded in-process LRU/TTL cache that sits in front of the shared caches."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from response_cache import CacheStats
+
+
+class LocalCache:
+    """LRU cache capped by entry count and approximate bytes, with a TTL.
+
+    Entries are only as fresh as their invalidation: callers must ``delete``
+    keys when the underlying data changes (see ``MovieVersions.subscribe``),
+    and the TTL bounds staleness if an invalidation message is ever lost.
+    Read ``epoch`` before loading a value and pass it to ``set`` so a value
+    loaded across an invalidation is not cached.
+    """
+
+    def __init__(self, name: str, max_entries: int, max_bytes: int, ttl_secs: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_secs = ttl_secs
+        self.counters = CacheStats(name)
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self.epoch = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                if item[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.counters.count("hits")
+                    return item[2]
+                self._drop(key)
+        self.counters.count("misses")
+        return None
+
+    def set(self, key: Hashable, value: Any, size: int, epoch: Optional[int] = None):
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            if epoch is not None and epoch != self.epoch:
+                return
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl_secs, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self.epoch += 1
+            self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self.epoch += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key):
+        item = self._entries.pop(key, None)
+        if item is not None:
+            self._bytes -= item[1]
+
+    def stats(self) -> dict:
+        stats = self.counters.snapshot()
+        with self._lock:
+            stats.update(entries=len(self._entries), bytes=self._bytes)
+        return stats
@@ -1,12 +1,12 @@
 from flask import (
     Flask,
+    Response,
     request,
     jsonify,
+    stream_with_context,
 )
-from flask_sqlalchemy import SQLAlchemy
 from flask_login import (
     LoginManager,
-    UserMixin,
     login_user,
     logout_user,
     current_user,
@@ -14,11 +14,16 @@ from flask_login import (
 from dotenv import load_dotenv
 from flask_cors import CORS
 from flask_caching import Cache
+from flask_migrate import Migrate
+from flask_migrate import upgrade as upgrade_db
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from jose import jwt
 from typing import Optional
 from jose.utils import base64url_decode
 import time
 import json
+import click
 import uuid
 import hashlib
 import base64
@@ -27,6 +32,37 @@ import requests
 import os
 import random
 
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+
+from config import (
+    MOVIE_REQUEST_DEADLINE_SECS,
+    MOVIE_TITLE_TTL_SECS,
+    TMDB_BASE_URL,
+    UPSTREAM_MAX_WORKERS,
+)
+from models import Movie, Review, User, db
+from tmdb import fetch_movie, fetch_movies, resolve_titles
+from tmdb import search_movies as search_tmdb
+from cache_tags import MovieVersions, is_current, tag
+from jwks import JWKSKeys
+from l1cache import LocalCache
+from recommender import Recommender, load_ratings
+from response_cache import CacheStats, ResponseCache
+from search_index import SearchIndex, normalize_query
+from singleflight import SingleFlight
+from upstream import Deadline
+from view_counter import ViewCounter
+import upstream
+import movie_store
+import metrics
+import review_store
+import sessions
+import factor_model
+import similar
+import wiki
+import refresher
+
 # Load environment variables
 load_dotenv()
 
@@ -48,37 +84,129 @@ CORS(
     app,
     supports_credentials=True,
     origins=list(ALLOWED_ORIGINS),
+    expose_headers=["X-Next-Cursor"],
+)
+
+# Prometheus metrics at /metrics. Requests slower than METRICS_SLOW_REQUEST_MS
+# (0 disables it) are profiled by stack sampling; see /api/health/slow-requests
+METRICS_SLOW_REQUEST_MS = float(os.getenv("METRICS_SLOW_REQUEST_MS", "0"))
+METRICS_PROFILE_INTERVAL_MS = float(os.getenv("METRICS_PROFILE_INTERVAL_MS", "5"))
+slow_requests = metrics.init_app(
+    app,
+    slow_request_secs=METRICS_SLOW_REQUEST_MS / 1000,
+    profile_interval_secs=METRICS_PROFILE_INTERVAL_MS / 1000,
 )
 
 app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL")
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY")
 cache_type = os.getenv("CACHE_TYPE", "SimpleCache")
-app.config["CACHE_TYPE"] = cache_type
-if cache_type.lower() == "redis":
+use_redis = cache_type.lower() in ("redis", "rediscache")
+# Flask-Caching 2 only accepts the backend's class name
+app.config["CACHE_TYPE"] = "RedisCache" if use_redis else cache_type
+if use_redis:
     app.config["CACHE_REDIS_URL"] = os.getenv(
         "CACHE_REDIS_URL", "redis://redis:6379/0"
     )
 
 cache = Cache(app)
-db = SQLAlchemy(app)
+db.init_app(app)
+# Schema changes go through migrations/ (flask db upgrade), not create_all
+migrate = Migrate(app, db, directory=os.path.join(os.path.dirname(__file__), "migrations"))
 
 # Redis client for sessions (reuse CACHE_REDIS_URL)
 REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://redis:6379/0")
 redis_client = None
 try:
-    if cache_type.lower() == "redis":
+    if use_redis:
         redis_client = redislib.from_url(REDIS_URL)
 except Exception:
     redis_client = None
 
+# Reviews embedded in the movie payload / served per page by the listing routes
+MOVIE_REVIEWS_PAGE_SIZE = int(os.getenv("MOVIE_REVIEWS_PAGE_SIZE", "20"))
+REVIEWS_PAGE_SIZE = int(os.getenv("REVIEWS_PAGE_SIZE", "50"))
+REVIEWS_MAX_PAGE_SIZE = int(os.getenv("REVIEWS_MAX_PAGE_SIZE", "1000"))
+
 # Top-N movie cache config (for frequently accessed movies)
 TOP_MOVIE_CACHE_SIZE = int(os.getenv("TOP_MOVIE_CACHE_SIZE", "200"))
 TOP_MOVIE_TTL_SECS = int(os.getenv("TOP_MOVIE_TTL_SECS", "3600"))  # 1 hour default
-TOP_MOVIE_ZSET = "movie:views"  # sorted set of movie_id -> view count
+TOP_MOVIE_ZSET = "movie:views"  # sorted set of movie_id -> (decayed) view count
+# Views are buffered per worker and flushed in batches; top-N is recomputed periodically
+VIEW_FLUSH_SECS = float(os.getenv("VIEW_FLUSH_SECS", "5"))
+TOP_MOVIE_REFRESH_SECS = float(os.getenv("TOP_MOVIE_REFRESH_SECS", "30"))
+VIEW_HALF_LIFE_SECS = float(os.getenv("VIEW_HALF_LIFE_SECS", str(7 * 86400)))
+TOP_MOVIE_ZSET_MAX = int(os.getenv("TOP_MOVIE_ZSET_MAX", "10000"))
+# `flask refresh-top-movies` re-renders top-N payloads this long before they
+# expire, checking every interval, and refetches at most this many stale
+# movies from TMDB per minute
+TOP_MOVIE_REFRESH_AHEAD_SECS = float(os.getenv("TOP_MOVIE_REFRESH_AHEAD_SECS", "300"))
+TOP_MOVIE_REFRESH_INTERVAL_SECS = float(os.getenv("TOP_MOVIE_REFRESH_INTERVAL_SECS", "15"))
+TMDB_REFRESH_BUDGET_PER_MIN = float(os.getenv("TMDB_REFRESH_BUDGET_PER_MIN", "30"))
+
+# In-process (L1) cache of movie payloads in front of the Redis/Flask-Caching tier
+MOVIE_L1_MAX_ENTRIES = int(os.getenv("MOVIE_L1_MAX_ENTRIES", str(TOP_MOVIE_CACHE_SIZE)))
+MOVIE_L1_MAX_BYTES = int(os.getenv("MOVIE_L1_MAX_BYTES", str(32 * 1024 * 1024)))
+MOVIE_L1_TTL_SECS = float(os.getenv("MOVIE_L1_TTL_SECS", "60"))
 
 def _top_movie_key(movie_id: int) -> str:
     return f"topmovie:{movie_id}"
 
+
+def _drop_top_movies(movie_ids):
+    """Delete cached payloads of movies that fell out of the top-N."""
+    with redis_client.pipeline() as pipe:
+        for mid in movie_ids:
+            pipe.delete(_top_movie_key(mid))
+        pipe.execute()
+
+
+view_counter = ViewCounter(
+    redis_client,
+    TOP_MOVIE_ZSET,
+    TOP_MOVIE_CACHE_SIZE,
+    flush_secs=VIEW_FLUSH_SECS,
+    refresh_secs=TOP_MOVIE_REFRESH_SECS,
+    half_life_secs=VIEW_HALF_LIFE_SECS,
+    max_tracked=TOP_MOVIE_ZSET_MAX,
+    on_demoted=_drop_top_movies,
+)
+view_counter.start()
+
+# Coalesce concurrent upstream fetches for the same movie, across workers via Redis
+MOVIE_FETCH_LEASE_SECS = float(os.getenv("MOVIE_FETCH_LEASE_SECS", "5"))
+movie_flight = SingleFlight(redis_client, lease_secs=MOVIE_FETCH_LEASE_SECS)
+
+# Item-item recommendations: review changes are applied from the review_events
+# log every few seconds, with a periodic full rebuild from the reviews table
+# (RECOMMENDER_REBUILD_SECS=0 disables the background thread)
+RECOMMENDER_NEIGHBORS = int(os.getenv("RECOMMENDER_NEIGHBORS", "50"))
+RECOMMENDER_REBUILD_SECS = float(os.getenv("RECOMMENDER_REBUILD_SECS", "3600"))
+RECOMMENDER_POLL_SECS = float(os.getenv("RECOMMENDER_POLL_SECS", "2"))
+recommender = Recommender(
+    k=RECOMMENDER_NEIGHBORS,
+    rebuild_secs=RECOMMENDER_REBUILD_SECS,
+    poll_secs=RECOMMENDER_POLL_SECS,
+)
+recommender.start(app)
+
+# ALS factor model, trained offline by `flask train-factors` into a versioned
+# file that every worker maps read-only; preferred over item-item when present
+RECOMMENDER_MODEL_DIR = os.getenv(
+    "RECOMMENDER_MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "var", "models")
+)
+RECOMMENDER_MODEL_CHECK_SECS = float(os.getenv("RECOMMENDER_MODEL_CHECK_SECS", "30"))
+factor_store = factor_model.FactorStore(RECOMMENDER_MODEL_DIR, check_secs=RECOMMENDER_MODEL_CHECK_SECS)
+
+# "More like this": IVF index over content embeddings of the stored movies,
+# built offline by `flask build-similar` and mapped read-only by every worker
+SIMILAR_INDEX_DIR = os.getenv(
+    "SIMILAR_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "var", "similar")
+)
+SIMILAR_NPROBE = int(os.getenv("SIMILAR_NPROBE", "16"))
+similar_store = similar.SimilarStore(
+    SIMILAR_INDEX_DIR, nprobe=SIMILAR_NPROBE, check_secs=RECOMMENDER_MODEL_CHECK_SECS
+)
+
 # Cognito config
 COGNITO_REGION = os.getenv("COGNITO_REGION", "us-east-2")
 COGNITO_USER_POOL_ID = os.getenv("COGNITO_USER_POOL_ID")
@@ -91,8 +219,17 @@ COGNITO_SCOPE = os.getenv("COGNITO_SCOPE", "openid email")
 
 SESSION_COOKIE_NAME = os.getenv("SESSION_COOKIE_NAME", "app_session")
 SESSION_TTL_SECS = int(os.getenv("SESSION_TTL_SECS", "3600"))
+# Session identities are also held in-process this long (seconds)
+SESSION_LOCAL_TTL_SECS = float(os.getenv("SESSION_LOCAL_TTL_SECS", "5"))
+SESSION_LOCAL_MAX_ENTRIES = int(os.getenv("SESSION_LOCAL_MAX_ENTRIES", "10000"))
+session_store = sessions.SessionStore(
+    redis_client, cache, local_ttl_secs=SESSION_LOCAL_TTL_SECS, local_max_entries=SESSION_LOCAL_MAX_ENTRIES
+)
 
-ISSUER = f"https://cognito-idp.{COGNITO_REGION}.amazonaws.com/{COGNITO_USER_POOL_ID}" if COGNITO_USER_POOL_ID else None
+# COGNITO_ISSUER overrides the derived issuer (e.g. to point at a local stand-in)
+ISSUER = os.getenv("COGNITO_ISSUER") or (
+    f"https://cognito-idp.{COGNITO_REGION}.amazonaws.com/{COGNITO_USER_POOL_ID}" if COGNITO_USER_POOL_ID else None
+)
 JWKS_URL = f"{ISSUER}/.well-known/jwks.json" if ISSUER else None
 
 
@@ -101,25 +238,23 @@ def _get_code_challenge(verifier: str) -> str:
     return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
 
 
-# Cache JWKS per user pool to avoid mismatches after switching pools
-@cache.cached(timeout=3600, key_prefix=f"jwks:{COGNITO_REGION}:{COGNITO_USER_POOL_ID}")
-def _get_jwks():
+def _fetch_jwks():
     if not JWKS_URL:
         return None
-    resp = requests.get(JWKS_URL, timeout=5)
+    resp = upstream.cognito.get(JWKS_URL)
     resp.raise_for_status()
     return resp.json()
 
 
+# Parsed signing keys by kid; refreshed in the background, and on unknown kids
+jwks_keys = JWKSKeys(_fetch_jwks, ttl_secs=3600)
+
+
 def _verify_id_token(id_token: str, access_token: Optional[str] = None):
     if not (ISSUER and COGNITO_CLIENT_ID):
         raise ValueError("Cognito not configured")
-    jwks = _get_jwks()
     headers = jwt.get_unverified_header(id_token)
-    kid = headers.get("kid")
-    key = next((k for k in jwks.get("keys", []) if k.get("kid") == kid), None)
-    if not key:
-        raise ValueError("Public key not found in JWKS")
+    key = jwks_keys.get(headers.get("kid"))
     claims = jwt.decode(
         id_token,
         key,
@@ -131,25 +266,17 @@ def _verify_id_token(id_token: str, access_token: Optional[str] = None):
     return claims
 
 
-def _session_store_put(sid: str, data: dict, ttl: int):
-    if redis_client is not None:
-        redis_client.setex(f"sess:{sid}", ttl, json.dumps(data))
-    else:
-        cache.set(f"sess:{sid}", data, timeout=ttl)
-
-
-def _session_store_get(sid: str):
-    if redis_client is not None:
-        val = redis_client.get(f"sess:{sid}")
-        return json.loads(val) if val else None
-    return cache.get(f"sess:{sid}")
+def _current_session() -> Optional[dict]:
+    """Identity of the request's session (see ``sessions``), or None if signed out."""
+    return sessions.current(session_store, SESSION_COOKIE_NAME)
 
 
-def _session_store_del(sid: str):
-    if redis_client is not None:
-        redis_client.delete(f"sess:{sid}")
-    else:
-        cache.delete(f"sess:{sid}")
+def _session_user_id(sess: dict) -> Optional[int]:
+    """The session's user id; sessions without one are resolved by username."""
+    if sess.get("user_id"):
+        return sess["user_id"]
+    user = User.query.filter_by(username=sess["username"]).first() if sess.get("username") else None
+    return user.id if user else None
 
 # Flask-Login setup
 login_manager = LoginManager()
@@ -163,49 +290,69 @@ def load_user(user_id):
 
 
 # TMDB API settings
-API_KEY = os.getenv("API_KEY")
-BASE_URL = "https://api.themoviedb.org/3/movie/"
+BASE_URL = f"{TMDB_BASE_URL}movie/"
 
 
-# Database Models
-class User(db.Model, UserMixin):
-    """User model for authentication."""
+def _movie_title_key(movie_id: int) -> str:
+    return f"movie_title_{movie_id}"
 
-    __tablename__ = "users"
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
 
+def _cached_movie_titles(movie_ids):
+    """Return known titles, checking the cache first and then the movie store."""
+    values = cache.get_many(*[_movie_title_key(mid) for mid in movie_ids])
+    titles = {mid: title for mid, title in zip(movie_ids, values) if title}
+    misses = [mid for mid in movie_ids if mid not in titles]
+    if misses:
+        stored = movie_store.titles(misses)
+        if stored:
+            _cache_movie_titles(stored)
+            titles.update(stored)
+    return titles
 
-class Review(db.Model):
-    """Movie review model to store user ratings and comments."""
 
-    __tablename__ = "reviews"
-    id = db.Column(db.Integer, primary_key=True)
-    movie_id = db.Column(db.Integer, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    rating = db.Column(db.Integer, nullable=True)
-    comment = db.Column(db.Text, nullable=True)
+def _cache_movie_titles(titles):
+    cache.set_many(
+        {_movie_title_key(mid): title for mid, title in titles.items()},
+        timeout=MOVIE_TITLE_TTL_SECS,
+    )
 
-    user = db.relationship("User", backref="reviews")
 
+def _store_fetched_movies(movies):
+    """Persist movies fetched while resolving titles and cache their titles."""
+    movie_store.save_many(movies)
+    _cache_movie_titles({mid: movie["title"] for mid, movie in movies.items()})
 
-# Helper function to get Wikipedia link
-def get_wikipedia_link(title):
-    """Fetch Wikipedia link, handling disambiguation pages."""
-    search_url = f"https://en.wikipedia.org/w/api.php?action=query&list=search&srsearch={title}&format=json"
-    try:
-        search_response = requests.get(search_url, timeout=5).json()
-    except Exception:
-        return "#"
 
-    if not search_response.get("query", {}).get("search"):
-        return "#"
+def _load_movie(movie_id: int) -> dict:
+    """Normalized movie payload from the local store, refreshed from TMDB as needed."""
+    return movie_store.load(
+        app, movie_id, fetch_movie, get_wikipedia_link, flight=movie_flight
+    )
 
-    for result in search_response["query"]["search"]:
-        wiki_title = result["title"]
-        return f"https://en.wikipedia.org/wiki/{wiki_title.replace(' ', '_')}"
 
-    return "#"
+# Movie loads (store read plus any upstream fetch) run off the request thread
+# so a request can query its reviews meanwhile; upstream.submit is reserved
+# for the leaf HTTP calls these loads wait on.
+_movie_load_pool = ThreadPoolExecutor(
+    max_workers=UPSTREAM_MAX_WORKERS, thread_name_prefix="movie-load"
+)
+
+
+def _load_movie_async(movie_id: int) -> Future:
+    def run():
+        with app.app_context():
+            return _load_movie(movie_id)
+
+    return _movie_load_pool.submit(run)
+
+
+def get_wikipedia_link(title):
+    """Wikipedia article for a movie title, or None if there is none.
+
+    One search request on the request path; ``flask resolve-wiki-links``
+    does the batched "(film)" page lookups (see ``wiki``).
+    """
+    return wiki.search(title)
 
 
 @app.after_request
@@ -227,25 +374,30 @@ def add_cors_headers(response):
 @app.route("/api/auth-status", methods=["GET"])
 def auth_status():
     """Check if the user is logged in via Cognito-backed session."""
-    sid = request.cookies.get(SESSION_COOKIE_NAME)
-    if not sid:
-        return jsonify({"isAuthenticated": False})
-    sess = _session_store_get(sid)
+    sess = _current_session()
     if not sess:
         return jsonify({"isAuthenticated": False})
-    # Verify token and surface identity details; display_name should be just the 'name' claim
-    try:
-        claims = _verify_id_token(sess.get("id_token"), sess.get("access_token"))
-        return jsonify({
-            "isAuthenticated": True,
-            "username": sess.get("username"),
-            "sub": sess.get("sub"),
-            "email": sess.get("email"),
-            # Only expose the Cognito 'name' claim for display purposes; no fallbacks
-            "display_name": claims.get("name") or "",
-        })
-    except Exception:
-        return jsonify({"isAuthenticated": False})
+    # The ID token was verified when the session was created (or last checked);
+    # only re-verify once that verification has expired with the token
+    now = int(time.time())
+    if (sess.get("verified_until") or 0) <= now:
+        sid = request.cookies.get(SESSION_COOKIE_NAME)
+        tokens = session_store.tokens(sid)
+        try:
+            claims = _verify_id_token(tokens.get("id_token"), tokens.get("access_token"))
+        except Exception:
+            return jsonify({"isAuthenticated": False})
+        sess = {**sess, "display_name": claims.get("name"), "verified_until": claims.get("exp")}
+        if sess["verified_until"] and sess["verified_until"] > now:
+            session_store.put(sid, {**sess, **tokens}, min(sess["verified_until"] - now, SESSION_TTL_SECS))
+    return jsonify({
+        "isAuthenticated": True,
+        "username": sess.get("username"),
+        "sub": sess.get("sub"),
+        "email": sess.get("email"),
+        # Only expose the Cognito 'name' claim for display purposes; no fallbacks
+        "display_name": sess.get("display_name") or "",
+    })
 
 
 @app.route("/api/auth/login", methods=["GET"])
@@ -257,7 +409,7 @@ def auth_login():
     nonce = uuid.uuid4().hex
     code_verifier = base64.urlsafe_b64encode(os.urandom(40)).rstrip(b"=").decode("ascii")
     code_challenge = _get_code_challenge(code_verifier)
-    _session_store_put(f"oidc:{state}", {
+    session_store.put_state(state, {
         "nonce": nonce,
         "code_verifier": code_verifier,
         "ts": int(time.time()),
@@ -286,7 +438,7 @@ def auth_callback():
     state = request.args.get("state")
     if not code or not state:
         return jsonify({"error": "Missing code/state"}), 400
-    st = _session_store_get(f"oidc:{state}")
+    st = session_store.get_state(state)
     if not st:
         return jsonify({"error": "Invalid state"}), 400
     code_verifier = st.get("code_verifier")
@@ -305,7 +457,7 @@ def auth_callback():
         # Basic auth per spec for confidential clients
         creds = f"{COGNITO_CLIENT_ID}:{COGNITO_CLIENT_SECRET}".encode("utf-8")
         headers["Authorization"] = "Basic " + base64.b64encode(creds).decode("utf-8")
-    resp = requests.post(token_url, data=data, headers=headers, timeout=10)
+    resp = upstream.cognito.post(token_url, data=data, headers=headers)
     if resp.status_code != 200:
         return jsonify({"error": "Token exchange failed", "details": resp.text}), 400
     tok = resp.json()
@@ -341,13 +493,15 @@ def auth_callback():
         "display_name": display_name,
         "iat": claims.get("iat"),
         "exp": claims.get("exp"),
+        # Claims above were verified just now; auth-status trusts them until exp
+        "verified_until": claims.get("exp"),
         "user_id": user_rec.id,
     }
     ttl = min(expires_in, SESSION_TTL_SECS)
     now = int(time.time())
     if claims.get("exp"):
         ttl = min(ttl, max(60, claims["exp"] - now))
-    _session_store_put(sid, sess, ttl)
+    session_store.put(sid, sess, ttl)
 
     # Set secure HttpOnly cookie and redirect to app
     redirect_to = os.getenv("FRONTEND_ORIGIN", "") + "/explore"
@@ -371,7 +525,7 @@ def auth_callback():
 def auth_logout():
     sid = request.cookies.get(SESSION_COOKIE_NAME)
     if sid:
-        _session_store_del(sid)
+        session_store.delete(sid)
     # Clear cookie
     resp = jsonify({"message": "Logged out"})
     resp.set_cookie(SESSION_COOKIE_NAME, "", max_age=0, path="/", secure=True, httponly=True, samesite="None")
@@ -385,57 +539,285 @@ def auth_logout():
     return resp
 
 
-@cache.cached(timeout=300, key_prefix="random_movie")
-@app.route("/api/movie", methods=["GET"])
-@app.route("/api/explore", methods=["GET"])  # New path for random explore
-def get_random_movie():
-    movie_ids = [550, 13, 680, 157336, 120, 424, 155, 122, 27205, 423]
-    random_movie_id = random.choice(movie_ids)
+def _movie_body(movie_id: int, versions: dict):
+    """Build the shared (user-independent) /api/movie payload, or an error response."""
+    # Fast-path: if we maintain a dedicated Redis cache for top movies, try to serve it first
+    if redis_client is not None:
+        try:
+            cached = redis_client.get(_top_movie_key(movie_id))
+            entry = json.loads(cached) if cached else None
+            if is_current(entry, versions):
+                top_movie_stats.count("hits")
+                return entry["body"]
+            top_movie_stats.count("misses")
+        except Exception:
+            top_movie_stats.count("errors")
+            # Ignore cache errors and continue with normal flow
+            pass
+
+    # Query reviews while the movie loads (TMDB/Wikipedia on a cold store)
+    deadline = Deadline(MOVIE_REQUEST_DEADLINE_SECS)
+    pending = _load_movie_async(movie_id)
+    reviews = _movie_review_fields(movie_id)
 
     try:
-        response = requests.get(
-            f"{BASE_URL}{random_movie_id}?api_key={API_KEY}", timeout=8
-        )
-        response.raise_for_status()
-        movie = response.json()
+        movie = pending.result(timeout=deadline.remaining())
+    except FuturesTimeout:
+        return jsonify({"error": "Timed out fetching movie"}), 504
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            return jsonify({"error": "Movie not found"}), 404
+        return jsonify({"error": "Failed to fetch movie", "details": str(e)}), 502
     except Exception as e:
         return jsonify({"error": "Failed to fetch movie", "details": str(e)}), 502
 
-    wiki_link = get_wikipedia_link(movie["title"])
-    reviews = Review.query.filter_by(movie_id=random_movie_id).all()
+    try:
+        _cache_movie_titles({movie_id: movie["title"]})
+    except Exception:
+        pass
+    body = {**movie, **reviews}
+    _cache_top_movie(movie_id, body, versions)
+    return body
+
+
+def _movie_review_fields(movie_id: int) -> dict:
+    """The review part of the movie payload."""
+    # Only the first page is embedded; the rest via /api/movie/<id>/reviews
+    first_page, next_cursor = review_store.movie_page(movie_id, None, MOVIE_REVIEWS_PAGE_SIZE)
+    return {
+        "reviews": list(first_page),
+        "reviews_next_cursor": next_cursor,
+        "review_stats": review_store.summary(movie_id),
+    }
+
+
+def _render_top_movie(movie_id: int, allow_upstream: bool):
+    """``(body, fetched)`` for the top-movie refresher, from the store unless stale."""
+    try:
+        result = movie_store.revalidate(
+            movie_id, fetch_movie, get_wikipedia_link, flight=movie_flight, allow_fetch=allow_upstream
+        )
+        if result is None:
+            return None
+        movie, fetched = result
+        return {**movie, **_movie_review_fields(movie_id)}, fetched
+    finally:
+        # Long-running process: start every movie from a clean session
+        db.session.remove()
+
+
+def _cache_top_movie(movie_id: int, body: dict, versions: dict):
+    """Keep a longer-lived Redis copy of the payload for the top-N movies."""
+    if redis_client is None:
+        return
+    try:
+        if view_counter.is_top(movie_id):
+            redis_client.setex(
+                _top_movie_key(movie_id),
+                TOP_MOVIE_TTL_SECS,
+                json.dumps(tag(body, versions)),
+            )
+    except Exception:
+        pass
+
+
+def _invalidate_movies(movie_ids):
+    """Bump movie versions so every cached copy of these movies goes stale."""
+    _drop_local_movies(movie_ids)
+    try:
+        movie_versions.bump(movie_ids)
+    except Exception:
+        pass
+
+
+def _drop_local_movies(movie_ids):
+    for mid in movie_ids:
+        movie_l1.delete(int(mid))
+
+
+def _review_personalizer():
+    """Return a function that shows the current user's Cognito 'name' on their
+    own reviews (like Navbar), or None for anonymous requests."""
+    sess = _current_session()
+    username = sess.get("username") if sess else None
+    display_name = sess.get("display_name") if sess else None
+    if not (username and display_name):
+        return None
+    return lambda rev: {**rev, "display_name": display_name} if rev["username"] == username else rev
+
+
+def _personalize_reviews(body: dict) -> dict:
+    if not body.get("reviews"):
+        return body
+    personalize = _review_personalizer()
+    if personalize is None:
+        return body
+    return {**body, "reviews": [personalize(rev) for rev in body["reviews"]]}
+
+
+def _page_args(default: int, maximum: int):
+    """``(cursor, limit)`` from the query string; ``ValueError`` if malformed."""
+    cursor = review_store.parse_cursor(request.args.get("cursor"))
+    limit = int(request.args.get("limit", default))
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return cursor, min(limit, maximum)
+
+
+def _stream_json_array(items, next_cursor=None) -> Response:
+    """Stream ``items`` as a JSON array, a chunk at a time, without building
+    the whole body; the cursor of the next page goes in ``X-Next-Cursor``."""
+
+    def generate():
+        chunk = []
+        sep = "["
+        for item in items:
+            chunk.append(sep + json.dumps(item))
+            sep = ","
+            if len(chunk) >= 100:
+                yield "".join(chunk)
+                chunk = []
+        chunk.append("[]" if sep == "[" else "]")
+        yield "".join(chunk)
+
+    resp = Response(stream_with_context(generate()), mimetype="application/json")
+    if next_cursor:
+        resp.headers["X-Next-Cursor"] = next_cursor
+    return resp
 
-    # Prefer showing the friendly display name for the current user (like Navbar)
-    sid = request.cookies.get(SESSION_COOKIE_NAME)
-    sess = _session_store_get(sid) if sid else None
-    current_user_id = sess.get("user_id") if sess else None
-    current_display_name = sess.get("display_name") if sess else None
 
+def _movie_cache_key(movie_id: int) -> str:
+    # Cache per-movie response, including reviews embedded
+    return f"movie_{movie_id}"
+
+
+movie_versions = MovieVersions(redis_client, cache)
+movie_responses = ResponseCache(cache, "movie", timeout=300)
+search_responses = ResponseCache(cache, "search", timeout=300)
+# Title search runs against the locally stored movies first; TMDB is only
+# asked when fewer than SEARCH_MIN_LOCAL_RESULTS titles match every word
+SEARCH_RESULTS = int(os.getenv("SEARCH_RESULTS", "20"))
+SEARCH_MIN_LOCAL_RESULTS = int(os.getenv("SEARCH_MIN_LOCAL_RESULTS", "5"))
+SEARCH_REFRESH_SECS = float(os.getenv("SEARCH_REFRESH_SECS", "30"))
+title_index = SearchIndex(refresh_secs=SEARCH_REFRESH_SECS)
+title_index.start(app)
+# hits: answered locally, misses: went to TMDB, errors: TMDB failed
+search_sources = CacheStats("search_index")
+top_movie_stats = CacheStats("topmovie")
+movie_l1 = LocalCache(
+    "movie_l1", MOVIE_L1_MAX_ENTRIES, MOVIE_L1_MAX_BYTES, MOVIE_L1_TTL_SECS
+)
+# Other workers announce review writes over pub/sub; drop our copies too
+movie_versions.subscribe(_drop_local_movies, on_reset=movie_l1.clear)
+
+
+def _cached_movie_body(movie_id: int):
+    """Shared movie payload: in-process L1, then movie_<id>/topmovie:<id>, then a build."""
+    body = movie_l1.get(movie_id)
+    if body is not None:
+        return body
+    epoch = movie_l1.epoch
+    versions = movie_versions.current([movie_id])
+    body = movie_responses.get_or_build(
+        _movie_cache_key(movie_id),
+        lambda: _movie_body(movie_id, versions),
+        versions=versions,
+    )
+    if isinstance(body, dict):
+        movie_l1.set(movie_id, body, size=len(json.dumps(body)), epoch=epoch)
+    return body
+
+
+@app.route("/api/movie", methods=["GET"])
+@app.route("/api/explore", methods=["GET"])  # New path for random explore
+def get_random_movie():
+    movie_ids = [550, 13, 680, 157336, 120, 424, 155, 122, 27205, 423]
+    # Signed-in users explore among their own recommendations when there are any
+    picks = _recommendations_for_session(10, personal_only=True)
+    if picks:
+        movie_ids = [mid for mid, _ in picks]
+    random_movie_id = random.choice(movie_ids)
+
+    body = _cached_movie_body(random_movie_id)
+    if not isinstance(body, dict):
+        return body
+    return jsonify(_personalize_reviews(body))
+
+
+def _recommendations_for_session(n: int, personal_only: bool = False):
+    """``(movie_id, score)`` picks for the signed-in user (most-rated if anonymous).
+
+    With ``personal_only``, anonymous users and users without ratings get none.
+    """
+    sess = _current_session()
+    user_id = _session_user_id(sess) if sess else None
+    ratings = {}
+    if user_id:
+        ratings = dict(
+            db.session.execute(
+                select(Review.movie_id, Review.rating).where(
+                    Review.user_id == user_id, Review.rating.isnot(None)
+                )
+            ).all()
+        )
+    if personal_only and not ratings:
+        return []
+    model = factor_store.get() if ratings else None
+    if model is not None:
+        picks = model.recommend(ratings, n)
+        if picks:
+            return picks
+    return recommender.recommend(ratings, n)
+
+
+@app.route("/api/recommendations", methods=["GET"])
+def get_recommendations():
+    """Movies similar to the ones the signed-in user rated highly."""
+    try:
+        limit = min(max(int(request.args.get("limit", 20)), 1), 100)
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    picks = _recommendations_for_session(limit)
+    titles = resolve_titles(
+        (mid for mid, _ in picks),
+        lookup=_cached_movie_titles,
+        store=_store_fetched_movies,
+    )
     return jsonify(
-        {
-            "id": movie["id"],
-            "title": movie["title"],
-            "tagline": movie.get("tagline", ""),
-            "genres": [
-                {"id": g.get("id"), "name": g.get("name")}
-                for g in movie.get("genres", [])
-            ],
-            "poster_path": movie["poster_path"],
-            "overview": movie.get("overview", ""),
-            "wiki_link": wiki_link,
-            "reviews": [
-                {
-                    "username": rev.user.username,
-                    # Include a display_name; for the current user's own reviews, use Cognito's 'name'
-                    "display_name": (current_display_name if current_user_id and rev.user_id == current_user_id else None) or rev.user.username,
-                    "rating": rev.rating,
-                    "comment": rev.comment,
-                }
-                for rev in reviews
-            ],
-        }
+        [
+            {"id": mid, "title": titles.get(mid, "Unknown"), "score": round(score, 4)}
+            for mid, score in picks
+        ]
     )
 
 
+def _upsert_review(user_id: int, movie_id: int, rating, comment) -> bool:
+    """Insert or overwrite the user's review of a movie; True if it was new."""
+    for _ in range(2):
+        review = Review.query.filter_by(user_id=user_id, movie_id=movie_id).first()
+        created = review is None
+        changes = review_store.RatingChanges(user_id)
+        if created:
+            review = Review(movie_id=movie_id, user_id=user_id)
+            db.session.add(review)
+            changes.add(movie_id, rating)
+        else:
+            changes.change(movie_id, review.rating, rating)
+        review.rating = rating
+        review.comment = comment
+        try:
+            db.session.flush()
+            changes.apply()
+            db.session.commit()
+            return created
+        except IntegrityError:
+            # A concurrent request inserted it first; update that row instead
+            db.session.rollback()
+            if not created:
+                raise
+    raise RuntimeError("Could not save review")
+
+
 @app.route("/api/review", methods=["POST"])
 def submit_review():
     """Handles review submission."""
@@ -446,38 +828,23 @@ def submit_review():
         comment = data.get("comment")
 
         # Identify user from session
-        sid = request.cookies.get(SESSION_COOKIE_NAME)
-        sess = _session_store_get(sid) if sid else None
+        sess = _current_session()
 
         if not movie_id:
             return jsonify({"error": "Movie ID is required"}), 400
         if not sess:
             return jsonify({"error": "Unauthorized"}), 401
-        user = None
-        if sess.get("user_id"):
-            user = User.query.filter_by(id=sess["user_id"]).first()
-        if not user and sess.get("username"):
-            user = User.query.filter_by(username=sess["username"]).first()
-        if not user:
+        user_id = _session_user_id(sess)
+        if not user_id:
             return jsonify({"error": "User not found"}), 401
 
-        review = Review(
-            movie_id=movie_id,
-            user_id=user.id,
-            rating=rating,
-            comment=comment,
-        )
-        db.session.add(review)
-        db.session.commit()
-        # Invalidate caches affected by this change
-        cache.delete("random_movie")
-        try:
-            cache.delete(f"movie_{movie_id}")
-        except Exception:
-            pass
+        # One review per user per movie: resubmitting replaces the earlier one
+        created = _upsert_review(user_id, movie_id, rating, comment)
+        # Invalidate every cached copy of this movie (including top-N)
+        _invalidate_movies([movie_id])
         return jsonify(
             {
-                "message": "Review added!",
+                "message": "Review added!" if created else "Review updated!",
                 "rating": rating,
                 "comment": comment,
             }
@@ -487,107 +854,96 @@ def submit_review():
         return jsonify({"error": str(e)}), 500
 
 
-@cache.cached(timeout=300, query_string=True)
 @app.route("/api/search", methods=["GET"])
 def search_movies():
     query = request.args.get("query")
     if not query:
         return jsonify({"error": "Query parameter is required."}), 400
 
-    search_url = f"https://api.themoviedb.org/3/search/movie?api_key={API_KEY}&query={query}"
-    response = requests.get(search_url)
-    data = response.json()
-    results = data.get("results", [])
-    return jsonify(results)
-
-
-def _movie_cache_key():
-    # Cache per-movie response, including reviews embedded
-    return f"movie_{request.view_args['movie_id']}"
-
-@cache.cached(timeout=300, key_prefix=_movie_cache_key)
-@app.route("/api/movie/<int:movie_id>", methods=["GET"])
-def get_movie(movie_id):
-    # Fast-path: if we maintain a dedicated Redis cache for top movies, try to serve it first
-    if redis_client is not None:
+    def build():
+        local = [
+            {"id": m["id"], "title": m["title"], "poster_path": m["poster_path"]}
+            for m in title_index.search(query, SEARCH_RESULTS)
+            if m["matched"] == 1
+        ]
+        if len(local) >= SEARCH_MIN_LOCAL_RESULTS:
+            search_sources.count("hits")
+            return local
+        search_sources.count("misses")
         try:
-            cached = redis_client.get(_top_movie_key(movie_id))
-            if cached:
-                data = json.loads(cached)
-                return jsonify(data)
-        except Exception:
-            # Ignore cache errors and continue with normal flow
-            pass
+            return search_tmdb(query)
+        except Exception as e:
+            search_sources.count("errors")
+            if local:
+                # TMDB is down or rate limiting us: partial local matches beat an error
+                return local
+            return jsonify({"error": "Search failed", "details": str(e)}), 502
+
+    normalized = normalize_query(query) or " ".join(query.lower().split())
+    body = search_responses.get_or_build(f"search_{normalized}", build)
+    if not isinstance(body, list):
+        return body
+    return jsonify(body)
+
+
+@app.route("/api/search/suggest", methods=["GET"])
+def suggest_movies():
+    """Typeahead: stored titles completing ``?query=``, most viewed first; never calls TMDB."""
     try:
-        tmdb_resp = requests.get(
-            f"{BASE_URL}{movie_id}?api_key={API_KEY}", timeout=8
-        )
-        if tmdb_resp.status_code == 404:
-            return jsonify({"error": "Movie not found"}), 404
-        tmdb_resp.raise_for_status()
-        movie = tmdb_resp.json()
-    except Exception as e:
-        return jsonify({"error": "Failed to fetch movie", "details": str(e)}), 502
+        limit = min(max(int(request.args.get("limit", 8)), 1), 20)
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    query = request.args.get("query", "")
+    return jsonify(title_index.suggest(query, limit, views=view_counter.views))
 
-    wiki_link = get_wikipedia_link(movie.get("title", ""))
-    reviews = Review.query.filter_by(movie_id=movie_id).all()
 
-    # Prefer showing the friendly display name for the current user (like Navbar)
-    sid = request.cookies.get(SESSION_COOKIE_NAME)
-    sess = _session_store_get(sid) if sid else None
-    current_user_id = sess.get("user_id") if sess else None
-    current_display_name = sess.get("display_name") if sess else None
-
-    payload = {
-        "id": movie.get("id", movie_id),
-        "title": movie.get("title", "Untitled"),
-        "tagline": movie.get("tagline", ""),
-        "genres": [
-            {"id": g.get("id"), "name": g.get("name")}
-            for g in movie.get("genres", [])
-        ],
-        "poster_path": movie.get("poster_path"),
-        "overview": movie.get("overview", ""),
-        "wiki_link": wiki_link,
-        "reviews": [
-            {
-                "username": rev.user.username,
-                "display_name": (current_display_name if current_user_id and rev.user_id == current_user_id else None) or rev.user.username,
-                "rating": rev.rating,
-                "comment": rev.comment,
-            }
-            for rev in reviews
-        ],
-    }
+@app.route("/api/movie/<int:movie_id>", methods=["GET"])
+def get_movie(movie_id):
+    body = _cached_movie_body(movie_id)
+    if not isinstance(body, dict):
+        return body
+    # Buffered locally; flushed to the movie:views zset in the background
+    view_counter.record(movie_id)
+    return jsonify(_personalize_reviews(body))
 
-    # Track access frequency and cache top-N movies in Redis
-    if redis_client is not None:
-        try:
-            # Increment view count for this movie
-            redis_client.zincrby(TOP_MOVIE_ZSET, 1, str(movie_id))
-            rank = redis_client.zrevrank(TOP_MOVIE_ZSET, str(movie_id))
-            if rank is not None and rank < TOP_MOVIE_CACHE_SIZE:
-                # Cache/refresh payload for top-N items
-                redis_client.setex(_top_movie_key(movie_id), TOP_MOVIE_TTL_SECS, json.dumps(payload))
-                # Opportunistic prune: remove cached payloads beyond top-N (limit per request)
-                try:
-                    tail_ids = redis_client.zrevrange(TOP_MOVIE_ZSET, TOP_MOVIE_CACHE_SIZE, -1)
-                    if tail_ids:
-                        tail_ids = tail_ids[:50]  # cap deletes per request
-                        with redis_client.pipeline() as pipe:
-                            for mid in tail_ids:
-                                try:
-                                    mid_int = int(mid)
-                                except Exception:
-                                    mid_int = mid
-                                pipe.delete(_top_movie_key(mid_int))
-                            pipe.execute()
-                except Exception:
-                    pass
-        except Exception:
-            pass
 
-    return jsonify(payload)
+@app.route("/api/movie/<int:movie_id>/reviews", methods=["GET"])
+def get_movie_reviews(movie_id):
+    """Page through a movie's reviews (``?cursor=&limit=``), oldest first."""
+    try:
+        cursor, limit = _page_args(REVIEWS_PAGE_SIZE, REVIEWS_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "Invalid cursor or limit"}), 400
+    items, next_cursor = review_store.movie_page(movie_id, cursor, limit)
+    personalize = _review_personalizer()
+    if personalize is not None:
+        items = map(personalize, items)
+    return _stream_json_array(items, next_cursor)
+
+
+@app.route("/api/movie/<int:movie_id>/similar", methods=["GET"])
+def get_similar_movies(movie_id):
+    """Movies with the closest genres and overview to this one (``?limit=``)."""
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), 100)
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    index = similar_store.get()
+    if index is None:
+        return jsonify([])
+    movie = None
+    if index.vector(movie_id) is None:
+        # Cached after the index was built: embed it from the stored metadata
+        rec = db.session.get(Movie, movie_id)
+        movie = rec.to_dict() if rec is not None else None
+    picks = index.similar(movie_id, limit, movie=movie)
+    titles = _cached_movie_titles([mid for mid, _ in picks])
+    return jsonify(
+        [
+            {"id": mid, "title": titles.get(mid, "Unknown"), "score": round(score, 4)}
+            for mid, score in picks
+        ]
+    )
 
 
 @app.route("/api/login", methods=["POST"])
@@ -631,47 +987,45 @@ def logout():
 # REIVEWS
 @app.route("/api/my-reviews", methods=["GET"])
 def get_user_reviews():
-    """Fetch all reviews for a given username."""
+    """Page through a user's reviews (``?cursor=&limit=``), oldest first."""
+    try:
+        cursor, limit = _page_args(REVIEWS_PAGE_SIZE, REVIEWS_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "Invalid cursor or limit"}), 400
     username = request.args.get("username")
-    user = None
+    user_id = None
     if username:
         user = User.query.filter_by(username=username).first()
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+        user_id = user.id
     else:
         # Fallback to session
-        sid = request.cookies.get(SESSION_COOKIE_NAME)
-        sess = _session_store_get(sid) if sid else None
-        if sess and sess.get("user_id"):
-            user = User.query.filter_by(id=sess["user_id"]).first()
-        elif sess and sess.get("username"):
-            user = User.query.filter_by(username=sess["username"]).first()
-        if not user:
+        sess = _current_session()
+        user_id = _session_user_id(sess) if sess else None
+        if not user_id:
             return jsonify({"error": "Unauthorized"}), 401
 
-    user_reviews = Review.query.filter_by(user_id=user.id).all()
-
-            # Invalidate dedicated Redis top-N cache for this movie
-            try:
-                if redis_client is not None:
-                    redis_client.delete(_top_movie_key(int(movie_id)))
-            except Exception:
-                pass
-    reviews_with_titles = []
-    for review in user_reviews:
-        response = requests.get(
-            f"{BASE_URL}{review.movie_id}?api_key={API_KEY}"
-        )
-        movie = response.json()
-        reviews_with_titles.append(
-            {
-                "id": review.id,
-                "movie_id": review.movie_id,
-                "movie_title": movie.get("title", "Unknown"),
-                "rating": review.rating,
-                "comment": review.comment,
-            }
-        )
+    user_reviews, next_cursor = review_store.user_page(user_id, cursor, limit)
+
+    # Resolve every distinct title on the page at once; only cache misses go to TMDB
+    titles = resolve_titles(
+        (movie_id for _, movie_id, _, _ in user_reviews),
+        lookup=_cached_movie_titles,
+        store=_store_fetched_movies,
+    )
+    reviews_with_titles = (
+        {
+            "id": review_id,
+            "movie_id": movie_id,
+            "movie_title": titles.get(movie_id, "Unknown"),
+            "rating": rating,
+            "comment": comment,
+        }
+        for review_id, movie_id, rating, comment in user_reviews
+    )
 
-    return jsonify(reviews_with_titles)
+    return _stream_json_array(reviews_with_titles, next_cursor)
 
 
 @app.route("/api/delete-review/<int:review_id>", methods=["DELETE"])
@@ -687,19 +1041,13 @@ def delete_review(review_id):
         if not review:
             return jsonify({"error": "Review not found or unauthorized"}), 404
         movie_id = review.movie_id
+        changes = review_store.RatingChanges(review.user_id)
+        changes.remove(movie_id, review.rating)
         db.session.delete(review)
+        changes.apply()
         db.session.commit()
-        # Invalidate caches for this movie and random selection
-        try:
-            cache.delete("random_movie")
-            cache.delete(f"movie_{movie_id}")
-        except Exception:
-            pass
-        try:
-            if redis_client is not None:
-                redis_client.delete(_top_movie_key(int(movie_id)))
-        except Exception:
-            pass
+        # Invalidate every cached copy of this movie
+        _invalidate_movies([movie_id])
         return jsonify({"message": "Review deleted"})
     except Exception as e:
         print(e)
@@ -708,46 +1056,169 @@ def delete_review(review_id):
 
 @app.route("/api/update-reviews", methods=["POST"])
 def update_reviews():
-    """Update multiple reviews' ratings."""
-    data = request.get_json()
-    print(data)
+    """Update several of the session user's reviews at once."""
+    data = request.get_json(silent=True) or {}
     updates = data.get("updates", [])
+    if not isinstance(updates, list):
+        return jsonify({"error": "updates must be a list"}), 400
 
-    affected_movie_ids = set()
-    for update in updates:
-        review = Review.query.filter_by(id=update["id"]).first()
-        if review:
-            affected_movie_ids.add(review.movie_id)
-            if "rating" in update:
-                review.rating = update["rating"]
-            if "comment" in update:
-                review.comment = update["comment"]
+    sess = _current_session()
+    if not sess:
+        return jsonify({"error": "Unauthorized"}), 401
+    user_id = _session_user_id(sess)
+    if not user_id:
+        return jsonify({"error": "User not found"}), 401
 
+    # Only the user's own reviews are touched; others report not_found
+    results, affected_movie_ids = review_store.bulk_update(user_id, updates)
     db.session.commit()
-    # Invalidate caches for all affected movies and random selection
-    try:
-        cache.delete("random_movie")
-        for mid in affected_movie_ids:
-            cache.delete(f"movie_{mid}")
-    except Exception:
-        pass
-    # Invalidate dedicated Redis top-N cache for affected movies
-    try:
-        if redis_client is not None:
-            with redis_client.pipeline() as pipe:
-                for mid in affected_movie_ids:
-                    pipe.delete(_top_movie_key(int(mid)))
-                pipe.execute()
-    except Exception:
-        pass
-    return jsonify({"message": "Reviews updated successfully"})
+    # Invalidate every cached copy of the affected movies
+    _invalidate_movies(affected_movie_ids)
+    return jsonify({"message": "Reviews updated successfully", "results": results})
+
+
+@app.route("/api/health/caches", methods=["GET"])
+def cache_health():
+    """Hit/miss counters for each cache tier."""
+    return jsonify({
+        "movie_l1": movie_l1.stats(),
+        "movie": movie_responses.stats(),
+        "topmovie": top_movie_stats.snapshot(),
+        "search": search_responses.stats(),
+        "search_index": {**search_sources.snapshot(), **title_index.stats()},
+        "session_l1": session_store.local.stats(),
+        "jwks": jwks_keys.counters.snapshot(),
+    })
+
+
+@app.route("/api/health/recommendations", methods=["GET"])
+def recommendation_health():
+    """Index size, freshness, and drift from the last full rebuild."""
+    stats = recommender.stats()
+    model = factor_store.get()
+    stats["factor_model"] = model.stats() if model is not None else None
+    index = similar_store.get()
+    stats["similar_index"] = index.stats() if index is not None else None
+    return jsonify(stats)
+
+
+@app.route("/api/health/slow-requests", methods=["GET"])
+def slow_request_health():
+    """Most frequent sampled stacks of the latest requests over METRICS_SLOW_REQUEST_MS."""
+    if slow_requests is None:
+        return jsonify({"enabled": False, "profiles": []})
+    return jsonify({
+        "enabled": True,
+        "threshold_ms": METRICS_SLOW_REQUEST_MS,
+        "profiles": list(slow_requests.profiles),
+    })
+
+
+@app.route("/api/health/upstreams", methods=["GET"])
+def upstream_health():
+    """Per-host upstream latency, error, circuit-breaker and connection-pool stats."""
+    return jsonify(upstream.stats())
+
+
+@app.cli.command("train-factors")
+@click.option("--factors", default=32, show_default=True, help="Latent dimensions.")
+@click.option("--iterations", default=8, show_default=True, help="ALS sweeps.")
+@click.option("--keep", default=3, show_default=True, help="Model versions to keep.")
+def train_factors(factors, iterations, keep):
+    """Train the ALS model on all ratings and publish it as the current version."""
+    user_ids, movie_ids, ratings = load_ratings()
+    if not len(ratings):
+        click.echo("No ratings to train on", err=True)
+        return
+    start = time.monotonic()
+    arrays = factor_model.train(user_ids, movie_ids, ratings, factors=factors, iterations=iterations)
+    path = factor_model.write(RECOMMENDER_MODEL_DIR, arrays, keep=keep)
+    click.echo(
+        f"Trained on {len(ratings)} ratings in {time.monotonic() - start:.1f}s, wrote {path}"
+    )
+
+
+@app.cli.command("build-similar")
+@click.option("--keep", default=3, show_default=True, help="Index versions to keep.")
+def build_similar(keep):
+    """Embed every stored movie and publish a new similar-movies index."""
+    start = time.monotonic()
+    rows = db.session.execute(select(Movie).execution_options(yield_per=5000)).scalars()
+    arrays = similar.build(rec.to_dict() for rec in rows)
+    path = similar.write(SIMILAR_INDEX_DIR, arrays, keep=keep)
+    click.echo(
+        f"Indexed {len(arrays['ids'])} movies in {time.monotonic() - start:.1f}s, wrote {path}"
+    )
+
+
+@app.cli.command("resolve-wiki-links")
+@click.option("--limit", default=1000, show_default=True, help="Movies to look up at most.")
+@click.option("--search/--no-search", default=True, show_default=True, help="Search titles without a '(film)' page.")
+def resolve_wiki_links(limit, search):
+    """Look up Wikipedia links for stored movies that have none and are due a retry."""
+    start = time.monotonic()
+    found, missed = wiki.resolve_pending(limit, search_fallback=search, on_resolved=_invalidate_movies)
+    click.echo(f"{found} links found, {missed} movies without one, in {time.monotonic() - start:.1f}s")
+
+
+@app.cli.command("refresh-top-movies")
+@click.option("--once", is_flag=True, help="Make a single pass instead of running forever.")
+def refresh_top_movies(once):
+    """Keep the cached payloads of the most viewed movies from expiring."""
+    if redis_client is None:
+        click.echo("The top-movie cache needs Redis (CACHE_TYPE=redis)", err=True)
+        return
+    worker = refresher.TopMovieRefresher(
+        redis_client,
+        movie_versions,
+        TOP_MOVIE_ZSET,
+        _top_movie_key,
+        _render_top_movie,
+        top_n=TOP_MOVIE_CACHE_SIZE,
+        ttl_secs=TOP_MOVIE_TTL_SECS,
+        ahead_secs=TOP_MOVIE_REFRESH_AHEAD_SECS,
+        tmdb_budget_per_min=TMDB_REFRESH_BUDGET_PER_MIN,
+        interval_secs=TOP_MOVIE_REFRESH_INTERVAL_SECS,
+    )
+    if once:
+        refreshed = worker.run_once()
+        click.echo(f"Refreshed {refreshed} top movies: {worker.totals}")
+        return
+    worker.run()
+
+
+@app.cli.command("warm-movies")
+@click.argument("movie_ids", nargs=-1, type=int)
+@click.option(
+    "--file",
+    "id_file",
+    type=click.File("r"),
+    help="File with one TMDB movie ID per line.",
+)
+def warm_movies(movie_ids, id_file):
+    """Preload TMDB metadata for the given movie IDs into the movie store."""
+    ids = list(movie_ids)
+    if id_file is not None:
+        ids.extend(int(line) for line in id_file if line.strip())
+    ids = list(dict.fromkeys(ids))
+    batch_size = 100
+    loaded = 0
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        movies = fetch_movies(batch)
+        _store_fetched_movies(movies)
+        loaded += len(movies)
+        for mid in batch:
+            if mid not in movies:
+                click.echo(f"Failed to fetch movie {mid}", err=True)
+    click.echo(f"Warmed {loaded}/{len(ids)} movies")
 
 
 if __name__ == "__main__":
-    # Ensure database tables exist on startup when running via python main.py
+    # Bring the schema up to date on startup when running via python main.py
     try:
         with app.app_context():
-            db.create_all()
+            upgrade_db()
     except Exception as e:
         # Log and continue; app may still start and expose errors in logs
         print(f"DB init error: {e}")
@@ -0,0 +1,124 @@
+"""Versioned NumPy array files that every worker maps read-only.
+
+A version is one file: a JSON header (array dtypes/shapes/offsets plus any
+metadata) followed by the page-aligned raw arrays, so readers can map each
+array in place and all workers on a host share one page-cache copy. New
+versions are written under a temporary name and renamed, then the
+directory's ``CURRENT`` pointer is replaced the same way, so readers only
+ever see complete versions.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+import numpy as np
+
+CURRENT = "CURRENT"
+_ALIGN = 4096
+
+T = TypeVar("T")
+
+
+def write(directory: str, prefix: str, arrays: Dict[str, np.ndarray], meta=None, keep: int = 3) -> str:
+    """Store ``arrays`` as a new version in ``directory`` and make it current; returns its path."""
+    os.makedirs(directory, exist_ok=True)
+    now = time.time_ns()
+    version = time.strftime("%Y%m%d%H%M%S", time.gmtime(now // 10**9)) + f".{now % 10**9:09d}-{os.getpid()}"
+    name = f"{prefix}-{version}.bin"
+    layout, offset = {}, _ALIGN
+    for key, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        layout[key] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+    header = json.dumps({"version": version, "meta": meta or {}, "arrays": layout}).encode()
+    if len(header) >= _ALIGN:
+        raise ValueError("array file header too large")
+
+    tmp = os.path.join(directory, f".{name}.tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(header.ljust(_ALIGN, b"\0"))
+        for key, array in arrays.items():
+            fh.seek(layout[key]["offset"])
+            fh.write(np.ascontiguousarray(array).tobytes())
+        fh.truncate(offset)
+        fh.flush()
+        os.fsync(fh.fileno())
+    path = os.path.join(directory, name)
+    os.replace(tmp, path)
+
+    pointer = os.path.join(directory, f".{CURRENT}.tmp")
+    with open(pointer, "w") as fh:
+        fh.write(name)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(pointer, os.path.join(directory, CURRENT))
+
+    # Old versions may still be mapped by workers; unlinking leaves those maps valid
+    versions = sorted(n for n in os.listdir(directory) if n.startswith(f"{prefix}-") and n.endswith(".bin"))
+    for old in versions[:-keep]:
+        try:
+            os.unlink(os.path.join(directory, old))
+        except OSError:
+            pass
+    return path
+
+
+def read(path: str) -> Tuple[dict, Dict[str, np.ndarray]]:
+    """Map every array in ``path``; returns ``(header, arrays)``.
+
+    The arrays are plain ndarray views of read-only maps: zero-copy, and
+    results computed from them are ordinary arrays.
+    """
+    with open(path, "rb") as fh:
+        header = json.loads(fh.read(_ALIGN).rstrip(b"\0"))
+    arrays = {
+        key: np.asarray(
+            np.memmap(path, mode="r", dtype=np.dtype(spec["dtype"]), offset=spec["offset"], shape=tuple(spec["shape"]))
+        )
+        for key, spec in header["arrays"].items()
+    }
+    return header, arrays
+
+
+class VersionedStore(Generic[T]):
+    """The current version in ``directory``, loaded with ``load(path)``.
+
+    ``get`` re-reads the ``CURRENT`` pointer at most every ``check_secs``
+    and swaps in a newly published version whole; callers holding the old
+    object keep using it.
+    """
+
+    def __init__(self, directory: Optional[str], load: Callable[[str], T], check_secs: float = 30):
+        self.directory = directory
+        self.load = load
+        self.check_secs = check_secs
+        self.current: Optional[T] = None
+        self._name = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[T]:
+        if self.directory and time.monotonic() - self._checked >= self.check_secs:
+            self._reload()
+        return self.current
+
+    def _reload(self):
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._checked = time.monotonic()
+            try:
+                with open(os.path.join(self.directory, CURRENT)) as fh:
+                    name = fh.read().strip()
+            except OSError:
+                return
+            if name and name != self._name:
+                self.current = self.load(os.path.join(self.directory, name))
+                self._name = name
+        except Exception as e:
+            print(f"Loading {self.directory} failed: {e}")
+        finally:
+            self._lock.release()
@@ -0,0 +1,214 @@
+"""Prometheus metrics for requests, upstream calls, SQL queries and caches.
+
+``init_app`` times every request by route and status, counts the SQL
+queries it ran and serves everything at ``/metrics``. ``upstream`` and the
+cache tiers (``CacheStats``) record into the metrics below themselves.
+
+Under gunicorn each worker keeps its own metrics; set
+``PROMETHEUS_MULTIPROC_DIR`` to an empty directory so ``/metrics`` reports
+all workers together (``gunicorn.conf.py`` clears it on start).
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter as Tally
+from collections import deque
+from typing import Optional
+
+from flask import Response, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to build and send each response.", ["route", "method", "status"]
+)
+UPSTREAM_SECONDS = Histogram(
+    "upstream_request_duration_seconds",
+    "Time of each upstream HTTP attempt, retries included.",
+    ["upstream", "outcome"],
+)
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "Time of each SQL statement.", buckets=_FAST_BUCKETS)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements run by each request.", ["route"], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+DB_SECONDS_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds", "Time each request spent in SQL.", ["route"], buckets=_FAST_BUCKETS
+)
+CACHE_LOOKUPS = Counter("cache_lookups", "Lookups per cache tier by result.", ["cache", "result"])
+
+_RESULTS = {"hits": "hit", "misses": "miss", "errors": "error"}
+
+
+def count_cache(cache: str, field: str, n: int = 1):
+    CACHE_LOOKUPS.labels(cache, _RESULTS.get(field, field)).inc(n)
+
+
+def _route() -> str:
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("metrics_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    DB_QUERY_SECONDS.observe(elapsed)
+    if has_request_context() and "metrics_queries" in g:
+        g.metrics_queries += 1
+        g.metrics_db_secs += elapsed
+
+
+def _handle_error(context):
+    started = context.connection.info.get("metrics_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def _frames(frame, limit: int = 64) -> str:
+    """Stack of ``frame`` in collapsed (flame graph) form, outermost first."""
+    names = []
+    while frame is not None and len(names) < limit:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SlowRequestProfiler:
+    """Samples the stacks of in-flight requests and keeps the profiles of slow ones.
+
+    While any request is running, a background thread records the stack of
+    each request thread every ``interval_secs``. A request that took at
+    least ``threshold_secs`` has its most frequent stacks printed and kept
+    (the last ``keep``) for ``profiles``.
+    """
+
+    def __init__(self, threshold_secs: float, interval_secs: float = 0.005, keep: int = 20, top: int = 10):
+        self.threshold_secs = threshold_secs
+        self.interval_secs = interval_secs
+        self.top = top
+        self.profiles = deque(maxlen=keep)
+        self._active = {}  # thread id -> Tally of collapsed stacks
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def begin(self):
+        with self._lock:
+            self._active[threading.get_ident()] = Tally()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def end(self, route: str, elapsed: float):
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if not samples or elapsed < self.threshold_secs:
+            return
+        total = sum(samples.values())
+        stacks = [{"stack": stack, "samples": n} for stack, n in samples.most_common(self.top)]
+        self.profiles.append(
+            {"route": route, "ms": round(elapsed * 1000, 1), "at": time.time(), "samples": total, "stacks": stacks}
+        )
+        leaf = stacks[0]["stack"].rsplit(";", 1)[-1]
+        print(f"Slow request {route}: {elapsed * 1000:.0f} ms, {total} samples, mostly in {leaf}")
+
+    def cancel(self):
+        """Stop sampling this thread's request without keeping a profile."""
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                idle = not self._active
+                if idle:
+                    self._wake.clear()
+            if idle:
+                self._wake.wait()
+                continue
+            time.sleep(self.interval_secs)
+            frames = sys._current_frames()
+            with self._lock:
+                for tid, samples in self._active.items():
+                    frame = frames.get(tid)
+                    if frame is not None and tid != me:
+                        samples[_frames(frame)] += 1
+            del frames
+
+
+def _registry():
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def init_app(app, slow_request_secs: float = 0, profile_interval_secs: float = 0.005) -> Optional[SlowRequestProfiler]:
+    """Instrument ``app`` and add ``/metrics``; returns the profiler if ``slow_request_secs`` > 0."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+    profiler = SlowRequestProfiler(slow_request_secs, profile_interval_secs) if slow_request_secs > 0 else None
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+        g.metrics_queries = 0
+        g.metrics_db_secs = 0.0
+        if profiler is not None:
+            profiler.begin()
+
+    @app.after_request
+    def _observe_request(response):
+        if "metrics_started" not in g or request.endpoint == "metrics":
+            return response
+        route, method, status = _route(), request.method, str(response.status_code)
+        request_g = g._get_current_object()
+
+        # Recorded once the response is sent: streamed bodies run their
+        # queries after this point, against the same ``g``
+        def _observe():
+            elapsed = time.perf_counter() - request_g.metrics_started
+            REQUEST_SECONDS.labels(route, method, status).observe(elapsed)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(request_g.metrics_queries)
+            DB_SECONDS_PER_REQUEST.labels(route).observe(request_g.metrics_db_secs)
+            if profiler is not None:
+                profiler.end(route, elapsed)
+
+        response.call_on_close(_observe)
+        g.metrics_pending = True
+        return response
+
+    @app.teardown_request
+    def _stop_profiling(exc):
+        if profiler is not None and not g.get("metrics_pending"):
+            profiler.cancel()
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        """All metrics in the Prometheus text format."""
+        return Response(generate_latest(_registry()), mimetype=CONTENT_TYPE_LATEST)
+
+    return profiler
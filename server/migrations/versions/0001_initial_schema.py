@@ -0,0 +1,60 @@
+"""Initial schema: users, reviews, movies
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 06:00:00
+
+Databases created by the old ``db.create_all()`` already have these tables;
+they are left as they are, so ``flask db upgrade`` works on them directly.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'users' not in existing:
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=80), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('username'),
+        )
+    if 'reviews' not in existing:
+        op.create_table(
+            'reviews',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('movie_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('rating', sa.Integer(), nullable=True),
+            sa.Column('comment', sa.Text(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    if 'movies' not in existing:
+        op.create_table(
+            'movies',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.String(length=255), nullable=False),
+            sa.Column('tagline', sa.Text(), nullable=True),
+            sa.Column('genres', sa.JSON(), nullable=False),
+            sa.Column('poster_path', sa.String(length=255), nullable=True),
+            sa.Column('overview', sa.Text(), nullable=True),
+            sa.Column('wiki_link', sa.String(length=512), nullable=True),
+            sa.Column('fetched_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+        )
+
+
+def downgrade():
+    op.drop_table('movies')
+    op.drop_table('reviews')
+    op.drop_table('users')
@@ -0,0 +1,71 @@
+"""Index reviews by movie and by user; one review per user per movie
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 06:05:00
+
+Duplicate (user_id, movie_id) reviews are merged into the most recent one
+before the unique index is built: it keeps its rating (or the latest
+earlier one if it has none) and the comments of the older reviews are
+appended to its own, so no text is lost.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def _merge_duplicates():
+    bind = op.get_bind()
+    dupes = bind.execute(sa.text(
+        "SELECT user_id, movie_id FROM reviews "
+        "GROUP BY user_id, movie_id HAVING COUNT(*) > 1"
+    )).fetchall()
+    merged = 0
+    for user_id, movie_id in dupes:
+        rows = bind.execute(
+            sa.text(
+                "SELECT id, rating, comment FROM reviews "
+                "WHERE user_id = :user_id AND movie_id = :movie_id ORDER BY id DESC"
+            ),
+            {"user_id": user_id, "movie_id": movie_id},
+        ).fetchall()
+        keep = rows[0]
+        rating = next((r.rating for r in rows if r.rating is not None), None)
+        comments = []
+        for r in rows:
+            text = (r.comment or "").strip()
+            if text and text not in comments:
+                comments.append(text)
+        bind.execute(
+            sa.text("UPDATE reviews SET rating = :rating, comment = :comment WHERE id = :id"),
+            {"rating": rating, "comment": "\n\n".join(comments) or None, "id": keep.id},
+        )
+        bind.execute(
+            sa.text("DELETE FROM reviews WHERE id IN :ids").bindparams(sa.bindparam("ids", expanding=True)),
+            {"ids": [r.id for r in rows[1:]]},
+        )
+        merged += len(rows) - 1
+        print(f"Merged {len(rows) - 1} older review(s) of movie {movie_id} by user {user_id} into review {keep.id}")
+    if merged:
+        print(f"Merged {merged} duplicate reviews into {len(dupes)}")
+
+
+def upgrade():
+    _merge_duplicates()
+    op.create_index('ix_reviews_movie_id_id', 'reviews', ['movie_id', 'id'])
+    op.create_index('ix_reviews_user_id_id', 'reviews', ['user_id', 'id'])
+    op.create_index(
+        'uq_reviews_user_movie', 'reviews', ['user_id', 'movie_id'], unique=True
+    )
+
+
+def downgrade():
+    op.drop_index('uq_reviews_user_movie', table_name='reviews')
+    op.drop_index('ix_reviews_user_id_id', table_name='reviews')
+    op.drop_index('ix_reviews_movie_id_id', table_name='reviews')
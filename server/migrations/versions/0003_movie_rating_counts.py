@@ -0,0 +1,36 @@
+"""Per-movie rating counts for review summaries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 07:00:00
+
+Backfilled from the existing reviews; kept current by the review routes.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'movie_rating_counts',
+        sa.Column('movie_id', sa.Integer(), nullable=False),
+        sa.Column('rating', sa.Integer(), nullable=False),
+        sa.Column('reviews', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('movie_id', 'rating'),
+    )
+    op.execute(
+        "INSERT INTO movie_rating_counts (movie_id, rating, reviews) "
+        "SELECT movie_id, COALESCE(rating, 0), COUNT(*) FROM reviews "
+        "GROUP BY movie_id, COALESCE(rating, 0)"
+    )
+
+
+def downgrade():
+    op.drop_table('movie_rating_counts')
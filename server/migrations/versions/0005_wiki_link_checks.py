@@ -0,0 +1,30 @@
+"""Record Wikipedia lookups so misses are retried with backoff
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 09:00:00
+
+Links stored as "#" (lookup found nothing) become NULL, due for one retry.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('movies') as batch_op:
+        batch_op.add_column(sa.Column('wiki_checked_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('wiki_misses', sa.Integer(), server_default='0', nullable=False))
+    op.execute("UPDATE movies SET wiki_link = NULL WHERE wiki_link = '#'")
+
+
+def downgrade():
+    with op.batch_alter_table('movies') as batch_op:
+        batch_op.drop_column('wiki_misses')
+        batch_op.drop_column('wiki_checked_at')
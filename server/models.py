@@ -21,4 +21,70 @@ class Review(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     rating = db.Column(db.Integer, nullable=True)
     comment = db.Column(db.Text, nullable=True)
-    user_reviews = db.relationship("User", backref="reviews")
+
+    user = db.relationship("User", backref="reviews")
+
+    # Created by migrations/versions/0002; keep in sync with that revision
+    __table_args__ = (
+        # Reviews for a movie / by a user, in id order
+        db.Index("ix_reviews_movie_id_id", "movie_id", "id"),
+        db.Index("ix_reviews_user_id_id", "user_id", "id"),
+        # One review per user per movie
+        db.Index("uq_reviews_user_movie", "user_id", "movie_id", unique=True),
+    )
+
+
+class Movie(db.Model):
+    """Normalized TMDB movie metadata kept locally between upstream fetches."""
+
+    __tablename__ = "movies"
+    id = db.Column(db.Integer, primary_key=True)  # TMDB movie id
+    title = db.Column(db.String(255), nullable=False)
+    tagline = db.Column(db.Text, nullable=True)
+    genres = db.Column(db.JSON, nullable=False, default=list)
+    poster_path = db.Column(db.String(255), nullable=True)
+    overview = db.Column(db.Text, nullable=True)
+    wiki_link = db.Column(db.String(512), nullable=True)
+    # Last Wikipedia lookup and how many in a row found no article (see wiki.py)
+    wiki_checked_at = db.Column(db.DateTime, nullable=True)
+    wiki_misses = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    fetched_at = db.Column(db.DateTime, nullable=False)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "title": self.title,
+            "tagline": self.tagline or "",
+            "genres": self.genres or [],
+            "poster_path": self.poster_path,
+            "overview": self.overview or "",
+            "wiki_link": self.wiki_link or "#",
+        }
+
+
+class MovieRatingCount(db.Model):
+    """Reviews per (movie, rating) value, maintained on every review write.
+
+    Summing a movie's rows (at most one per rating) gives its review count,
+    average rating and histogram without reading the reviews themselves.
+    """
+
+    __tablename__ = "movie_rating_counts"
+    movie_id = db.Column(db.Integer, primary_key=True)
+    rating = db.Column(db.Integer, primary_key=True)  # 0 for reviews without a rating
+    reviews = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ReviewEvent(db.Model):
+    """Append-only log of rating changes (an outbox written with each review write).
+
+    Each entry is the user's rating of the movie after the change, or NULL if
+    they no longer have one; the recommender replays entries in id order.
+    """
+
+    __tablename__ = "review_events"
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    movie_id = db.Column(db.Integer, nullable=False)
+    rating = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
@@ -0,0 +1,228 @@
+"""Persistent movie metadata store with stale-while-revalidate reads."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import requests
+from sqlalchemy.exc import IntegrityError
+
+from config import MOVIE_FRESH_SECS, MOVIE_MAX_STALE_SECS
+from models import Movie, db
+import upstream
+import wiki
+
+# Background revalidation runs off the request thread, one fetch per movie
+_refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="movie-refresh")
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _utcnow() -> datetime:
+    # Stored naive so comparisons behave the same on Postgres and SQLite
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def normalize(movie: dict) -> dict:
+    """Reduce a raw TMDB payload to the fields the API serves."""
+    return {
+        "title": movie.get("title") or "Untitled",
+        "tagline": movie.get("tagline", ""),
+        "genres": [
+            {"id": g.get("id"), "name": g.get("name")}
+            for g in movie.get("genres", [])
+        ],
+        "poster_path": movie.get("poster_path"),
+        "overview": movie.get("overview", ""),
+    }
+
+
+def save(movie_id: int, movie: dict, wiki_link: Optional[str] = None, wiki_checked: bool = False) -> Movie:
+    """Upsert a raw TMDB payload; ``wiki_checked`` records ``wiki_link`` as a lookup result."""
+    rec = db.session.get(Movie, movie_id) or Movie(id=movie_id)
+    for field, value in normalize(movie).items():
+        setattr(rec, field, value)
+    if wiki_checked:
+        wiki.record(rec, wiki_link)
+    rec.fetched_at = _utcnow()
+    db.session.add(rec)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker inserted the same movie first; theirs is as good
+        db.session.rollback()
+        rec = db.session.get(Movie, movie_id)
+    return rec
+
+
+def save_many(movies: Dict[int, dict]) -> None:
+    """Upsert several raw TMDB payloads in one transaction."""
+    if not movies:
+        return
+    existing = {
+        m.id: m for m in Movie.query.filter(Movie.id.in_(list(movies))).all()
+    }
+    now = _utcnow()
+    for movie_id, movie in movies.items():
+        rec = existing.get(movie_id) or Movie(id=movie_id)
+        for field, value in normalize(movie).items():
+            setattr(rec, field, value)
+        rec.fetched_at = now
+        db.session.add(rec)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+
+
+def titles(movie_ids: Iterable[int]) -> Dict[int, str]:
+    """Return stored titles for the given IDs, regardless of freshness."""
+    ids = list(movie_ids)
+    if not ids:
+        return {}
+    rows = db.session.query(Movie.id, Movie.title).filter(Movie.id.in_(ids))
+    return {mid: title for mid, title in rows}
+
+
+def _wiki_link(resolve_wiki, title: str) -> Optional[str]:
+    """``resolve_wiki(title)``, with failures and "#" both meaning no link."""
+    try:
+        link = resolve_wiki(title)
+    except Exception:
+        return None
+    return link if link and link != "#" else None
+
+
+def _stored(movie_id: int, max_age_secs: int) -> Optional[dict]:
+    """Re-read a record (bypassing the session identity map) if it is young enough."""
+    rec = db.session.get(Movie, movie_id, populate_existing=True)
+    if rec is None or _utcnow() - rec.fetched_at > timedelta(seconds=max_age_secs):
+        return None
+    return rec.to_dict()
+
+
+def _fetch_and_save(movie_id, fetch, resolve_wiki) -> dict:
+    rec = db.session.get(Movie, movie_id)
+    lookup = None
+    if rec is not None and wiki.due(rec):
+        # Title already known: look up Wikipedia while TMDB is in flight
+        lookup = upstream.submit(_wiki_link, resolve_wiki, rec.title)
+    movie = fetch(movie_id)
+    if rec is not None and not wiki.due(rec):
+        return save(movie_id, movie).to_dict()
+    title = movie.get("title", "")
+    if lookup is None or title != rec.title:
+        lookup = upstream.submit(_wiki_link, resolve_wiki, title)
+    return save(movie_id, movie, lookup.result(), wiki_checked=True).to_dict()
+
+
+def _coalesced(flight, movie_id, fn, max_age_secs):
+    if flight is None:
+        return fn()
+    return flight.do(
+        f"movie:{movie_id}", fn, load=lambda: _stored(movie_id, max_age_secs)
+    )
+
+
+def _refresh_in_background(app, movie_id, fetch, resolve_wiki, flight):
+    with _refreshing_lock:
+        if movie_id in _refreshing:
+            return
+        _refreshing.add(movie_id)
+
+    def _run():
+        try:
+            with app.app_context():
+                _coalesced(
+                    flight,
+                    movie_id,
+                    lambda: _fetch_and_save(movie_id, fetch, resolve_wiki),
+                    MOVIE_FRESH_SECS,
+                )
+        except Exception:
+            # Keep serving the stale copy; the next read will try again
+            pass
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(movie_id)
+
+    _refresh_pool.submit(_run)
+
+
+def load(
+    app,
+    movie_id: int,
+    fetch: Callable[[int], dict],
+    resolve_wiki: Callable[[str], str],
+    flight=None,
+) -> dict:
+    """Return the normalized payload for a movie, going upstream only when needed.
+
+    Fresh records are returned directly. Stale records are returned
+    immediately while a background refresh updates them. Missing or expired
+    records are fetched synchronously; if that fails for any reason other than
+    a 404, an expired record is still served, otherwise ``fetch`` errors
+    propagate. Passing a ``SingleFlight`` as ``flight`` makes concurrent misses
+    share one fetch.
+    """
+    rec = db.session.get(Movie, movie_id)
+    if rec is not None:
+        age = _utcnow() - rec.fetched_at
+        if age <= timedelta(seconds=MOVIE_MAX_STALE_SECS):
+            if age > timedelta(seconds=MOVIE_FRESH_SECS):
+                _refresh_in_background(app, movie_id, fetch, resolve_wiki, flight)
+            elif wiki.due(rec):
+                # At most once per backoff period (see wiki.retry_delay)
+                wiki.record(rec, _wiki_link(resolve_wiki, rec.title))
+                db.session.commit()
+            return rec.to_dict()
+
+    try:
+        return _coalesced(
+            flight,
+            movie_id,
+            lambda: _fetch_and_save(movie_id, fetch, resolve_wiki),
+            MOVIE_MAX_STALE_SECS,
+        )
+    except requests.RequestException as e:
+        # TMDB is down or rate limiting us: an old copy beats an error page
+        if rec is not None and not _is_not_found(e):
+            return rec.to_dict()
+        raise
+
+
+def revalidate(
+    movie_id: int,
+    fetch: Callable[[int], dict],
+    resolve_wiki: Callable[[str], str],
+    flight=None,
+    allow_fetch: bool = True,
+) -> Optional[Tuple[dict, bool]]:
+    """Payload for refresh-ahead: ``(movie, fetched)``, or None if unknown and not fetched.
+
+    The stored record is used while younger than ``MOVIE_FRESH_SECS``;
+    otherwise, if ``allow_fetch``, it is refetched first (``fetched`` is then
+    True even when the fetch failed and the stored copy is returned).
+    """
+    rec = db.session.get(Movie, movie_id, populate_existing=True)
+    fresh = rec is not None and _utcnow() - rec.fetched_at <= timedelta(seconds=MOVIE_FRESH_SECS)
+    if fresh or not allow_fetch:
+        return (rec.to_dict(), False) if rec is not None else None
+    try:
+        movie = _coalesced(
+            flight,
+            movie_id,
+            lambda: _fetch_and_save(movie_id, fetch, resolve_wiki),
+            MOVIE_FRESH_SECS,
+        )
+    except requests.RequestException as e:
+        if rec is not None and not _is_not_found(e):
+            return rec.to_dict(), True
+        raise
+    return movie, True
+
+
+def _is_not_found(e: requests.RequestException) -> bool:
+    return e.response is not None and e.response.status_code == 404
+
@@ -0,0 +1,486 @@
+"""Item-item collaborative filtering over the reviews table."""
+
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select
+
+from models import Review, db
+import review_store
+
+# Cap on the dense similarity block computed at once (cells, float32)
+_BLOCK_CELLS = 16_000_000
+_POPULAR_KEEP = 500
+
+
+def _top_k(sims: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Best ``k`` positive entries of each row of ``sims``, best first (-1 padded)."""
+    top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(sims, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1).astype(np.int32)
+    top_scores = np.take_along_axis(top_scores, order, axis=1).astype(np.float32)
+    # Only positive similarities are useful as neighbours
+    weak = top_scores <= 0
+    top[weak] = -1
+    top_scores[weak] = 0.0
+    return top, top_scores
+
+
+def _centred(ratings: Dict[int, float]) -> Dict[int, float]:
+    if not ratings:
+        return {}
+    mean = sum(ratings.values()) / len(ratings)
+    return {mid: r - mean for mid, r in ratings.items()}
+
+
+class _RatingState:
+    """What ``ItemIndex.apply`` needs to update similarity rows in place.
+
+    The centred rating matrix from the last full build stays as it was.
+    Users whose ratings changed since then are kept in an overlay with
+    their current ratings, and each movie's squared norm is kept current.
+    Recomputing a movie's row only involves the overlay users who rate(d)
+    that movie; the overlay is merged by the next full build.
+    """
+
+    def __init__(self, users, user_idx, item_idx, values, n_items):
+        self.user_row = {int(u): i for i, u in enumerate(users)}
+        user_sums = np.bincount(user_idx, weights=values, minlength=len(users))
+        user_counts = np.bincount(user_idx, minlength=len(users))
+        self.means = user_sums / np.maximum(user_counts, 1)
+        centred = (values - self.means[user_idx]).astype(np.float32)
+        self.X = sparse.csr_matrix((centred, (user_idx, item_idx)), shape=(len(users), n_items))
+        self.Xc = self.X.tocsc()
+        self.n_base = n_items
+        self.norms = np.asarray(self.X.multiply(self.X).sum(axis=0), dtype=np.float64).ravel()
+        self.current: Dict[int, Dict[int, float]] = {}  # user_id -> {row: rating}
+        self.raters: Dict[int, Set[int]] = {}  # row -> overlay users who rate(d) it
+        # user_id -> centred (rows, values) as of the build and now
+        self._rows: Dict[int, Tuple[Tuple[np.ndarray, np.ndarray], Tuple[np.ndarray, np.ndarray]]] = {}
+
+    def base_ratings(self, user_id: int) -> Dict[int, float]:
+        """``{row: rating}`` of a user as of the full build."""
+        u = self.user_row.get(user_id)
+        if u is None:
+            return {}
+        start, stop = self.X.indptr[u], self.X.indptr[u + 1]
+        rows = self.X.indices[start:stop]
+        # Ratings are whole numbers; undo the float32 rounding of the centred values
+        values = np.rint(self.X.data[start:stop] + self.means[u])
+        return dict(zip(rows.tolist(), values.tolist()))
+
+    def ratings(self, user_id: int) -> Dict[int, float]:
+        current = self.current.get(user_id)
+        return dict(current) if current is not None else self.base_ratings(user_id)
+
+    def update(self, user_id: int, ratings: Dict[int, float]):
+        """Set a user's current ratings; costs O(their ratings)."""
+        base = self.base_ratings(user_id)
+        self.current[user_id] = ratings
+        self._rows[user_id] = (_centred_arrays(base), _centred_arrays(ratings))
+        for row in set(base) | set(ratings):
+            self.raters.setdefault(row, set()).add(user_id)
+
+    def numerators(self, rows: np.ndarray, n_items: int) -> np.ndarray:
+        """Sum over users of centred(row) * centred(movie), for each row and movie."""
+        out = np.zeros((len(rows), n_items), dtype=np.float64)
+        in_base = rows < self.n_base
+        if in_base.any():
+            part = self.Xc[:, rows[in_base]].T @ self.X
+            out[in_base, : self.n_base] = part.toarray()
+        users = set()
+        for row in rows.tolist():
+            users |= self.raters.get(row, set())
+        if users:
+            # Swap those users' build-time contributions for their current ones
+            users = list(users)
+            for now, sign in ((0, -1.0), (1, 1.0)):
+                matrix = self._matrix(users, now, n_items)
+                out += sign * (matrix[:, rows].T @ matrix).toarray()
+        return out
+
+    def _matrix(self, users: List[int], now: int, n_items: int):
+        """Centred ratings of overlay ``users``, as of the build (0) or now (1)."""
+        parts = [self._rows[u][now] for u in users]
+        indptr = np.concatenate([[0], np.cumsum([len(cols) for cols, _ in parts])])
+        return sparse.csr_matrix(
+            (
+                np.concatenate([values for _, values in parts]),
+                np.concatenate([cols for cols, _ in parts]),
+                indptr,
+            ),
+            shape=(len(users), n_items),
+        ).tocsc()
+
+
+def _centred_arrays(ratings: Dict[int, float]) -> Tuple[np.ndarray, np.ndarray]:
+    c = _centred(ratings)
+    return (
+        np.fromiter(c.keys(), dtype=np.int64, count=len(c)),
+        np.fromiter(c.values(), dtype=np.float64, count=len(c)),
+    )
+
+
+class ItemIndex:
+    """Top-K most similar movies for every rated movie, in flat arrays.
+
+    Row ``i`` of ``neighbors``/``scores`` holds the K nearest movies of
+    ``movie_ids[i]`` as row numbers (``-1`` padded) and their adjusted-cosine
+    similarities, best first. Indexes from ``build_index`` can also take
+    rating changes through ``apply`` without a rebuild; it works on copies
+    and publishes all four lookups at once, so concurrent readers always
+    see one consistent version.
+    """
+
+    def __init__(self, movie_ids, neighbors, scores, popular, n_ratings: int, state=None):
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        row_of = {int(m): i for i, m in enumerate(movie_ids)}
+        self._arrays = (movie_ids, row_of, neighbors, scores)
+        self.popular = popular
+        self.n_ratings = n_ratings
+        self.state = state
+        self.built_at = time.time()
+        self.applied = 0
+
+    @property
+    def movie_ids(self) -> np.ndarray:
+        return self._arrays[0]
+
+    @property
+    def row_of(self) -> Dict[int, int]:
+        return self._arrays[1]
+
+    @property
+    def neighbors(self) -> np.ndarray:
+        return self._arrays[2]
+
+    @property
+    def scores(self) -> np.ndarray:
+        return self._arrays[3]
+
+    def recommend(self, ratings: Dict[int, float], n: int) -> List[Tuple[int, float]]:
+        """Up to ``n`` ``(movie_id, score)`` pairs for a user's ratings.
+
+        A candidate scores the similarity-weighted sum of the user's ratings
+        of its neighbours, centred on the user's mean, with a small bonus for
+        total similarity so users who rate everything alike still get picks.
+        Falls back to the most-rated movies when nothing is similar.
+        """
+        movie_ids, row_of, neighbors, scores = self._arrays
+        size = len(neighbors)
+        if not size:
+            return []
+        picks: List[Tuple[int, float]] = []
+        if ratings:
+            values = np.fromiter(ratings.values(), dtype=np.float32, count=len(ratings))
+            known = [(row_of.get(int(mid)), r) for mid, r in zip(ratings, values)]
+            rows = np.array([row for row, _ in known if row is not None], dtype=np.int64)
+            centred = np.array([r for row, r in known if row is not None], dtype=np.float32) - values.mean()
+            nb = neighbors[rows]
+            valid = nb >= 0
+            targets = nb[valid]
+            sims = scores[rows][valid]
+            weighted = (scores[rows] * centred[:, None])[valid]
+            score = np.bincount(targets, weights=weighted, minlength=size)
+            support = np.bincount(targets, weights=sims, minlength=size)
+            rank = score + 1e-3 * support
+            rank[support <= 0] = -np.inf
+            rank[rows] = -np.inf
+            count = min(n, int(np.isfinite(rank).sum()))
+            if count:
+                top = np.argpartition(-rank, count - 1)[:count]
+                top = top[np.argsort(-rank[top])]
+                picks = [(int(movie_ids[i]), float(rank[i])) for i in top]
+        if len(picks) < n:
+            seen = set(ratings) | {mid for mid, _ in picks}
+            for mid in self.popular:
+                if len(picks) >= n:
+                    break
+                if int(mid) not in seen:
+                    picks.append((int(mid), 0.0))
+        return picks
+
+    def apply(self, events: Iterable[Tuple[int, int, Optional[int]]]) -> int:
+        """Apply ``(user_id, movie_id, rating or None)`` changes, in order.
+
+        Entries set a rating rather than adjust it, so replaying ones already
+        reflected is harmless. Each changed user costs O(their ratings) norm
+        updates and one similarity row recomputation per movie they rate(d);
+        movies that keep an affected movie as a neighbour get its score
+        rescaled for the new norm. Entries that match a user's current
+        ratings change nothing and cost no recomputation. Returns the number
+        of rows recomputed.
+        """
+        state = self.state
+        if state is None:
+            raise ValueError("index was not built with rating state")
+        events = [(int(user_id), int(movie_id), rating) for user_id, movie_id, rating in events]
+        movie_ids, row_of, neighbors, scores = self._arrays
+        added = [mid for mid in dict.fromkeys(mid for _, mid, _ in events) if mid not in row_of]
+        if added:
+            # Movies rated for the first time since the build
+            k = neighbors.shape[1]
+            row_of = dict(row_of)
+            row_of.update((mid, len(movie_ids) + i) for i, mid in enumerate(added))
+            movie_ids = np.append(movie_ids, added)
+            neighbors = np.vstack([neighbors, np.full((len(added), k), -1, dtype=np.int32)])
+            scores = np.vstack([scores, np.zeros((len(added), k), dtype=np.float32)])
+            state.norms = np.append(state.norms, np.zeros(len(added)))
+        after: Dict[int, Dict[int, float]] = {}
+        for user_id, movie_id, rating in events:
+            ratings = after.get(user_id)
+            if ratings is None:
+                ratings = after[user_id] = state.ratings(user_id)
+            row = row_of[movie_id]
+            if rating is None:
+                ratings.pop(row, None)
+            else:
+                ratings[row] = float(rating)
+
+        old_norms: Dict[int, float] = {}
+        for user_id, ratings in after.items():
+            before = state.ratings(user_id)
+            if ratings == before:
+                continue
+            old_c, new_c = _centred(before), _centred(ratings)
+            for row in set(old_c) | set(new_c):
+                old_norms.setdefault(row, state.norms[row])
+                state.norms[row] += new_c.get(row, 0.0) ** 2 - old_c.get(row, 0.0) ** 2
+            state.update(user_id, ratings)
+        if not old_norms:
+            self._arrays = (movie_ids, row_of, neighbors, scores)
+            return 0
+        if not added:
+            # Readers may hold the current arrays; update copies
+            neighbors, scores = neighbors.copy(), scores.copy()
+
+        k = neighbors.shape[1]
+        n_items = len(movie_ids)
+        width = min(k, n_items - 1)
+        norms = np.maximum(state.norms, 0.0)
+        rows = sorted(old_norms)
+        if width > 0:
+            block = max(1, _BLOCK_CELLS // n_items)
+            for start in range(0, len(rows), block):
+                chunk = np.array(rows[start:start + block], dtype=np.int64)
+                denom = np.sqrt(norms[chunk][:, None] * norms[None, :])
+                sims = np.divide(
+                    state.numerators(chunk, n_items), denom, out=np.zeros(denom.shape), where=denom > 1e-12
+                )
+                sims[np.arange(len(chunk)), chunk] = 0.0
+                top, top_scores = _top_k(sims, width)
+                neighbors[chunk] = -1
+                scores[chunk] = 0.0
+                neighbors[chunk, :width] = top
+                scores[chunk, :width] = top_scores
+            # Other movies holding an affected movie as neighbour: rescale for its new norm
+            affected = np.array(rows)
+            hit = np.isin(neighbors, affected)
+            hit[affected] = False
+            holders = np.flatnonzero(hit.any(axis=1))
+            if len(holders):
+                old = np.array([old_norms[r] for r in rows])
+                factor = np.zeros(n_items)
+                factor[affected] = np.sqrt(
+                    np.divide(old, norms[affected], out=np.zeros(len(rows)), where=norms[affected] > 1e-12)
+                )
+                block_nb = neighbors[holders]
+                block_sc = scores[holders].astype(np.float64)
+                mask = hit[holders]
+                block_sc[mask] *= factor[block_nb[mask]]
+                block_nb = np.where(block_sc > 0, block_nb, -1)
+                order = np.argsort(-block_sc, axis=1, kind="stable")
+                neighbors[holders] = np.take_along_axis(block_nb, order, axis=1)
+                scores[holders] = np.take_along_axis(np.maximum(block_sc, 0), order, axis=1)
+        self._arrays = (movie_ids, row_of, neighbors, scores)
+        self.applied += len(rows)
+        return len(rows)
+
+    def stats(self) -> dict:
+        return {
+            "movies": int(len(self.movie_ids)),
+            "ratings": self.n_ratings,
+            "neighbors": int(self.neighbors.shape[1]) if self.neighbors.ndim == 2 else 0,
+            "bytes": int(self.neighbors.nbytes + self.scores.nbytes + self.movie_ids.nbytes),
+            "built_at": self.built_at,
+            "rows_updated": self.applied,
+        }
+
+
+def build_index(user_ids, movie_ids, ratings, k: int = 50) -> ItemIndex:
+    """Build the top-``k`` neighbour index from parallel rating arrays."""
+    movies, item_idx = np.unique(np.asarray(movie_ids, dtype=np.int64), return_inverse=True)
+    users, user_idx = np.unique(np.asarray(user_ids, dtype=np.int64), return_inverse=True)
+    values = np.asarray(ratings, dtype=np.float64)
+    n_items = len(movies)
+    state = _RatingState(users, user_idx, item_idx, values, n_items)
+    neighbors = np.full((n_items, k), -1, dtype=np.int32)
+    scores = np.zeros((n_items, k), dtype=np.float32)
+    counts = np.bincount(item_idx, minlength=n_items)
+    popular = movies[np.argsort(-counts, kind="stable")[:_POPULAR_KEEP]]
+    width = min(k, n_items - 1)
+    if width <= 0:
+        return ItemIndex(movies, neighbors, scores, popular, len(values), state)
+
+    # Adjusted cosine: ratings centred on each user's mean, columns normalised
+    norms = np.sqrt(state.norms)
+    norms[norms == 0] = 1.0
+    X = (state.X @ sparse.diags((1.0 / norms).astype(np.float32))).tocsc()
+    XT = X.T.tocsr()
+
+    block = max(1, _BLOCK_CELLS // n_items)
+    for start in range(0, n_items, block):
+        stop = min(start + block, n_items)
+        sims = (XT[start:stop] @ X).toarray()
+        sims[np.arange(stop - start), np.arange(start, stop)] = 0.0
+        neighbors[start:stop, :width], scores[start:stop, :width] = _top_k(sims, width)
+    return ItemIndex(movies, neighbors, scores, popular, len(values), state)
+
+
+def compare(a: ItemIndex, b: ItemIndex) -> dict:
+    """How far two indexes over the same ratings disagree.
+
+    ``overlap`` is the mean share of each movie's neighbours found in both;
+    ``max_score_diff`` the largest similarity difference on shared neighbours.
+    """
+    overlaps, diffs = [], [0.0]
+    for movie_id, row_a in a.row_of.items():
+        row_b = b.row_of.get(movie_id)
+        na = {int(a.movie_ids[j]): s for j, s in zip(a.neighbors[row_a], a.scores[row_a]) if j >= 0}
+        nb = {} if row_b is None else {
+            int(b.movie_ids[j]): s for j, s in zip(b.neighbors[row_b], b.scores[row_b]) if j >= 0
+        }
+        if not na and not nb:
+            continue
+        shared = na.keys() & nb.keys()
+        overlaps.append(len(shared) / max(len(na), len(nb)))
+        diffs.extend(abs(float(na[m]) - float(nb[m])) for m in shared)
+    return {
+        "movies": len(overlaps),
+        "overlap": float(np.mean(overlaps)) if overlaps else 1.0,
+        "max_score_diff": max(diffs),
+    }
+
+
+def load_ratings(chunk: int = 50000):
+    """All rated reviews as ``(user_ids, movie_ids, ratings)`` arrays."""
+    result = db.session.execute(
+        select(Review.user_id, Review.movie_id, Review.rating)
+        .where(Review.rating.isnot(None))
+        .execution_options(yield_per=chunk)
+    )
+    parts = [np.array(rows, dtype=np.int64).reshape(-1, 3) for rows in result.partitions()]
+    data = np.concatenate(parts) if parts else np.empty((0, 3), dtype=np.int64)
+    return data[:, 0], data[:, 1], data[:, 2]
+
+
+class Recommender:
+    """Holds the current ``ItemIndex`` and keeps it up to date in the background.
+
+    Every ``poll_secs`` the rating changes logged in ``review_events`` since
+    the last poll are applied to the index in place; every ``rebuild_secs``
+    it is rebuilt from the reviews table and swapped in whole. Each rebuild
+    doubles as a consistency check: the outgoing incrementally-updated index
+    is compared with the fresh one (``last_check``).
+
+    Log entries can commit out of id order, so each poll re-reads the newest
+    ``replay`` entries; entries already reflected in the index are skipped
+    without recomputing anything.
+    """
+
+    def __init__(
+        self,
+        k: int = 50,
+        rebuild_secs: float = 900,
+        poll_secs: float = 2,
+        replay: int = 1000,
+        keep_events: int = 100000,
+        load: Callable[[], tuple] = load_ratings,
+    ):
+        self.k = k
+        self.rebuild_secs = rebuild_secs
+        self.poll_secs = poll_secs
+        self.replay = replay
+        self.keep_events = keep_events
+        self.load = load
+        self.index: Optional[ItemIndex] = None
+        self.cursor = 0
+        self.build_secs = None
+        self.last_check = None
+        self._thread = None
+
+    def rebuild(self, app):
+        start = time.perf_counter()
+        with app.app_context():
+            last = review_store.last_event_id()
+            user_ids, movie_ids, ratings = self.load()
+            db.session.remove()
+        index = build_index(user_ids, movie_ids, ratings, k=self.k)
+        # Entries logged while loading may or may not be in the snapshot
+        cursor = max(0, last - self.replay)
+        old = self.index
+        self.cursor = self._catch_up(app, index, cursor)
+        if old is not None and old.state is not None:
+            self._catch_up(app, old, self.cursor)
+            self.last_check = compare(old, index)
+        self.index = index
+        self.build_secs = time.perf_counter() - start
+
+    def _catch_up(self, app, index: ItemIndex, cursor: int, batch: int = 5000) -> int:
+        """Apply log entries after ``cursor`` to ``index``; return the new cursor."""
+        while True:
+            with app.app_context():
+                rows = review_store.rating_events(cursor, batch)
+                db.session.remove()
+            if not rows:
+                return cursor
+            index.apply((user_id, movie_id, rating) for _, user_id, movie_id, rating in rows)
+            cursor = rows[-1][0]
+            if len(rows) < batch:
+                return cursor
+
+    def catch_up(self, app):
+        """Bring the live index up to date with the change log."""
+        index = self.index
+        if index is None or index.state is None:
+            return
+        start = max(0, self.cursor - self.replay)
+        self.cursor = max(self.cursor, self._catch_up(app, index, start))
+
+    def recommend(self, ratings: Dict[int, float], n: int) -> List[Tuple[int, float]]:
+        index = self.index
+        if index is None:
+            return []
+        return index.recommend(ratings, n)
+
+    def _run(self, app):
+        next_rebuild = 0.0
+        while True:
+            try:
+                if time.monotonic() >= next_rebuild:
+                    self.rebuild(app)
+                    next_rebuild = time.monotonic() + self.rebuild_secs
+                    with app.app_context():
+                        review_store.prune_events(self.keep_events)
+                        db.session.remove()
+                else:
+                    self.catch_up(app)
+            except Exception as e:
+                print(f"Recommendation update failed: {e}")
+            time.sleep(self.poll_secs)
+
+    def start(self, app):
+        if self.rebuild_secs <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, args=(app,), name="recommender", daemon=True)
+        self._thread.start()
+
+    def stats(self) -> dict:
+        index = self.index
+        stats = index.stats() if index is not None else {}
+        stats.update(build_secs=self.build_secs, cursor=self.cursor, last_check=self.last_check)
+        return stats
@@ -0,0 +1,133 @@
+"""Refresh-ahead for the ``topmovie:<id>`` payloads of the most viewed movies.
+
+Every ``interval_secs`` the refresher reads the top ``top_n`` movies from
+the views zset and re-renders each one whose cached payload is missing,
+built from outdated movie versions, or within ``ahead_secs`` of expiring,
+soonest first, so requests for the hottest movies never find it cold.
+
+Rendering reads the local movie store; only movies whose stored record is
+stale go to TMDB, and those fetches draw on a per-minute budget. When the
+budget is spent or TMDB fails, the stored copy is rendered anyway and the
+refetch waits for a later cycle. A movie that fails to render is retried
+with exponential backoff while the others carry on.
+"""
+
+import json
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from cache_tags import is_current, tag
+
+
+class TopMovieRefresher:
+    """Re-renders cached top-N movie payloads before they expire.
+
+    ``render(movie_id, allow_upstream)`` returns ``(body, fetched)``, where
+    ``fetched`` says whether it went to TMDB, or ``None`` when there is
+    nothing to render yet (an unknown movie with no budget left).
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        movie_versions,
+        zset: str,
+        key: Callable[[int], str],
+        render: Callable[[int, bool], Optional[Tuple[dict, bool]]],
+        top_n: int,
+        ttl_secs: int,
+        ahead_secs: float,
+        tmdb_budget_per_min: float,
+        interval_secs: float = 10,
+        max_backoff_secs: float = 600,
+    ):
+        self.redis = redis_client
+        self.movie_versions = movie_versions
+        self.zset = zset
+        self.key = key
+        self.render = render
+        self.top_n = top_n
+        self.ttl_secs = ttl_secs
+        self.ahead_secs = ahead_secs
+        self.budget_per_min = tmdb_budget_per_min
+        self.interval_secs = interval_secs
+        self.max_backoff_secs = max_backoff_secs
+        self.tokens = tmdb_budget_per_min
+        self._refilled = time.monotonic()
+        self._failures: Dict[int, Tuple[int, float]] = {}  # movie_id -> (count, retry at)
+        self.totals = {"refreshed": 0, "fetched": 0, "deferred": 0, "failed": 0}
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.budget_per_min, self.tokens + (now - self._refilled) * self.budget_per_min / 60
+        )
+        self._refilled = now
+
+    def due(self) -> List[int]:
+        """Top movies whose payload needs rendering, most urgent first."""
+        ids = [int(mid) for mid in self.redis.zrevrange(self.zset, 0, self.top_n - 1)]
+        if not ids:
+            return []
+        versions = self.movie_versions.current(ids)
+        with self.redis.pipeline() as pipe:
+            for mid in ids:
+                pipe.pttl(self.key(mid))
+                pipe.get(self.key(mid))
+            replies = pipe.execute()
+        now = time.monotonic()
+        urgency = []
+        for i, mid in enumerate(ids):
+            pttl, raw = replies[2 * i], replies[2 * i + 1]
+            failures = self._failures.get(mid)
+            if failures is not None and failures[1] > now:
+                continue
+            if raw is None or not is_current(json.loads(raw), {str(mid): versions[str(mid)]}):
+                urgency.append((-1.0, i, mid))
+            elif pttl >= 0 and pttl / 1000 <= self.ahead_secs:
+                urgency.append((pttl / 1000, i, mid))
+        return [mid for _, _, mid in sorted(urgency)]
+
+    def refresh(self, movie_id: int) -> bool:
+        """Render one movie and store its payload; True if it was stored."""
+        versions = self.movie_versions.current([movie_id])
+        self._refill()
+        result = self.render(movie_id, self.tokens >= 1)
+        if result is None:
+            self.totals["deferred"] += 1
+            return False
+        body, fetched = result
+        if fetched:
+            self.tokens -= 1
+            self.totals["fetched"] += 1
+        self.redis.setex(self.key(movie_id), self.ttl_secs, json.dumps(tag(body, versions)))
+        self.totals["refreshed"] += 1
+        return True
+
+    def run_once(self) -> int:
+        """One pass over the due movies; returns how many were refreshed."""
+        refreshed = 0
+        for mid in self.due():
+            try:
+                if self.refresh(mid):
+                    refreshed += 1
+                self._failures.pop(mid, None)
+            except Exception as e:
+                count = self._failures.get(mid, (0, 0.0))[0] + 1
+                delay = min(self.interval_secs * 2 ** count, self.max_backoff_secs)
+                self._failures[mid] = (count, time.monotonic() + delay)
+                self.totals["failed"] += 1
+                print(f"Refreshing movie {mid} failed ({count} in a row, retry in {delay:.0f}s): {e}")
+        return refreshed
+
+    def run(self):
+        while True:
+            start = time.monotonic()
+            try:
+                refreshed = self.run_once()
+                if refreshed:
+                    print(f"Refreshed {refreshed} top movies; totals {self.totals}, TMDB budget {self.tokens:.1f}")
+            except Exception as e:
+                # Redis unavailable or similar: keep the loop alive
+                print(f"Top movie refresh pass failed: {e}")
+            time.sleep(max(0.0, self.interval_secs - (time.monotonic() - start)))
@@ -0,0 +1,85 @@
+"""Shared response-body cache for JSON routes, with hit/miss counters."""
+
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import metrics
+from cache_tags import is_current, tag
+
+
+class CacheStats:
+    """Thread-safe hit/miss/error counters for one cache tier, also exported to ``/metrics``."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def count(self, field: str, n: int = 1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + n)
+        metrics.count_cache(self.name, field, n)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class ResponseCache:
+    """Cache the user-independent body of a route in Flask-Caching.
+
+    ``build`` returns either a JSON-able ``dict``/``list`` body, which is
+    cached and shared by every user, or a finished Flask response (e.g. an
+    error tuple), which is returned as-is and never cached. Per-user fields
+    are applied by the route after the lookup, so one entry serves everyone.
+
+    When ``versions`` (from ``MovieVersions.current``) is given, the entry is
+    stored tagged with them and only served while they are still current.
+    """
+
+    def __init__(self, cache, name: str, timeout: int = 300):
+        self.cache = cache
+        self.name = name
+        self.timeout = timeout
+        self.counters = CacheStats(name)
+        self._count = self.counters.count
+
+    def get_or_build(
+        self,
+        key: str,
+        build: Callable[[], Any],
+        versions: Optional[Dict[str, int]] = None,
+    ):
+        entry: Optional[Any] = None
+        try:
+            entry = self.cache.get(key)
+        except Exception:
+            self._count("errors")
+        if entry is not None:
+            if versions is None:
+                self._count("hits")
+                return entry
+            if is_current(entry, versions):
+                self._count("hits")
+                return entry["body"]
+
+        self._count("misses")
+        body = build()
+        if isinstance(body, (dict, list)):
+            try:
+                value = body if versions is None else tag(body, versions)
+                self.cache.set(key, value, timeout=self.timeout)
+            except Exception:
+                self._count("errors")
+        return body
+
+    def stats(self) -> dict:
+        return self.counters.snapshot()
@@ -0,0 +1,236 @@
+"""Keyset-paginated review queries and per-movie rating aggregates."""
+
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import delete, insert as sql_insert, select, update
+
+from models import MovieRatingCount, Review, ReviewEvent, User, db
+
+
+def parse_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Decode a cursor from a previous page; ``ValueError`` if malformed."""
+    if not cursor:
+        return None
+    value = int(cursor)
+    if value < 1:
+        raise ValueError("invalid cursor")
+    return value
+
+
+def _page(stmt, where, cursor: Optional[int], limit: int):
+    """Restrict ``stmt`` to one page of reviews in id order.
+
+    The page is ``limit`` rows starting at review id ``cursor``. The first id
+    of the following page comes from a separate index-only probe, so the
+    next cursor is known before the page itself is streamed.
+    """
+    if cursor is not None:
+        where = (*where, Review.id >= cursor)
+    next_id = db.session.execute(
+        select(Review.id).where(*where).order_by(Review.id).offset(limit).limit(1)
+    ).scalar()
+    stmt = stmt.where(*where).order_by(Review.id).limit(limit)
+    return stmt, (str(next_id) if next_id is not None else None)
+
+
+def movie_page(movie_id: int, cursor: Optional[int], limit: int) -> Tuple[Iterator[dict], Optional[str]]:
+    """One page of a movie's reviews with their authors, and the next cursor."""
+    stmt, next_cursor = _page(
+        select(User.username, Review.rating, Review.comment).join(User, Review.user_id == User.id),
+        (Review.movie_id == movie_id,),
+        cursor,
+        limit,
+    )
+    rows = db.session.execute(stmt.execution_options(yield_per=200))
+    items = (
+        {
+            "username": username,
+            # Personalized per request by the route
+            "display_name": username,
+            "rating": rating,
+            "comment": comment,
+        }
+        for username, rating, comment in rows
+    )
+    return items, next_cursor
+
+
+def user_page(user_id: int, cursor: Optional[int], limit: int):
+    """One page of a user's ``(id, movie_id, rating, comment)`` rows, and the next cursor."""
+    stmt, next_cursor = _page(
+        select(Review.id, Review.movie_id, Review.rating, Review.comment),
+        (Review.user_id == user_id,),
+        cursor,
+        limit,
+    )
+    return db.session.execute(stmt).all(), next_cursor
+
+
+def summary(movie_id: int) -> dict:
+    """Review count, average rating and rating histogram for a movie."""
+    counts = {
+        rating: n
+        for rating, n in db.session.execute(
+            select(MovieRatingCount.rating, MovieRatingCount.reviews).where(
+                MovieRatingCount.movie_id == movie_id, MovieRatingCount.reviews > 0
+            )
+        )
+    }
+    rated = {rating: n for rating, n in counts.items() if rating}
+    rated_count = sum(rated.values())
+    return {
+        "count": sum(counts.values()),
+        "average": round(sum(r * n for r, n in rated.items()) / rated_count, 2) if rated_count else None,
+        "histogram": {str(r): n for r, n in sorted(rated.items())},
+    }
+
+
+def bulk_update(user_id: int, updates: List[dict]) -> Tuple[List[dict], set]:
+    """Apply rating/comment edits to the user's own reviews in one write.
+
+    The targeted reviews are loaded with a single ``IN`` query restricted to
+    ``user_id``, then updated with one executemany. Returns a result per
+    entry of ``updates`` (``updated``, ``not_found`` or ``invalid``) and the
+    ids of the movies whose reviews changed. The caller commits.
+    """
+    edits: Dict[int, dict] = {}
+    results = []
+    for item in updates:
+        review_id = item.get("id") if isinstance(item, dict) else None
+        valid_id = isinstance(review_id, int) and not isinstance(review_id, bool)
+        fields = {k: item[k] for k in ("rating", "comment") if k in item} if valid_id else {}
+        if not fields:
+            results.append({"id": review_id, "status": "invalid"})
+            continue
+        # Repeated ids merge; later entries win
+        edits.setdefault(review_id, {}).update(fields)
+        results.append({"id": review_id, "status": "updated"})
+
+    owned = {}
+    if edits:
+        owned = {
+            review_id: (movie_id, rating)
+            for review_id, movie_id, rating in db.session.execute(
+                select(Review.id, Review.movie_id, Review.rating).where(
+                    Review.user_id == user_id, Review.id.in_(list(edits))
+                )
+            )
+        }
+    for result in results:
+        if result["status"] == "updated" and result["id"] not in owned:
+            result["status"] = "not_found"
+
+    changes = RatingChanges(user_id)
+    params = []
+    for review_id, fields in edits.items():
+        if review_id not in owned:
+            continue
+        movie_id, old_rating = owned[review_id]
+        if "rating" in fields:
+            changes.change(movie_id, old_rating, fields["rating"])
+        params.append({"id": review_id, **fields})
+    if params:
+        # ORM bulk UPDATE by primary key: one executemany per set of fields
+        db.session.execute(update(Review), params)
+        changes.apply()
+    return results, {owned[p["id"]][0] for p in params}
+
+
+class RatingChanges:
+    """Collect one user's rating changes in a transaction and record them
+    before commit: as rating count deltas, and in the ``review_events`` log
+    that the recommender consumes."""
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.deltas: Dict[Tuple[int, int], int] = Counter()
+        self.events: Dict[int, Optional[int]] = {}  # movie_id -> rating now (None: none)
+
+    def add(self, movie_id: int, rating: Optional[int]):
+        self.deltas[(int(movie_id), rating or 0)] += 1
+        self.events[int(movie_id)] = rating
+
+    def remove(self, movie_id: int, rating: Optional[int]):
+        self.deltas[(int(movie_id), rating or 0)] -= 1
+        self.events[int(movie_id)] = None
+
+    def change(self, movie_id: int, old: Optional[int], new: Optional[int]):
+        if old == new:
+            return
+        self.remove(movie_id, old)
+        self.add(movie_id, new)
+
+    def movie_ids(self) -> Iterable[int]:
+        return {movie_id for movie_id, _ in self.deltas}
+
+    def apply(self):
+        """Write the changes in the current session (counts via atomic increments)."""
+        if self.events:
+            db.session.execute(
+                sql_insert(ReviewEvent),
+                [
+                    {"user_id": self.user_id, "movie_id": movie_id, "rating": rating}
+                    for movie_id, rating in self.events.items()
+                ],
+            )
+            self.events.clear()
+        # Fixed order so concurrent writers lock rows in the same sequence
+        rows = [
+            {"movie_id": movie_id, "rating": rating, "reviews": delta}
+            for (movie_id, rating), delta in sorted(self.deltas.items())
+            if delta
+        ]
+        self.deltas.clear()
+        if not rows:
+            return
+        insert = _upsert_for(db.session.get_bind().dialect.name)
+        if insert is not None:
+            # One executemany of INSERT ... ON CONFLICT DO UPDATE
+            stmt = insert(MovieRatingCount)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["movie_id", "rating"],
+                set_={"reviews": MovieRatingCount.reviews + stmt.excluded.reviews},
+            )
+            db.session.execute(stmt, rows)
+            return
+        for row in rows:
+            result = db.session.execute(
+                update(MovieRatingCount)
+                .where(MovieRatingCount.movie_id == row["movie_id"], MovieRatingCount.rating == row["rating"])
+                .values(reviews=MovieRatingCount.reviews + row["reviews"])
+            )
+            if not result.rowcount:
+                db.session.add(MovieRatingCount(**row))
+
+
+def _upsert_for(dialect: str):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+
+def rating_events(after_id: int, limit: int):
+    """``(id, user_id, movie_id, rating)`` log entries after ``after_id``, oldest first."""
+    return db.session.execute(
+        select(ReviewEvent.id, ReviewEvent.user_id, ReviewEvent.movie_id, ReviewEvent.rating)
+        .where(ReviewEvent.id > after_id)
+        .order_by(ReviewEvent.id)
+        .limit(limit)
+    ).all()
+
+
+def last_event_id() -> int:
+    return db.session.execute(select(db.func.max(ReviewEvent.id))).scalar() or 0
+
+
+def prune_events(keep: int):
+    """Drop all but the newest ``keep`` log entries."""
+    cutoff = last_event_id() - keep
+    if cutoff > 0:
+        db.session.execute(delete(ReviewEvent).where(ReviewEvent.id <= cutoff))
+        db.session.commit()
@@ -0,0 +1,326 @@
+"""In-process full-text title search over the movies stored locally."""
+
+import bisect
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from itertools import islice
+from datetime import datetime
+from math import log
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from models import Movie, db
+
+_WORD = re.compile(r"[^\W_]+")
+_MAX_PREFIX_TOKENS = 200  # vocabulary words a trailing prefix may expand to
+_MAX_CANDIDATES = 1000  # titles ranked per query
+_MERGE_BATCH = 1000  # new suggestion entries worth a full merge instead of insort
+_DENSE_PREFIX = 256  # viewed-title matches above which suggest walks titles by views
+# Match quality per kind of token match, scaled by the token's IDF
+_EXACT, _PREFIX, _TYPO = 1.0, 0.8, 0.6
+
+
+def tokens(text: str) -> List[str]:
+    """Lower-cased, accent-folded words of ``text``."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _WORD.findall(text.casefold())
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: its tokens joined by single spaces."""
+    return " ".join(tokens(query))
+
+
+def _typo_budget(word: str) -> int:
+    return 0 if len(word) < 4 else 1 if len(word) < 8 else 2
+
+
+def _deletes(word: str) -> Set[str]:
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def _within(a: str, b: str, limit: int) -> bool:
+    """Whether the edit distance (with adjacent transpositions) of ``a`` and ``b`` is at most ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return False
+        prev2, prev = prev, cur
+    return prev[-1] <= limit
+
+
+def _tails(words: Tuple[str, ...], movie_id: int) -> List[Tuple[str, int]]:
+    return [(" ".join(words[i:]), movie_id) for i in range(len(words))]
+
+
+def _prefix_range(entries: List[Tuple[str, int]], prefix: str) -> Tuple[int, int]:
+    return bisect.bisect_left(entries, (prefix,)), bisect.bisect_left(entries, (prefix + "\U0010ffff",))
+
+
+class SearchIndex:
+    """Inverted index of movie titles with prefix and typo-tolerant matching.
+
+    Every query word matches vocabulary words exactly, within one or two
+    edits (found through a deletion index, so no scan of the vocabulary),
+    and, for the last word only, by prefix, since that is the one still
+    being typed. Movies are ranked by how many query words they match, then
+    by the IDF-weighted match quality, then by shorter title.
+
+    ``suggest`` completes partial titles for typeahead from a sorted array
+    of every word-initial tail of every title ("the matrix", "matrix"),
+    searched with ``bisect``; new titles are merged into it as they arrive.
+
+    ``start`` loads the ``movies`` table in the background and then picks up
+    rows saved since the last poll every ``refresh_secs``, so the index
+    follows the movies any worker caches.
+    """
+
+    def __init__(self, refresh_secs: float = 30):
+        self.refresh_secs = refresh_secs
+        self.docs: Dict[int, Tuple[str, Optional[str], Tuple[str, ...]]] = {}
+        self.postings: Dict[str, Set[int]] = defaultdict(set)
+        self.deletes: Dict[str, Set[str]] = defaultdict(set)
+        self.watermark: Optional[datetime] = None
+        self.refreshed_at = None
+        self._vocab: List[str] = []
+        self._vocab_dirty = False
+        self._tails: List[Tuple[str, int]] = []
+        self._popular: List[Tuple[str, int]] = []
+        self._viewed: List[Tuple[int, List[str]]] = []
+        self._popular_views = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _unindex(self, movie_id: int):
+        _, _, words = self.docs.pop(movie_id)
+        for word in set(words):
+            posting = self.postings[word]
+            posting.discard(movie_id)
+            if not posting:
+                del self.postings[word]
+                for d in _deletes(word):
+                    self.deletes[d].discard(word)
+                self._vocab_dirty = True
+
+    def add(self, movies: Iterable[dict]) -> int:
+        """Index (or re-index) movies given as dicts with ``id``, ``title`` and ``poster_path``."""
+        added, tails, retitled = 0, [], set()
+        with self._lock:
+            for movie in movies:
+                movie_id, title = movie["id"], movie.get("title") or ""
+                old = self.docs.get(movie_id)
+                if old is not None:
+                    if old[0] == title:
+                        self.docs[movie_id] = (title, movie.get("poster_path"), old[2])
+                        continue
+                    self._unindex(movie_id)
+                    retitled.add(movie_id)
+                words = tuple(tokens(title))
+                self.docs[movie_id] = (title, movie.get("poster_path"), words)
+                for word in dict.fromkeys(words):
+                    if word not in self.postings:
+                        for d in _deletes(word):
+                            self.deletes[d].add(word)
+                        self._vocab_dirty = True
+                    self.postings[word].add(movie_id)
+                tails.extend(_tails(words, movie_id))
+                added += 1
+            if retitled:
+                self._tails = [t for t in self._tails if t[1] not in retitled]
+            if len(tails) < _MERGE_BATCH:
+                for tail in tails:
+                    bisect.insort(self._tails, tail)
+            else:
+                tails.sort()
+                merged = self._tails + tails
+                merged.sort()  # timsort merges the two sorted runs in linear time
+                self._tails = merged
+            if tails or retitled:
+                self._popular_views = None
+        return added
+
+    def _expand(self, word: str, last: bool) -> Dict[str, float]:
+        """Vocabulary words ``word`` may stand for, with their match quality."""
+        matches = {}
+        if word in self.postings:
+            matches[word] = _EXACT
+        budget = _typo_budget(word)
+        if budget:
+            candidates = set(self.deletes.get(word, ()))
+            for d in _deletes(word) | {word}:
+                if d in self.postings:
+                    candidates.add(d)
+                candidates.update(self.deletes.get(d, ()))
+            for candidate in candidates:
+                if candidate not in matches and _within(word, candidate, budget):
+                    matches[candidate] = _TYPO
+        if last:
+            if self._vocab_dirty:
+                self._vocab = sorted(self.postings)
+                self._vocab_dirty = False
+            start = bisect.bisect_left(self._vocab, word)
+            for candidate in self._vocab[start:start + _MAX_PREFIX_TOKENS]:
+                if not candidate.startswith(word):
+                    break
+                matches.setdefault(candidate, _PREFIX)
+        return matches
+
+    def search(self, query: str, limit: int = 20) -> List[dict]:
+        """Best ``limit`` matches as ``{id, title, poster_path, matched}`` dicts.
+
+        ``matched`` is the share of query words the title matched.
+        """
+        words = list(dict.fromkeys(tokens(query)))
+        if not words:
+            return []
+        with self._lock:
+            n_docs = max(len(self.docs), 1)
+            # Per query word: the postings it expands to, best match first
+            expanded = []
+            for i, word in enumerate(words):
+                postings = [
+                    (self.postings[c], quality * log(1 + n_docs / len(self.postings[c])))
+                    for c, quality in self._expand(word, last=i == len(words) - 1).items()
+                ]
+                postings.sort(key=lambda pw: -pw[1])
+                expanded.append(postings)
+            matchable = [p for p in expanded if p]
+            if not matchable:
+                return []
+
+            # Candidates come from the rarest word only; the others are checked
+            # by set membership, so common words never have their postings walked
+            rarest = min(matchable, key=lambda p: sum(len(posting) for posting, _ in p))
+            candidates = set()
+            for posting, _ in rarest:
+                if len(candidates) + len(posting) > _MAX_CANDIDATES:
+                    candidates.update(islice(posting, _MAX_CANDIDATES - len(candidates)))
+                    break
+                candidates |= posting
+
+            # Best weight per candidate for each word; intersecting with the
+            # candidates first keeps this proportional to the smaller side
+            lookups = []
+            for postings in matchable:
+                best = {}
+                for posting, w in reversed(postings):
+                    best.update(dict.fromkeys(candidates & posting, w))
+                lookups.append(best)
+
+            def rank(movie_id):
+                count, weight = 0, 0.0
+                for best in lookups:
+                    w = best.get(movie_id)
+                    if w is not None:
+                        count += 1
+                        weight += w
+                return -count, -weight, len(self.docs[movie_id][0])
+
+            ranked = heapq.nsmallest(limit, ((rank(mid), mid) for mid in candidates))
+            return [
+                {
+                    "id": movie_id,
+                    "title": self.docs[movie_id][0],
+                    "poster_path": self.docs[movie_id][1],
+                    "matched": -key[0] / len(words),
+                }
+                for key, movie_id in ranked
+            ]
+
+    def _rank_popular(self, views: Dict[int, float]):
+        """Order the viewed titles by views and sort their suggestion entries."""
+        viewed = sorted((mid for mid in views if mid in self.docs), key=lambda mid: -views[mid])
+        self._viewed = [(mid, [key for key, _ in _tails(self.docs[mid][2], mid)]) for mid in viewed]
+        self._popular = sorted(tail for mid in viewed for tail in _tails(self.docs[mid][2], mid))
+        self._popular_views = views
+
+    def suggest(self, query: str, limit: int = 8, views: Optional[Dict[int, float]] = None) -> List[dict]:
+        """Titles with a word sequence starting with ``query``, most viewed first.
+
+        ``views`` maps movie ids to popularity (``ViewCounter.views``); a new
+        snapshot re-sorts the small array of viewed titles. Unviewed titles
+        only fill the remaining slots, in alphabetical order.
+        """
+        prefix = normalize_query(query)
+        if not prefix:
+            return []
+        if query[-1:].isspace():
+            prefix += " "  # the last word is complete
+        views = views or {}
+        with self._lock:
+            if views is not self._popular_views:
+                self._rank_popular(views)
+            lo, hi = _prefix_range(self._popular, prefix)
+            if hi - lo > _DENSE_PREFIX:
+                # Many viewed titles match: walking them in view order finds the
+                # top ones within roughly limit / density titles
+                picked = []
+                for mid, keys in self._viewed:
+                    if any(key.startswith(prefix) for key in keys):
+                        picked.append(mid)
+                        if len(picked) == limit:
+                            break
+            else:
+                picked = sorted({mid for _, mid in self._popular[lo:hi]}, key=lambda mid: -views[mid])[:limit]
+            if len(picked) < limit:
+                # A title appears once per word, so read a few extra entries
+                lo, hi = _prefix_range(self._tails, prefix)
+                for _, mid in self._tails[lo:min(hi, lo + 4 * limit)]:
+                    if mid not in picked:
+                        picked.append(mid)
+                        if len(picked) == limit:
+                            break
+            return [{"id": mid, "title": self.docs[mid][0], "poster_path": self.docs[mid][1]} for mid in picked]
+
+    def refresh(self, app, batch: int = 5000) -> int:
+        """Index movies stored (or re-fetched) since the last refresh."""
+        stmt = select(Movie.id, Movie.title, Movie.poster_path, Movie.fetched_at).order_by(Movie.fetched_at)
+        if self.watermark is not None:
+            # Rows sharing the watermark timestamp are re-read; re-adding is a no-op
+            stmt = stmt.where(Movie.fetched_at >= self.watermark)
+        added = 0
+        with app.app_context():
+            try:
+                for rows in db.session.execute(stmt.execution_options(yield_per=batch)).partitions():
+                    added += self.add({"id": r.id, "title": r.title, "poster_path": r.poster_path} for r in rows)
+                    self.watermark = rows[-1].fetched_at
+            finally:
+                db.session.remove()
+        self.refreshed_at = time.time()
+        return added
+
+    def _run(self, app):
+        while True:
+            try:
+                self.refresh(app)
+            except Exception as e:
+                print(f"Search index refresh failed: {e}")
+            time.sleep(self.refresh_secs)
+
+    def start(self, app):
+        if self.refresh_secs <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, args=(app,), name="search-index", daemon=True)
+        self._thread.start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "movies": len(self.docs),
+                "words": len(self.postings),
+                "refreshed_at": self.refreshed_at,
+            }
@@ -0,0 +1,173 @@
+"""Cognito-backed sessions: compact identities, tokens kept apart, per-request lookup.
+
+A session is two keys with the same TTL. ``sess:<sid>`` holds the identity
+every signed-in request needs (user id, username, display name, claim
+times) in a small binary encoding; ``sess:<sid>:tok`` holds the ID and
+access tokens, which only ``/api/auth-status`` reads, and only when it has
+to re-verify them. Sessions written as one JSON blob by earlier releases
+are still read.
+"""
+
+import json
+import struct
+from typing import Dict, Optional
+
+from flask import g, request
+
+from l1cache import LocalCache
+
+INT_FIELDS = ("user_id", "verified_until", "exp", "iat")
+STR_FIELDS = ("username", "sub", "email", "display_name")
+IDENTITY_FIELDS = INT_FIELDS + STR_FIELDS
+TOKEN_FIELDS = ("id_token", "access_token")
+
+_VERSION = 1
+_HEADER = struct.Struct("<B4q")  # version, then INT_FIELDS (-1 for None)
+_LENGTH = struct.Struct("<H")  # UTF-8 length of each of STR_FIELDS
+_NULL_LENGTH = 0xFFFF
+_ABSENT = False  # cached in-process for sids with no session
+
+
+def _key(sid: str) -> str:
+    return f"sess:{sid}"
+
+
+def _tokens_key(sid: str) -> str:
+    return f"sess:{sid}:tok"
+
+
+def encode(identity: dict) -> bytes:
+    """Binary form of the identity fields of ``identity``."""
+    ints = [identity.get(k) for k in INT_FIELDS]
+    parts = [_HEADER.pack(_VERSION, *(-1 if v is None else int(v) for v in ints))]
+    for key in STR_FIELDS:
+        value = identity.get(key)
+        if value is None:
+            parts.append(_LENGTH.pack(_NULL_LENGTH))
+            continue
+        raw = str(value).encode("utf-8")
+        if len(raw) >= _NULL_LENGTH:
+            raise ValueError(f"session {key} too long")
+        parts.append(_LENGTH.pack(len(raw)))
+        parts.append(raw)
+    return b"".join(parts)
+
+
+def decode(blob: bytes) -> dict:
+    """Identity fields from ``encode`` output, or from a legacy JSON session."""
+    if blob[:1] == b"{":
+        data = json.loads(blob)
+        return {k: data.get(k) for k in IDENTITY_FIELDS}
+    version, *ints = _HEADER.unpack_from(blob)
+    if version != _VERSION:
+        raise ValueError(f"unknown session encoding {version}")
+    identity = {k: None if v == -1 else v for k, v in zip(INT_FIELDS, ints)}
+    offset = _HEADER.size
+    for key in STR_FIELDS:
+        (length,) = _LENGTH.unpack_from(blob, offset)
+        offset += _LENGTH.size
+        if length == _NULL_LENGTH:
+            identity[key] = None
+        else:
+            identity[key] = blob[offset:offset + length].decode("utf-8")
+            offset += length
+    return identity
+
+
+def _encode_tokens(tokens: dict) -> bytes:
+    # JWTs are base64url segments, so they never contain a newline
+    return "\n".join(tokens.get(k) or "" for k in TOKEN_FIELDS).encode("ascii")
+
+
+def _decode_tokens(blob: bytes) -> Dict[str, Optional[str]]:
+    return {k: v or None for k, v in zip(TOKEN_FIELDS, blob.decode("ascii").split("\n"))}
+
+
+class SessionStore:
+    """Sessions in Redis, or in Flask-Caching without Redis.
+
+    Identities are also kept in-process for ``local_ttl_secs`` (sids with no
+    session too), so a burst of requests from one browser costs one Redis
+    read. A logout on another worker therefore takes up to that long to be
+    seen here.
+    """
+
+    def __init__(self, redis_client=None, cache=None, local_ttl_secs: float = 5, local_max_entries: int = 10000):
+        self.redis = redis_client
+        self.cache = cache
+        self.local = LocalCache("session_l1", local_max_entries, local_max_entries * 256, local_ttl_secs)
+
+    def get(self, sid: str) -> Optional[dict]:
+        """Identity of session ``sid``, or None if there is none."""
+        identity = self.local.get(sid)
+        if identity is not None:
+            return identity or None
+        epoch = self.local.epoch
+        try:
+            if self.redis is not None:
+                blob = self.redis.get(_key(sid))
+                identity = decode(blob) if blob else None
+            else:
+                data = self.cache.get(_key(sid))
+                identity = {k: data.get(k) for k in IDENTITY_FIELDS} if data else None
+        except Exception as e:
+            print(f"Session lookup failed: {e}")
+            return None
+        self.local.set(sid, identity or _ABSENT, size=128, epoch=epoch)
+        return identity
+
+    def tokens(self, sid: str) -> Dict[str, Optional[str]]:
+        """ID and access tokens of session ``sid`` (None values if missing)."""
+        if self.redis is not None:
+            blob, legacy = self.redis.mget([_tokens_key(sid), _key(sid)])
+            if blob is not None:
+                return _decode_tokens(blob)
+            data = json.loads(legacy) if legacy and legacy[:1] == b"{" else {}
+        else:
+            data = self.cache.get(_tokens_key(sid)) or self.cache.get(_key(sid)) or {}
+        return {k: data.get(k) for k in TOKEN_FIELDS}
+
+    def put(self, sid: str, session: dict, ttl: int):
+        """Store a session given as one dict of identity and token fields."""
+        identity = {k: session.get(k) for k in IDENTITY_FIELDS}
+        tokens = {k: session.get(k) for k in TOKEN_FIELDS}
+        if self.redis is not None:
+            with self.redis.pipeline() as pipe:
+                pipe.setex(_key(sid), ttl, encode(identity))
+                pipe.setex(_tokens_key(sid), ttl, _encode_tokens(tokens))
+                pipe.execute()
+        else:
+            self.cache.set_many({_key(sid): identity, _tokens_key(sid): tokens}, timeout=ttl)
+        self.local.delete(sid)
+        self.local.set(sid, identity, size=128)
+
+    def delete(self, sid: str):
+        if self.redis is not None:
+            self.redis.delete(_key(sid), _tokens_key(sid))
+        else:
+            self.cache.delete_many(_key(sid), _tokens_key(sid))
+        self.local.delete(sid)
+
+    def put_state(self, state: str, data: dict, ttl: int):
+        """Short-lived login state (PKCE verifier, nonce) keyed by the OIDC ``state``."""
+        if self.redis is not None:
+            self.redis.setex(f"oidc:{state}", ttl, json.dumps(data))
+        else:
+            self.cache.set(f"oidc:{state}", data, timeout=ttl)
+
+    def get_state(self, state: str) -> Optional[dict]:
+        if self.redis is not None:
+            val = self.redis.get(f"oidc:{state}")
+            return json.loads(val) if val else None
+        return self.cache.get(f"oidc:{state}")
+
+
+def current(store: SessionStore, cookie_name: str) -> Optional[dict]:
+    """The request's session identity, looked up at most once per request.
+
+    Requests without the session cookie never touch the store.
+    """
+    if "session_identity" not in g:
+        sid = request.cookies.get(cookie_name)
+        g.session_identity = store.get(sid) if sid else None
+    return g.session_identity
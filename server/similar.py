@@ -0,0 +1,229 @@
+"""Content embeddings and an IVF index for "more like this" movie lookups.
+
+Each movie is embedded offline from its TMDB genres and title/overview
+words: TF-IDF weights over hashed tokens, projected to ``DIM`` dimensions
+with the signed hashing trick, so no vocabulary or model is needed at
+query time. ``build`` clusters the embeddings (spherical k-means) into an
+inverted-file index that ``write`` stores via ``mapped_arrays``; a query
+scans only the ``nprobe`` lists whose centroids are closest.
+"""
+
+import functools
+import re
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+import mapped_arrays
+
+DIM = 128
+_SLOTS = 1 << 18  # hashed token space the IDF table is kept over
+GENRE_WEIGHT = 0.5  # share of each embedding's squared norm taken by genres
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "the and for with his her their they them this that from into when who whom what while where "
+    "are was were has have had but not its out one two all after before about him she you your "
+    "our can will must than then there these those over under upon only also being been".split()
+)
+
+
+def _tokens(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if len(t) > 2 and t not in _STOPWORDS]
+
+
+def _slot(token: str, cache: Dict[str, int]) -> int:
+    slot = cache.get(token)
+    if slot is None:
+        slot = cache[token] = zlib.crc32(token.encode()) % _SLOTS
+    return slot
+
+
+def _counts(movies: Iterable[dict]) -> Tuple[np.ndarray, sparse.csr_matrix, sparse.csr_matrix]:
+    """Movie ids plus hashed token counts for text and for genres, one row per movie."""
+    ids, text_rows, genre_rows = [], ([], [], [0]), ([], [], [0])
+    cache: Dict[str, int] = {}
+    for movie in movies:
+        ids.append(movie["id"])
+        text = _tokens(f"{movie.get('title') or ''} {movie.get('overview') or ''}")
+        genres = [f"genre:{g.get('id')}" for g in movie.get("genres") or []]
+        for tokens, (cols, vals, indptr) in ((text, text_rows), (genres, genre_rows)):
+            counts = Counter(_slot(t, cache) for t in tokens)
+            cols.extend(counts.keys())
+            vals.extend(counts.values())
+            indptr.append(len(cols))
+
+    def matrix(rows):
+        cols, vals, indptr = rows
+        return sparse.csr_matrix(
+            (np.asarray(vals, dtype=np.float32), np.asarray(cols, dtype=np.int64), indptr),
+            shape=(len(ids), _SLOTS),
+        )
+
+    return np.asarray(ids, dtype=np.int64), matrix(text_rows), matrix(genre_rows)
+
+
+@functools.lru_cache(maxsize=1)
+def _projection() -> sparse.csr_matrix:
+    """Signed hashing of the token space down to ``DIM`` dimensions."""
+    slots = np.arange(_SLOTS, dtype=np.uint64)
+    mixed = (slots * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)
+    dims = (mixed % np.uint64(DIM)).astype(np.int64)
+    signs = np.where((mixed >> np.uint64(16)) & np.uint64(1), 1.0, -1.0).astype(np.float32)
+    return sparse.csr_matrix((signs, (np.arange(_SLOTS), dims)), shape=(_SLOTS, DIM))
+
+
+def _normalize(X: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    return X / np.where(norms > 0, norms, 1)
+
+
+def _embed(text: sparse.csr_matrix, genres: sparse.csr_matrix, idf: np.ndarray) -> np.ndarray:
+    P = _projection()
+    text = text.copy()
+    text.data = (1 + np.log(text.data)) * idf[text.indices]  # sublinear TF times IDF
+    return _normalize(
+        np.sqrt(1 - GENRE_WEIGHT) * _normalize(np.asarray((text @ P).todense(), dtype=np.float32))
+        + np.sqrt(GENRE_WEIGHT) * _normalize(np.asarray((genres @ P).todense(), dtype=np.float32))
+    ).astype(np.float32)
+
+
+def _assign(X: np.ndarray, centroids: np.ndarray, chunk: int = 16384) -> np.ndarray:
+    return np.concatenate(
+        [np.argmax(X[i:i + chunk] @ centroids.T, axis=1) for i in range(0, len(X), chunk)]
+    ) if len(X) else np.empty(0, dtype=np.int64)
+
+
+def _kmeans(X: np.ndarray, nlist: int, iterations: int, rng) -> np.ndarray:
+    """Spherical k-means centroids (unit vectors) for ``X``."""
+    centroids = X[rng.choice(len(X), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _assign(X, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, X)
+        empty = ~sums.any(axis=1)
+        # Re-seed empty lists from random points so every list stays useful
+        sums[empty] = X[rng.choice(len(X), int(empty.sum()), replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+
+def build(
+    movies: Iterable[dict],
+    nlist: Optional[int] = None,
+    iterations: int = 10,
+    sample: int = 100_000,
+    seed: int = 0,
+) -> Dict[str, np.ndarray]:
+    """Embed ``movies`` (dicts shaped like ``Movie.to_dict()``) and index them; returns arrays for ``write``."""
+    ids, text, genres = _counts(movies)
+    n = len(ids)
+    df = np.bincount(text.indices, minlength=_SLOTS)
+    idf = (np.log((1 + n) / (1 + df)) + 1).astype(np.float32)
+    X = _embed(text, genres, idf)
+
+    rng = np.random.default_rng(seed)
+    train = X[rng.choice(n, min(n, sample), replace=False)] if n else X
+    nlist = max(1, min(nlist or int(np.sqrt(n)), len(train)))
+    centroids = _kmeans(train, nlist, iterations, rng) if n else np.zeros((1, DIM), dtype=np.float32)
+    labels = _assign(X, centroids)
+
+    # Vectors stored list by list, so each probe scans one contiguous block
+    order = np.argsort(labels, kind="stable")
+    by_id = np.argsort(ids, kind="stable")
+    position = np.empty(n, dtype=np.int64)
+    position[order] = np.arange(n)
+    # 8-bit codes with one scale per movie: a quarter of float32's size, and
+    # widening int8 for the scan is far cheaper than float16
+    X = X[order]
+    scales = np.abs(X).max(axis=1) / 127 if n else np.empty(0, dtype=np.float32)
+    codes = np.round(X / np.where(scales > 0, scales, 1)[:, None]).astype(np.int8)
+    return {
+        "centroids": centroids.astype(np.float32),
+        "offsets": np.searchsorted(labels[order], np.arange(len(centroids) + 1)).astype(np.int64),
+        "list_ids": ids[order],
+        "codes": codes,
+        "scales": scales.astype(np.float32),
+        "ids": ids[by_id],
+        "positions": position[by_id],
+        "idf": idf,
+    }
+
+
+def write(index_dir: str, arrays: Dict[str, np.ndarray], keep: int = 3) -> str:
+    """Store ``arrays`` as a new index version and make it current; returns its path."""
+    return mapped_arrays.write(index_dir, "similar", arrays, keep=keep)
+
+
+class SimilarIndex:
+    """One index version, mapped read-only from disk."""
+
+    def __init__(self, path: str, nprobe: int = 16):
+        header, arrays = mapped_arrays.read(path)
+        self.path = path
+        self.version = header["version"]
+        self.nprobe = nprobe
+        self.centroids = arrays["centroids"]
+        self.offsets = arrays["offsets"]
+        self.list_ids = arrays["list_ids"]
+        self.codes = arrays["codes"]
+        self.scales = arrays["scales"]
+        self.ids = arrays["ids"]
+        self.positions = arrays["positions"]
+        self.idf = arrays["idf"]
+
+    def vector(self, movie_id: int) -> Optional[np.ndarray]:
+        """The stored embedding of an indexed movie."""
+        i = int(np.searchsorted(self.ids, movie_id))
+        if i == len(self.ids) or self.ids[i] != movie_id:
+            return None
+        row = self.positions[i]
+        return self.codes[row].astype(np.float32) * self.scales[row]
+
+    def embed(self, movie: dict) -> np.ndarray:
+        """Embed a movie that is not in the index with this version's IDF weights."""
+        _, text, genres = _counts([movie])
+        return _embed(text, genres, self.idf)[0]
+
+    def search(self, query: np.ndarray, k: int, exclude: Optional[int] = None, nprobe: Optional[int] = None):
+        """``(movie_id, cosine)`` of the ``k`` nearest indexed movies, best first."""
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        query = query.astype(np.float32)
+        lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        blocks = [(self.offsets[c], self.offsets[c + 1]) for c in lists]
+        rows = np.concatenate([np.arange(a, b) for a, b in blocks]) if blocks else np.empty(0, dtype=np.int64)
+        if not len(rows):
+            return []
+        scores = np.concatenate([(self.codes[a:b].astype(np.float32) @ query) * self.scales[a:b] for a, b in blocks])
+        count = min(k + (exclude is not None), len(rows))
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.argsort(-scores[top])]
+        found = [(int(self.list_ids[rows[i]]), float(scores[i])) for i in top]
+        return [(mid, score) for mid, score in found if mid != exclude][:k]
+
+    def similar(self, movie_id: int, k: int, movie: Optional[dict] = None) -> List[Tuple[int, float]]:
+        """Movies most like ``movie_id``; ``movie`` embeds it if it is not indexed yet."""
+        query = self.vector(movie_id)
+        if query is None:
+            if movie is None:
+                return []
+            query = self.embed(movie)
+        return self.search(query, k, exclude=movie_id)
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "movies": int(len(self.ids)),
+            "lists": int(len(self.centroids)),
+            "nprobe": self.nprobe,
+            "bytes": int(sum(a.nbytes for a in (self.codes, self.scales, self.list_ids, self.ids, self.positions))),
+        }
+
+
+class SimilarStore(mapped_arrays.VersionedStore[SimilarIndex]):
+    """The current ``SimilarIndex`` in ``index_dir``, reloaded when ``CURRENT`` changes."""
+
+    def __init__(self, index_dir: Optional[str], nprobe: int = 16, check_secs: float = 30):
+        super().__init__(index_dir, lambda path: SimilarIndex(path, nprobe=nprobe), check_secs=check_secs)
@@ -0,0 +1,120 @@
+"""Collapse concurrent computations of the same key into a single call."""
+
+import threading
+import time
+import uuid
+from typing import Any, Callable, Optional
+
+# Delete the lock only if we still own it (the lease may have expired)
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Run ``fn`` once per key no matter how many callers ask concurrently.
+
+    Within a process, callers for a key that is already in flight block on the
+    leader's result. Across processes the leader also takes a short Redis lease
+    (``SET NX PX``); leaders in other processes then poll ``load`` for the
+    result the lease holder publishes, and only compute it themselves if the
+    lease lapses without one.
+    """
+
+    def __init__(
+        self,
+        redis_client=None,
+        lease_secs: float = 5.0,
+        poll_secs: float = 0.05,
+        prefix: str = "sf:",
+    ):
+        self.redis = redis_client
+        self.lease_ms = int(lease_secs * 1000)
+        self.poll_secs = poll_secs
+        self.prefix = prefix
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        load: Optional[Callable[[], Any]] = None,
+    ):
+        """Return ``fn()`` for ``key``, sharing one in-flight call between callers.
+
+        ``load`` returns the result published by another process, or ``None``
+        if it is not available yet; without it only in-process callers are
+        coalesced.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run(key, fn, load)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def _run(self, key, fn, load):
+        if self.redis is None or load is None:
+            return fn()
+
+        lock_key = f"{self.prefix}{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + 2 * self.lease_ms / 1000
+        while True:
+            try:
+                acquired = self.redis.set(lock_key, token, nx=True, px=self.lease_ms)
+            except Exception:
+                # Redis trouble should cost duplicate fetches, not failed requests
+                return fn()
+            if acquired:
+                try:
+                    return fn()
+                finally:
+                    try:
+                        self.redis.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+                    except Exception:
+                        pass
+
+            # Someone else holds the lease: wait for their result
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_secs)
+                result = load()
+                if result is not None:
+                    return result
+                try:
+                    if not self.redis.exists(lock_key):
+                        break  # holder finished (or died) without publishing
+                except Exception:
+                    return fn()
+            else:
+                return fn()
+            result = load()
+            if result is not None:
+                return result
@@ -0,0 +1,82 @@
+"""TMDB client helpers shared by the API routes."""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Mapping
+
+from config import API_KEY, TMDB_BASE_URL, TMDB_MAX_WORKERS
+import upstream
+
+MOVIE_URL = f"{TMDB_BASE_URL}movie/"
+
+
+def fetch_movie(movie_id: int) -> dict:
+    """Fetch the raw TMDB payload for one movie, raising on HTTP errors."""
+    resp = upstream.tmdb.get(f"{MOVIE_URL}{movie_id}", params={"api_key": API_KEY})
+    resp.raise_for_status()
+    return resp.json()
+
+
+def search_movies(query: str) -> list:
+    """Run a TMDB title search, raising on HTTP errors."""
+    resp = upstream.tmdb.get(
+        f"{TMDB_BASE_URL}search/movie", params={"api_key": API_KEY, "query": query}
+    )
+    resp.raise_for_status()
+    return resp.json().get("results", [])
+
+
+def fetch_movies(
+    movie_ids: Iterable[int], max_workers: int = TMDB_MAX_WORKERS
+) -> Dict[int, dict]:
+    """Fetch several movies concurrently; failed lookups are left out."""
+    ids = list(dict.fromkeys(movie_ids))
+    if not ids:
+        return {}
+
+    def _fetch(mid):
+        try:
+            return mid, fetch_movie(mid)
+        except Exception:
+            return mid, None
+
+    workers = max(1, min(max_workers, len(ids)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_fetch, ids)
+        return {mid: movie for mid, movie in results if movie is not None}
+
+
+def resolve_titles(
+    movie_ids: Iterable[int],
+    lookup: Callable[[List[int]], Mapping[int, str]],
+    store: Callable[[Dict[int, dict]], None],
+    max_workers: int = TMDB_MAX_WORKERS,
+) -> Dict[int, str]:
+    """Map movie IDs to titles, only going to TMDB for IDs ``lookup`` misses.
+
+    ``lookup`` receives the deduplicated IDs and returns the titles it already
+    knows; the rest are fetched concurrently and their raw payloads handed to
+    ``store``. Movies TMDB cannot resolve are absent from the result.
+    """
+    ids = list(dict.fromkeys(int(mid) for mid in movie_ids))
+    titles: Dict[int, str] = {}
+    if not ids:
+        return titles
+    try:
+        titles.update({mid: t for mid, t in lookup(ids).items() if t})
+    except Exception:
+        # A broken local cache should only cost us upstream calls
+        pass
+
+    misses = [mid for mid in ids if mid not in titles]
+    fetched = {
+        mid: movie
+        for mid, movie in fetch_movies(misses, max_workers=max_workers).items()
+        if movie.get("title")
+    }
+    if fetched:
+        titles.update({mid: movie["title"] for mid, movie in fetched.items()})
+        try:
+            store(fetched)
+        except Exception:
+            pass
+    return titles
@@ -0,0 +1,246 @@
+"""Shared clients and concurrency helpers for calls to upstream APIs.
+
+Each upstream host gets one pooled ``requests.Session`` (keep-alive), default
+timeouts, jittered retries on 429/5xx that honour ``Retry-After``, and a
+circuit breaker so a dead host fails fast instead of tying up workers.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+from config import (
+    TMDB_TIMEOUT_SECS,
+    UPSTREAM_BACKOFF_SECS,
+    UPSTREAM_BREAKER_RESET_SECS,
+    UPSTREAM_BREAKER_THRESHOLD,
+    UPSTREAM_CONNECT_TIMEOUT_SECS,
+    UPSTREAM_MAX_RETRY_WAIT_SECS,
+    UPSTREAM_MAX_WORKERS,
+    UPSTREAM_RETRIES,
+)
+
+# Only leaf HTTP calls run here; tasks must never wait on other tasks in this
+# pool, otherwise a burst of requests could exhaust it and deadlock.
+_pool = ThreadPoolExecutor(
+    max_workers=UPSTREAM_MAX_WORKERS, thread_name_prefix="upstream"
+)
+
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def submit(fn, *args, **kwargs) -> Future:
+    """Start an upstream call in the background and return its future."""
+    return _pool.submit(fn, *args, **kwargs)
+
+
+class Deadline:
+    """Absolute time budget shared by every wait within one request."""
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised without touching the network while a host's circuit is open."""
+
+
+class CircuitBreaker:
+    """Open after ``threshold`` consecutive failures; probe again after ``reset_secs``."""
+
+    def __init__(self, threshold: int, reset_secs: float):
+        self.threshold = threshold
+        self.reset_secs = reset_secs
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_secs:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                # Let exactly one request through to test the host
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+def _retry_after(resp: requests.Response) -> Optional[float]:
+    """Seconds the server asked us to wait, from Retry-After or TMDB's reset header."""
+    value = resp.headers.get("Retry-After")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    reset = resp.headers.get("X-RateLimit-Reset")
+    if reset:
+        try:
+            return max(0.0, float(reset) - time.time())
+        except ValueError:
+            pass
+    return None
+
+
+class UpstreamClient:
+    """Pooled, retrying HTTP client for one upstream host."""
+
+    def __init__(
+        self,
+        name: str,
+        read_timeout: float,
+        retries: int = UPSTREAM_RETRIES,
+        pool_size: int = UPSTREAM_MAX_WORKERS,
+    ):
+        self.name = name
+        self.timeout = (UPSTREAM_CONNECT_TIMEOUT_SECS, read_timeout)
+        self.retries = retries
+        self.breaker = CircuitBreaker(
+            UPSTREAM_BREAKER_THRESHOLD, UPSTREAM_BREAKER_RESET_SECS
+        )
+        self.session = requests.Session()
+        self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "errors": 0,
+            "retries": 0,
+            "short_circuited": 0,
+            "in_flight": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+        }
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for key, delta in deltas.items():
+                self._stats[key] += delta
+
+    def _observe(self, elapsed_ms: float, outcome: str):
+        metrics.UPSTREAM_SECONDS.labels(self.name, outcome).observe(elapsed_ms / 1000)
+        with self._stats_lock:
+            self._stats["requests"] += 1
+            self._stats["total_ms"] += elapsed_ms
+            self._stats["max_ms"] = max(self._stats["max_ms"], elapsed_ms)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request, retrying idempotent calls on 429/5xx and connection errors."""
+        method = method.upper()
+        kwargs.setdefault("timeout", self.timeout)
+        retries = self.retries if method in _IDEMPOTENT_METHODS else 0
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self._count(short_circuited=1)
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            self._count(in_flight=1)
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                resp = self.session.request(method, url, **kwargs)
+                outcome = f"{resp.status_code // 100}xx"
+            except (requests.ConnectionError, requests.Timeout):
+                self._count(errors=1)
+                self.breaker.record_failure()
+                if attempt >= retries:
+                    raise
+                wait = None
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            else:
+                if resp.status_code not in _RETRY_STATUSES:
+                    self.breaker.record_success()
+                    return resp
+                self._count(errors=1)
+                self.breaker.record_failure()
+                wait = _retry_after(resp)
+                if attempt >= retries or (wait or 0) > UPSTREAM_MAX_RETRY_WAIT_SECS:
+                    return resp
+            finally:
+                self._count(in_flight=-1)
+                self._observe((time.perf_counter() - start) * 1000, outcome)
+
+            if wait is None:
+                # Full jitter so synchronized callers don't retry in lockstep
+                wait = random.uniform(0, UPSTREAM_BACKOFF_SECS * (2 ** attempt))
+            attempt += 1
+            self._count(retries=1)
+            time.sleep(wait)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["avg_ms"] = stats["total_ms"] / stats["requests"] if stats["requests"] else 0.0
+        stats["circuit"] = self.breaker.state
+        manager = self._adapter.poolmanager
+        pools = [manager.pools[key] for key in manager.pools.keys()]
+        stats["pools"] = [
+            {
+                "host": pool.host,
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "max_size": pool.pool.maxsize if pool.pool is not None else 0,
+            }
+            for pool in pools
+        ]
+        return stats
+
+
+tmdb = UpstreamClient("tmdb", read_timeout=TMDB_TIMEOUT_SECS)
+wikipedia = UpstreamClient("wikipedia", read_timeout=5)
+cognito = UpstreamClient("cognito", read_timeout=10)
+
+CLIENTS = {c.name: c for c in (tmdb, wikipedia, cognito)}
+
+
+def stats() -> dict:
+    """Per-host request, latency, circuit and connection-pool stats."""
+    return {name: client.stats() for name, client in CLIENTS.items()}
@@ -0,0 +1,108 @@
+"""Batched movie view counting and periodic top-N recomputation."""
+
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, Optional
+
+
+class ViewCounter:
+    """Count views in-process and keep the ``movie:views`` zset in Redis up to date.
+
+    ``record`` only bumps a local counter. A background thread flushes the
+    counts with one pipelined ``ZINCRBY`` batch every ``flush_secs`` and, every
+    ``refresh_secs``, recomputes the top-N set that ``is_top`` answers from.
+    One worker per refresh interval (elected with ``SET NX``) also decays all
+    scores towards zero with the configured half-life, so popularity reflects
+    recent traffic, and trims the zset to ``max_tracked`` members. The scores
+    of all tracked movies are kept as well (``views``), for ranking.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        zset: str,
+        top_n: int,
+        flush_secs: float = 5,
+        refresh_secs: float = 30,
+        half_life_secs: float = 7 * 86400,
+        max_tracked: int = 10000,
+        on_demoted: Optional[Callable[[Iterable[int]], None]] = None,
+    ):
+        self.redis = redis_client
+        self.zset = zset
+        self.top_n = top_n
+        self.flush_secs = flush_secs
+        self.refresh_secs = refresh_secs
+        self.half_life_secs = half_life_secs
+        self.max_tracked = max_tracked
+        self.on_demoted = on_demoted
+        self.top_ids = frozenset()
+        self.views: Dict[int, float] = {}
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record(self, movie_id: int):
+        if self.redis is None:
+            # Nothing would ever flush the counts
+            return
+        with self._lock:
+            self._pending[int(movie_id)] += 1
+
+    def is_top(self, movie_id: int) -> bool:
+        return int(movie_id) in self.top_ids
+
+    def flush(self):
+        """Write buffered counts to Redis in one round-trip."""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending or self.redis is None:
+            return
+        try:
+            with self.redis.pipeline(transaction=False) as pipe:
+                for movie_id, count in pending.items():
+                    pipe.zincrby(self.zset, count, str(movie_id))
+                pipe.execute()
+        except Exception:
+            # Put the counts back so the next flush retries them
+            with self._lock:
+                self._pending.update(pending)
+
+    def refresh_top(self):
+        """Decay/trim (if elected) and reload the top-N membership."""
+        if self.redis is None:
+            return
+        if self.redis.set(f"{self.zset}:maintenance", 1, nx=True, ex=max(1, int(self.refresh_secs))):
+            factor = 0.5 ** (self.refresh_secs / self.half_life_secs)
+            with self.redis.pipeline() as pipe:
+                pipe.zunionstore(self.zset, {self.zset: factor})
+                # Drop the long tail so the zset stays bounded
+                pipe.zremrangebyrank(self.zset, 0, -(self.max_tracked + 1))
+                pipe.execute()
+        ranked = self.redis.zrevrange(self.zset, 0, max(self.top_n, self.max_tracked) - 1, withscores=True)
+        # Replaced whole, so readers can tell a new snapshot by identity
+        self.views = {int(mid): score for mid, score in ranked}
+        ids = frozenset(int(mid) for mid, _ in ranked[:self.top_n])
+        demoted = self.top_ids - ids
+        self.top_ids = ids
+        if demoted and self.on_demoted is not None:
+            self.on_demoted(demoted)
+
+    def _run(self):
+        next_refresh = 0.0
+        while True:
+            try:
+                self.flush()
+                if time.monotonic() >= next_refresh:
+                    self.refresh_top()
+                    next_refresh = time.monotonic() + self.refresh_secs
+            except Exception:
+                pass
+            time.sleep(self.flush_secs)
+
+    def start(self):
+        if self.redis is None or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="view-counter", daemon=True)
+        self._thread.start()
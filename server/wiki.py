@@ -0,0 +1,171 @@
+"""Wikipedia article links for movies, stored per movie with negative caching.
+
+A movie's link is looked up once and kept in ``movies.wiki_link``. When no
+article is found, or Wikipedia fails, the attempt is recorded instead
+(``wiki_checked_at``, ``wiki_misses``) and the movie is not looked up
+again until ``WIKI_RETRY_SECS`` has passed, doubling with every further
+miss up to ``WIKI_RETRY_MAX_SECS``.
+
+``resolve_pending`` is the batch job behind ``flask resolve-wiki-links``:
+it asks for ``BATCH`` "<title> (film)" pages per MediaWiki query and only
+falls back to one search per title for the movies those do not settle.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from config import WIKI_RETRY_MAX_SECS, WIKI_RETRY_SECS, WIKIPEDIA_API_URL
+from models import Movie, db
+import upstream
+
+BATCH = 50  # titles per query: MediaWiki's limit without the apihighlimits right
+ARTICLE_URL = "https://en.wikipedia.org/wiki/"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def article_url(page_title: str) -> str:
+    return ARTICLE_URL + page_title.replace(" ", "_")
+
+
+def retry_delay(misses: int) -> timedelta:
+    return timedelta(seconds=min(WIKI_RETRY_SECS * 2 ** max(misses - 1, 0), WIKI_RETRY_MAX_SECS))
+
+
+def due(rec: Movie, now: Optional[datetime] = None) -> bool:
+    """Whether ``rec`` has no link and its last lookup is older than the backoff."""
+    if rec.wiki_link and rec.wiki_link != "#":
+        return False
+    if rec.wiki_checked_at is None:
+        return True
+    return (now or _utcnow()) - rec.wiki_checked_at >= retry_delay(rec.wiki_misses or 0)
+
+
+def record(rec: Movie, link: Optional[str], now: Optional[datetime] = None):
+    """Store a lookup result on ``rec``; None (no article, or failure) counts a miss."""
+    rec.wiki_checked_at = now or _utcnow()
+    if link and link != "#":
+        rec.wiki_link = link
+        rec.wiki_misses = 0
+    else:
+        rec.wiki_link = None
+        rec.wiki_misses = (rec.wiki_misses or 0) + 1
+
+
+def search(title: str) -> Optional[str]:
+    """Link of the best full-text match for ``title``; raises on request errors."""
+    params = {"action": "query", "list": "search", "srsearch": title, "srlimit": 1, "format": "json"}
+    resp = upstream.wikipedia.get(WIKIPEDIA_API_URL, params=params)
+    resp.raise_for_status()
+    hits = resp.json().get("query", {}).get("search") or []
+    return article_url(hits[0]["title"]) if hits else None
+
+
+def pages(names: List[str]) -> Dict[str, Optional[str]]:
+    """Link for each of up to ``BATCH`` page names, following redirects; one request.
+
+    Missing, invalid and disambiguation pages map to None.
+    """
+    params = {
+        "action": "query",
+        "titles": "|".join(names),
+        "redirects": 1,
+        "prop": "pageprops",
+        "ppprop": "disambiguation",
+        "format": "json",
+        "formatversion": 2,
+    }
+    resp = upstream.wikipedia.get(WIKIPEDIA_API_URL, params=params)
+    resp.raise_for_status()
+    query = resp.json().get("query", {})
+    renamed = {}
+    for step in ("normalized", "redirects"):
+        for item in query.get(step, []):
+            renamed[item["from"]] = item["to"]
+    found = {
+        page["title"]: article_url(page["title"])
+        for page in query.get("pages", [])
+        if not page.get("missing") and not page.get("invalid") and "disambiguation" not in page.get("pageprops", {})
+    }
+    links = {}
+    for name in names:
+        target = name
+        for _ in range(3):  # normalized, then redirected (possibly twice)
+            target = renamed.get(target, target)
+        links[name] = found.get(target)
+    return links
+
+
+def lookup(titles: Iterable[str], search_fallback: bool = True) -> Dict[str, Optional[str]]:
+    """Links for movie titles: "<title> (film)" pages in batches, then searches.
+
+    A failed request only costs the titles it was for: they map to None
+    (or go on to be searched) while the others keep what was found.
+    """
+    titles = list(dict.fromkeys(titles))
+    links: Dict[str, Optional[str]] = dict.fromkeys(titles)
+    # "|" separates titles in a query, so those titles can only be searched
+    batchable = [t for t in titles if t and "|" not in t]
+    for i in range(0, len(batchable), BATCH):
+        chunk = batchable[i:i + BATCH]
+        try:
+            found = pages([f"{t} (film)" for t in chunk])
+        except requests.RequestException as e:
+            print(f"Wikipedia page lookup failed: {e}")
+            continue
+        for t in chunk:
+            links[t] = found[f"{t} (film)"]
+    if search_fallback:
+        for t in titles:
+            if links[t] is None and t:
+                try:
+                    links[t] = search(t)
+                except requests.RequestException as e:
+                    print(f"Wikipedia search for {t!r} failed: {e}")
+    return links
+
+
+def resolve_pending(
+    limit: int = 1000,
+    search_fallback: bool = True,
+    on_resolved: Optional[Callable[[List[int]], None]] = None,
+) -> Tuple[int, int]:
+    """Look up links for up to ``limit`` stored movies that are due; returns ``(found, missed)``.
+
+    Results are committed per batch; ``on_resolved`` gets the ids of movies
+    that gained a link (to invalidate cached payloads).
+    """
+    now = _utcnow()
+    floor = now - retry_delay(1)
+    candidates = (
+        Movie.query.filter(db.or_(Movie.wiki_link.is_(None), Movie.wiki_link == "#"))
+        .filter(db.or_(Movie.wiki_checked_at.is_(None), Movie.wiki_checked_at <= floor))
+        .order_by(Movie.id)
+    )
+    pending = []
+    for rec in candidates.yield_per(BATCH * 20):
+        if due(rec, now):
+            pending.append(rec)
+            if len(pending) >= limit:
+                break
+
+    found = missed = 0
+    for i in range(0, len(pending), BATCH):
+        batch = pending[i:i + BATCH]
+        links = lookup([rec.title for rec in batch], search_fallback=search_fallback)
+        resolved = []
+        for rec in batch:
+            link = links.get(rec.title)
+            record(rec, link, now)
+            if link:
+                resolved.append(rec.id)
+        db.session.commit()
+        found += len(resolved)
+        missed += len(batch) - len(resolved)
+        if resolved and on_resolved is not None:
+            on_resolved(resolved)
+    return found, missed